@@ -0,0 +1,89 @@
+# Memory per open blackjack table and the cost of one button click (find the
+# table by message id, play the move, move its idle timer, render the embed),
+# with more and more tables open at once. Both should stay about the same.
+#
+# Nothing gets sent anywhere, it's the same structures the cog keeps (tables
+# dict + TimerWheel) driven directly.
+#
+# Usage: python benchmarks/blackjack_tables.py [clicks per size]
+
+import itertools
+import os
+import secrets
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.blackjack import IDLE_TIMEOUT, Shoe, Table, render  # noqa: E402
+from dotzbot import TimerWheel  # noqa: E402
+
+SIZES = (10, 100, 500, 2000)
+CHANNELS = 50
+
+
+class FakePlayer:
+    def __init__(self, player_id):
+        self.id = player_id
+
+    def __str__(self):
+        return f"player{self.id}"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(size, clicks):
+    message_ids = itertools.count(1)
+    shoes = [Shoe() for _ in range(CHANNELS)]
+    tables = {}
+    idle = TimerWheel(tick=1, max_delay=IDLE_TIMEOUT)
+
+    def open_table(player_id):
+        while True:  # Naturals never stay open
+            table = Table(player_id, player_id % CHANNELS, shoes[player_id % CHANNELS])
+            if table.result is None:
+                break
+        message_id = next(message_ids)
+        tables[message_id] = table
+        idle.schedule(message_id, IDLE_TIMEOUT)
+        return message_id
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    open_ids = [open_table(player_id) for player_id in range(size)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = []
+    for _ in range(clicks):
+        slot = secrets.randbelow(size)
+        message_id = open_ids[slot]
+        start = time.perf_counter()
+        table = tables.get(message_id)
+        table.act(secrets.choice(("hit", "stand", "double")))
+        if table.result is None:
+            idle.schedule(message_id, IDLE_TIMEOUT)
+        else:
+            del tables[message_id]
+            idle.cancel(message_id)
+        render(table, FakePlayer(table.player_id))
+        latencies.append(time.perf_counter() - start)
+        if table.result is not None:  # Someone else sits down so it stays at size tables
+            open_ids[slot] = open_table(table.player_id)
+
+    print(f"{size:>5} tables: {(after - before) / size:6.0f} bytes/table  click p50={percentile(latencies, 0.5) * 1e6:5.1f}us  "
+          f"p99={percentile(latencies, 0.99) * 1e6:5.1f}us")
+
+
+def main():
+    clicks = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for size in SIZES:
+        run(size, clicks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# Drives the whole bot (command parsing, checks, cooldowns, metrics, the
+# outbound scheduler, discord.py's HTTP client...) against fakediscord.py and
+# reports throughput, latency percentiles and memory per command.
+#
+# Usage: python benchmarks/bot_load.py [invocations per command] [concurrency] [--slash] [--real-limits]
+#
+# --slash sends interactions instead of prefix messages, --real-limits keeps
+# the cooldowns and send rates from .env/the defaults instead of lifting them.
+# Run it before and after a change and compare, the numbers only mean something
+# next to each other on the same machine.
+#
+# At the end it sends [concurrency] big memes all at once, straight from live
+# downloads, and prints how much memory each one took. Around 1x the image is
+# the one copy it can't do without.
+
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakediscord import start_offline_bot, stop_offline_bot  # noqa: E402
+from intents_memory import get_rss_kb  # noqa: E402
+
+# name, prefix message, slash options
+SCENARIOS = (
+    ("roll", "$roll 20", {"dice_sides": 20}),
+    ("rps", "$rps rock", {"user_choice": "rock"}),
+    ("highcard", "$highcard", {}),
+    ("eightball", "$eightball will this be fast", {"question": "will this be fast"}),
+    ("help", "$help", {}),
+    ("meme", "$meme", {}),
+    ("botinfo", "$botinfo", {})
+)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_scenario(injector, name, content, options, count, concurrency, slash):
+    latencies = []
+    errors = {}
+    remaining = iter(range(count))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            if slash:
+                error = await injector.slash(name, **options)
+            else:
+                error = await injector.message(content)
+            latencies.append(time.perf_counter() - start)
+            if error is not None:
+                errors[type(error).__name__] = errors.get(type(error).__name__, 0) + 1
+
+    rss_before = get_rss_kb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:>10}: {count / elapsed:8.0f}/s  p50={percentile(latencies, 0.5) * 1000:6.1f}ms  "
+          f"p95={percentile(latencies, 0.95) * 1000:6.1f}ms  p99={percentile(latencies, 0.99) * 1000:6.1f}ms  "
+          f"heap peak={peak // 1024}KB  rss +{get_rss_kb() - rss_before}KB"
+          + (f"  errors={errors}" if errors else ""))
+
+
+MEME_TEST_BYTES = 2_000_000  # big enough for the rss to show it, under MEME_MAX_BYTES
+
+
+async def run_meme_memory(fake, injector, concurrency):
+    """concurrency $memes at the same time with an empty buffer, so every one downloads and uploads at once."""
+    import dotzbot
+    dotzbot.refill_memes.cancel()  # only the memes being sent should be in memory
+    while dotzbot.meme_buffer.pop() is not None:
+        pass
+    fake.image = b"\x89PNG\r\n\x1a\n" + bytes(MEME_TEST_BYTES - 8)
+
+    rss_before = get_rss_kb()
+    tracemalloc.start()
+    errors = await asyncio.gather(*(injector.message("$meme") for _ in range(concurrency)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss = get_rss_kb() - rss_before
+    failed = sum(error is not None for error in errors)
+    image_kb = MEME_TEST_BYTES // 1024
+    print(f"{concurrency} x {image_kb}KB memes at once: heap peak {peak // 1024 // concurrency}KB per meme "
+          f"({peak / concurrency / MEME_TEST_BYTES:.1f}x the image), rss +{rss // concurrency}KB per meme"
+          + (f"  errors={failed}" if failed else ""))
+
+
+async def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if args else 2000
+    concurrency = int(args[1]) if len(args) > 1 else 50
+    slash = "--slash" in sys.argv
+    fake, injector = await start_offline_bot(real_limits="--real-limits" in sys.argv)
+
+    import dotzbot
+    # Give the meme buffer a moment to fill like it would have after startup
+    for _ in range(50):
+        if len(dotzbot.meme_buffer) >= dotzbot.meme_buffer.size:
+            break
+        await asyncio.sleep(0.1)
+
+    print(f"{count} x {'slash' if slash else 'prefix'} per command, concurrency {concurrency}, "
+          f"rss {get_rss_kb() // 1024}MB at start")
+    try:
+        for name, content, options in SCENARIOS:
+            await run_scenario(injector, name, content, options, count, concurrency, slash)
+        if not slash:
+            await run_meme_memory(fake, injector, concurrency)
+    finally:
+        buffer = dotzbot.meme_buffer.stats()
+        print(f"meme buffer: {buffer}")
+        print("requests to the fake: " + ", ".join(f"{route}={n}" for route, n in sorted(fake.requests.items())))
+        await stop_offline_bot(fake)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+# Load test for the cooldown engine: one person spamming $meme while everyone
+# else uses it normally, with and without CooldownEngine in front.
+#
+# The "upstream" is a semaphore with a few slots and a fixed delay, standing in
+# for meme-api + the discord upload. Without limits the spammer fills it up and
+# everyone else's p99 goes through the roof.
+#
+# Usage: python benchmarks/cooldown_load.py [seconds]
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dotzbot  # noqa: E402
+
+UPSTREAM_SLOTS = 4
+UPSTREAM_DELAY = 0.05  # seconds per call
+NORMAL_USERS = 50
+NORMAL_INTERVAL = 4.0  # each normal user runs it every 4 seconds, under the 3 per 10s limit
+SPAM_CONCURRENCY = 20  # the spammer has this many going at once, all the time
+GUILD_ID = 1
+SPAMMER_ID = 999
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(engine, duration):
+    upstream = asyncio.Semaphore(UPSTREAM_SLOTS)
+    normal_latencies = []
+    counts = {"spam_ok": 0, "spam_rejected": 0, "normal_rejected": 0}
+    stop_at = time.monotonic() + duration
+
+    async def invoke(user_id):
+        """Returns the latency, or None if the cooldown said no."""
+        start = time.monotonic()
+        keys = None
+        if engine is not None:
+            try:
+                keys = engine.acquire(user_id, GUILD_ID, "meme")
+            except dotzbot.SlowDown:
+                return None
+        try:
+            async with upstream:
+                await asyncio.sleep(UPSTREAM_DELAY)
+        finally:
+            if engine is not None:
+                engine.release(keys)
+        return time.monotonic() - start
+
+    async def spammer():
+        while time.monotonic() < stop_at:
+            if await invoke(SPAMMER_ID) is None:
+                counts["spam_rejected"] += 1
+                await asyncio.sleep(0.01)  # they just hit enter again
+            else:
+                counts["spam_ok"] += 1
+
+    async def normal_user(user_id):
+        await asyncio.sleep(NORMAL_INTERVAL * user_id / NORMAL_USERS)  # spread them out
+        while time.monotonic() < stop_at:
+            latency = await invoke(user_id)
+            if latency is None:
+                counts["normal_rejected"] += 1
+            else:
+                normal_latencies.append(latency)
+            await asyncio.sleep(NORMAL_INTERVAL)
+
+    await asyncio.gather(*(spammer() for _ in range(SPAM_CONCURRENCY)),
+                         *(normal_user(user_id) for user_id in range(NORMAL_USERS)))
+    return normal_latencies, counts
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"{duration:.0f}s, {NORMAL_USERS} normal users, 1 spammer x{SPAM_CONCURRENCY}, "
+          f"{UPSTREAM_SLOTS} upstream slots at {UPSTREAM_DELAY * 1000:.0f}ms")
+    for name, engine in (("no limits", None),
+                         ("cooldowns", dotzbot.CooldownEngine(dotzbot.DEFAULT_COOLDOWNS, guild_factor=100))):
+        latencies, counts = asyncio.run(run(engine, duration))
+        print(f"{name:>10}: normal users p50={percentile(latencies, 0.5) * 1000:.0f}ms "
+              f"p99={percentile(latencies, 0.99) * 1000:.0f}ms ({len(latencies)} ok, "
+              f"{counts['normal_rejected']} rejected) | spammer {counts['spam_ok']} ok, "
+              f"{counts['spam_rejected']} rejected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+# Runs dotzbot without discord. Two parts:
+#
+# FakeDiscord is a small aiohttp server that answers the REST calls the bot
+# makes (login, sending messages, interaction callbacks/followups, typing,
+# moderation...) plus a stand-in meme-api and github, so nothing leaves the
+# machine. The moderation routes have per server rate limits with the same
+# headers discord sends, so discord.py's own limiter has something to do.
+#
+# Injector builds gateway payloads (MESSAGE_CREATE, INTERACTION_CREATE) and
+# hands them to the bot's connection state like the websocket would, then waits
+# for on_command_completion/on_command_error to know when a command is done.
+#
+# Usage:
+#     fake, injector = await start_offline_bot()
+#     await injector.message("$roll 20")
+#     await injector.slash("roll", dice_sides=20)
+#     await stop_offline_bot(fake)
+#
+# prepare_env() has to run before dotzbot is imported since the bot reads it's
+# config at import time, start_offline_bot() does that for you.
+
+import asyncio
+import importlib
+import itertools
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BOT_ID = 1000
+OWNER_ID = 1001
+GUILD_ID = 2000
+CHANNEL_ID = 2001
+BOT_ROLE_ID = 2002
+APPLICATION_ID = BOT_ID
+MEME_IMAGE_BYTES = 40_000
+NSFW_EVERY = 10  # every 10th fake meme is nsfw so the filter has something to do
+MODERATION_LIMIT = (50, 1.0)  # requests per seconds for each moderation route in a server
+MODERATION_BURST = 5
+
+# Lifted by default so the benchmark measures the bot, not the outbound/cooldown limits
+BENCH_ENV = {
+    "DISCORD_TOKEN": "fake-token",
+    "METRICS_PORT": "0",
+    "COOLDOWN_GUILD_FACTOR": "1000000",
+    "CHANNEL_SEND_RATE": "1000000",
+    "GLOBAL_SEND_RATE": "1000000",
+    "CHANNEL_QUEUE_DEPTH": "1000000",
+    "LAG_ALERT_MS": "1000000",
+    # Not lifted, set just under the fake's route limit like it should be for discord's
+    "MODERATION_RATE": str(int(MODERATION_LIMIT[0] / MODERATION_LIMIT[1]) - MODERATION_BURST),
+    "MODERATION_BURST": str(MODERATION_BURST),
+    "MEME_REFILL_INTERVAL": "1"
+}
+
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_env(port, real_limits=False):
+    """Points the bot at the fake and runs it from a temp dir, so discord.log and
+    .tree_hash.json from the benchmark don't end up next to the real ones."""
+    base = f"http://127.0.0.1:{port}"
+    os.environ["MEME_API_URL"] = f"{base}/meme-api/gimme"
+    os.environ["GITHUB_API_URL"] = f"{base}/github"
+    os.environ["ALLOWED_SERVERS"] = str(GUILD_ID)
+    for name, value in BENCH_ENV.items():
+        if real_limits and name != "DISCORD_TOKEN" and name != "METRICS_PORT":
+            continue
+        os.environ.setdefault(name, value)
+    os.chdir(tempfile.mkdtemp(prefix="dotzbot-bench-"))
+    return base
+
+
+# --- PAYLOADS ---
+
+
+snowflakes = itertools.count(int(time.time() * 1000 - 1420070400000) << 22)
+
+
+def next_id():
+    return next(snowflakes)
+
+
+def make_user(user_id, bot=False):
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0",
+            "global_name": None, "avatar": None, "bot": bot, "public_flags": 0}
+
+
+def make_member(user_id, bot=False, roles=()):
+    return {"user": make_user(user_id, bot), "roles": [str(role) for role in roles],
+            "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False, "mute": False, "flags": 0, "permissions": "2147483647"}
+
+
+def make_channel():
+    return {"id": str(CHANNEL_ID), "type": 0, "guild_id": str(GUILD_ID), "name": "bench",
+            "position": 0, "permission_overwrites": [], "nsfw": False, "parent_id": None,
+            "topic": None, "last_message_id": None, "rate_limit_per_user": 0}
+
+
+def make_guild():
+    return {
+        "id": str(GUILD_ID),
+        "name": "bench guild",
+        "owner_id": str(OWNER_ID),
+        "member_count": 2,
+        # The bot's role puts it above everyone else, or it couldn't moderate anyone
+        "members": [make_member(BOT_ID, bot=True, roles=(BOT_ROLE_ID,)), make_member(OWNER_ID)],
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "2147483647",
+                   "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False},
+                  {"id": str(BOT_ROLE_ID), "name": "dotzbot", "permissions": "0",
+                   "position": 1, "color": 0, "hoist": False, "managed": True, "mentionable": False}],
+        "channels": [make_channel()],
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+        "icon": None
+    }
+
+
+def make_message(content, author, message_id=None, embeds=None):
+    return {
+        "id": str(message_id or next_id()),
+        "channel_id": str(CHANNEL_ID),
+        "guild_id": str(GUILD_ID),
+        "author": author,
+        "content": content,
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": embeds or [],
+        "components": [],
+        "pinned": False,
+        "type": 0,
+        "flags": 0
+    }
+
+
+def make_application():
+    return {"id": str(APPLICATION_ID), "name": "dotzbot", "icon": None, "description": "",
+            "rpc_origins": [], "bot_public": True, "bot_require_code_grant": False,
+            "owner": make_user(OWNER_ID), "team": None, "verify_key": "0" * 64, "flags": 0}
+
+
+# --- REST STUB ---
+
+
+def json_response(data, status=200, headers=None):
+    """web.json_response says "application/json; charset=utf-8", discord.py only parses the exact
+    "application/json" discord sends and treats anything else as text."""
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers,
+                        content_type="application/json")
+
+
+class FakeDiscord:
+    """The REST side of discord plus meme-api and github, all on one port."""
+
+    def __init__(self, port, meme_bytes=MEME_IMAGE_BYTES):
+        self.port = port
+        self.base = f"http://127.0.0.1:{port}"
+        self.image = b"\x89PNG\r\n\x1a\n" + bytes(meme_bytes)
+        self.requests = {}  # "METHOD /route" -> count
+        self.rate_limited = 0  # 429s sent
+        self.windows = {}  # rate limit bucket -> [window ends at, requests left]
+        self.attachments = {}  # attachment id -> bytes
+        self.last_edit = None  # payload of the latest message edit
+        self.memes_served = 0
+        self.runner = None
+
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        api = "/api/v10"
+        app.router.add_get(f"{api}/users/@me", self.bot_user)
+        app.router.add_get(f"{api}/oauth2/applications/@me", self.application)
+        app.router.add_get(f"{api}/users/{{user_id}}", self.user)
+        app.router.add_post(f"{api}/channels/{{channel_id}}/messages", self.create_message)
+        app.router.add_patch(f"{api}/channels/{{channel_id}}/messages/{{message_id}}", self.create_message)
+        app.router.add_post(f"{api}/channels/{{channel_id}}/typing", self.no_content)
+        app.router.add_put(f"{api}/channels/{{channel_id}}/messages/{{message_id}}/reactions/{{emoji}}/@me",
+                           self.no_content)
+        app.router.add_post(f"{api}/interactions/{{interaction_id}}/{{token}}/callback", self.callback)
+        app.router.add_post(f"{api}/webhooks/{{app_id}}/{{token}}", self.create_message)
+        app.router.add_route("*", f"{api}/webhooks/{{app_id}}/{{token}}/messages/{{message_id}}",
+                             self.create_message)
+        app.router.add_put(f"{api}/applications/{{app_id}}/commands", self.empty_list)
+        app.router.add_put(f"{api}/applications/{{app_id}}/guilds/{{guild_id}}/commands", self.empty_list)
+        app.router.add_get(f"{api}/guilds/{{guild_id}}/members/{{user_id}}", self.moderate)
+        app.router.add_patch(f"{api}/guilds/{{guild_id}}/members/{{user_id}}", self.moderate)
+        app.router.add_delete(f"{api}/guilds/{{guild_id}}/members/{{user_id}}", self.moderate)
+        app.router.add_put(f"{api}/guilds/{{guild_id}}/bans/{{user_id}}", self.moderate)
+        app.router.add_delete(f"{api}/guilds/{{guild_id}}/bans/{{user_id}}", self.moderate)
+        app.router.add_post(f"{api}/guilds/{{guild_id}}/bulk-ban", self.bulk_ban)
+        app.router.add_get("/attachments/{attachment_id}/{filename}", self.attachment)
+        app.router.add_get("/meme-api/gimme", self.gimme)
+        app.router.add_get("/meme-api/gimme/{count}", self.gimme)
+        app.router.add_get("/meme-img/{name}", self.meme_image)
+        app.router.add_get("/github/repos/{owner}/{repo}/commits", self.commits)
+        app.router.add_route("*", "/{tail:.*}", self.not_found)
+        app.middlewares.append(self.count_requests)
+        self.app = app
+
+    async def start(self):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    @web.middleware
+    async def count_requests(self, request, handler):
+        route = request.match_info.route.resource
+        key = f"{request.method} {route.canonical if route else request.path}"
+        self.requests[key] = self.requests.get(key, 0) + 1
+        return await handler(request)
+
+    @staticmethod
+    async def read_payload(request):
+        """JSON body, or payload_json out of a multipart upload (messages with files)."""
+        if request.content_type == "application/json":
+            return await request.json()
+        if request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "payload_json":
+                    return json.loads(await part.text())
+                await part.release()
+        return {}
+
+    async def bot_user(self, request):
+        return json_response(make_user(BOT_ID, bot=True))
+
+    async def application(self, request):
+        return json_response(make_application())
+
+    async def user(self, request):
+        return json_response(make_user(int(request.match_info["user_id"])))
+
+    async def create_message(self, request):
+        payload = await self.read_payload(request)
+        if request.method == "PATCH":
+            self.last_edit = payload
+        return json_response(make_message(payload.get("content") or "", make_user(BOT_ID, bot=True),
+                                              embeds=payload.get("embeds")))
+
+    async def callback(self, request):
+        payload = await self.read_payload(request)
+        data = payload.get("data") or {}
+        message = make_message(data.get("content") or "", make_user(BOT_ID, bot=True), embeds=data.get("embeds"))
+        # What discord sends back when with_response is set, older discord.py just ignores it
+        return json_response({
+            "interaction": {"id": request.match_info["interaction_id"], "type": 2,
+                            "response_message_id": message["id"], "response_message_loading": False,
+                            "response_message_ephemeral": False},
+            "resource": {"type": payload.get("type", 4), "message": message}
+        })
+
+    async def no_content(self, request):
+        return web.Response(status=204)
+
+    async def empty_list(self, request):
+        return json_response([])
+
+    def rate_limit(self, bucket):
+        """Fixed window limit per bucket. Returns the headers discord would send and if it's over the limit."""
+        limit, per = MODERATION_LIMIT
+        now = time.monotonic()
+        window = self.windows.get(bucket)
+        if window is None or now >= window[0]:
+            window = self.windows[bucket] = [now + per, limit]
+        window[1] -= 1
+        reset_after = window[0] - now
+        headers = {"X-RateLimit-Limit": str(limit), "X-RateLimit-Remaining": str(max(0, window[1])),
+                   "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+                   "X-RateLimit-Reset-After": f"{reset_after:.3f}", "X-RateLimit-Bucket": bucket}
+        if window[1] >= 0:
+            return headers, False
+        self.rate_limited += 1
+        return headers, True
+
+    async def moderate(self, request):
+        """Member fetches, kicks, timeouts, bans and unbans. Everyone's in the server and nobody's banned yet."""
+        route = request.match_info.route.resource.canonical
+        headers, limited = self.rate_limit(f"{request.method} {route} {request.match_info['guild_id']}")
+        if limited:
+            # discord.py only retries a 429 that came through discord's proxy, without Via it's a cloudflare ban
+            headers["Via"] = "1.1 google"
+            return json_response({"message": "You are being rate limited.", "global": False,
+                                      "retry_after": float(headers["X-RateLimit-Reset-After"])},
+                                     status=429, headers=headers)
+        if request.method in ("GET", "PATCH"):
+            return json_response(make_member(int(request.match_info["user_id"])), headers=headers)
+        return web.Response(status=204, headers=headers)
+
+    async def bulk_ban(self, request):
+        payload = await self.read_payload(request)
+        return json_response({"banned_users": payload.get("user_ids", []), "failed_users": []})
+
+    async def attachment(self, request):
+        data = self.attachments.get(int(request.match_info["attachment_id"]))
+        if data is None:
+            return await self.not_found(request)
+        return web.Response(body=data, content_type="text/plain")
+
+    async def not_found(self, request):
+        return json_response({"message": "Unknown route (fakediscord)", "code": 0}, status=404)
+
+    def make_post(self):
+        self.memes_served += 1
+        number = self.memes_served
+        return {"postLink": f"{self.base}/post/{number}", "subreddit": "bench", "title": f"meme {number}",
+                "url": f"{self.base}/meme-img/{number}.png", "nsfw": number % NSFW_EVERY == 0,
+                "spoiler": False, "author": "bench", "ups": number, "preview": []}
+
+    async def gimme(self, request):
+        if "count" not in request.match_info:
+            return json_response(self.make_post())
+        count = min(50, int(request.match_info["count"]))  # meme-api caps it at 50 too
+        memes = [self.make_post() for _ in range(count)]
+        return json_response({"count": len(memes), "memes": memes})
+
+    async def meme_image(self, request):
+        return web.Response(body=self.image, content_type="image/png")
+
+    async def commits(self, request):
+        etag = '"fakediscord"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        commit = {"sha": "0123456789abcdef0123456789abcdef01234567", "html_url": f"{self.base}/commit",
+                  "commit": {"message": "benchmark commit"}}
+        return json_response([commit], headers={"ETag": etag})
+
+
+# --- INJECTOR ---
+
+
+class Injector:
+    """Feeds gateway events to the bot and waits for the command they trigger to finish."""
+
+    def __init__(self, bot, fake):
+        self.bot = bot
+        self.fake = fake
+        self.state = bot._connection  # skipcq: PYL-W0212
+        self.waiting = {}  # message/interaction id -> future
+        self.user_ids = itertools.count(10_000)
+        bot.add_listener(self.on_command_completion)
+        bot.add_listener(self.on_command_error)
+
+    def _resolve(self, ctx, error=None):
+        key = ctx.interaction.id if ctx.interaction is not None else ctx.message.id
+        future = self.waiting.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(error)
+
+    async def on_command_completion(self, ctx):
+        self._resolve(ctx)
+
+    async def on_command_error(self, ctx, error):
+        self._resolve(ctx, error)
+
+    def next_user(self):
+        """A new author every time, so per-user cooldowns never kick in unless you want them to."""
+        return next(self.user_ids)
+
+    async def _dispatch(self, key, parse, data, timeout):
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[key] = future
+        parse(data)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.waiting.pop(key, None)
+
+    async def message(self, content, user_id=None, timeout=30, attachments=None):
+        """Sends a MESSAGE_CREATE and returns the command error, or None if it worked.
+        attachments is {filename: bytes}, the fake serves them for attachment.read()."""
+        user_id = user_id or self.next_user()
+        data = make_message(content, make_user(user_id))
+        data["member"] = {key: value for key, value in make_member(user_id).items() if key != "user"}
+        for filename, body in (attachments or {}).items():
+            attachment_id = next_id()
+            self.fake.attachments[attachment_id] = body
+            url = f"{self.fake.base}/attachments/{attachment_id}/{filename}"
+            data["attachments"].append({"id": str(attachment_id), "filename": filename, "size": len(body),
+                                        "url": url, "proxy_url": url, "content_type": "text/plain"})
+        return await self._dispatch(int(data["id"]), self.state.parse_message_create, data, timeout)
+
+    async def slash(self, name, user_id=None, timeout=30, **options):
+        """Sends an INTERACTION_CREATE for /name with options, same return as message()."""
+        user_id = user_id or self.next_user()
+        interaction_id = next_id()
+        data = {
+            "id": str(interaction_id),
+            "application_id": str(APPLICATION_ID),
+            "type": 2,
+            "token": f"token{interaction_id}",
+            "version": 1,
+            "guild_id": str(GUILD_ID),
+            "channel_id": str(CHANNEL_ID),
+            "channel": make_channel(),
+            "member": make_member(user_id),
+            "app_permissions": "2147483647",
+            "attachment_size_limit": 10 * 1024 * 1024,
+            "locale": "en-US",
+            "guild_locale": "en-US",
+            "entitlements": [],
+            "authorizing_integration_owners": {"0": str(GUILD_ID)},
+            "context": 0,
+            "data": {
+                "id": str(next_id()),
+                "name": name,
+                "type": 1,
+                "guild_id": str(GUILD_ID),
+                "options": [{"name": key, "type": option_type(value), "value": value}
+                            for key, value in options.items()]
+            }
+        }
+        return await self._dispatch(interaction_id, self.state.parse_interaction_create, data, timeout)
+
+
+def option_type(value):
+    """discord's option type number for a python value."""
+    if isinstance(value, bool):
+        return 5
+    if isinstance(value, int):
+        return 4
+    if isinstance(value, float):
+        return 10
+    return 3
+
+
+# --- STARTUP ---
+
+
+async def start_offline_bot(real_limits=False):
+    """Starts the fake, logs the bot into it and adds the bench guild, without
+    ever opening a gateway connection. Returns (fake, injector)."""
+    port = get_free_port()
+    base = prepare_env(port, real_limits)
+    fake = FakeDiscord(port)
+    await fake.start()
+
+    import discord
+    discord.http.Route.BASE = f"{base}/api/v10"
+    dotzbot = importlib.import_module("dotzbot")
+    dotzbot.setup_logging()  # discord.log ends up in the temp dir from prepare_env
+    dotzbot.console_handler.setLevel("WARNING")  # thousands of "used $roll" lines would be the bottleneck
+
+    bot = dotzbot.bot
+    await bot.login(os.environ["DISCORD_TOKEN"])  # also runs setup_hook
+    state = bot._connection  # skipcq: PYL-W0212
+    state._add_guild(discord.Guild(data=make_guild(), state=state))  # skipcq: PYL-W0212
+    bot._ready.set()  # skipcq: PYL-W0212 - on_ready isn't dispatched, it'd try to announce and sync
+    return fake, Injector(bot, fake)
+
+
+async def stop_offline_bot(fake):
+    dotzbot = sys.modules["dotzbot"]
+    dotzbot.refill_memes.cancel()
+    dotzbot.sample_loop_lag.cancel()
+    dotzbot.sample_health.cancel()
+    dotzbot.flush_stats.cancel()
+    dotzbot.expire_routes.cancel()
+    await dotzbot.http_client.close()
+    await dotzbot.bot.close()
+    await dotzbot.stats_store.flush()
+    dotzbot.stats_store.close()
+    await fake.close()
+    dotzbot.log_listener.stop()
@@ -0,0 +1,104 @@
+# Compares memory use of Intents.all() + chunking (how the bot used to run)
+# against the intent profile get_intent_profile() works out from the commands.
+#
+# Usage: python benchmarks/intents_memory.py [guilds] [members per guild]
+# Each mode runs in it's own process so the RSS numbers don't mix.
+
+import os
+import subprocess
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Members the bot would have seen talking/being looked up without chunking
+SEEN_FRACTION = 0.05
+
+
+def get_rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:  # not linux, max rss is the best we have
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def make_member(user_id):
+    return {
+        "user": {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0",
+                 "global_name": None, "avatar": None},
+        "roles": [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0
+    }
+
+
+def make_guild(guild_id, member_count, chunked, presences):
+    """A GUILD_CREATE payload. chunked=True is what the cache looks like after chunking every guild."""
+    first_id = guild_id * 1_000_000
+    shown = member_count if chunked else max(1, int(member_count * SEEN_FRACTION))
+    data = {
+        "id": str(guild_id),
+        "name": f"guild {guild_id}",
+        "member_count": member_count,
+        "members": [make_member(first_id + i) for i in range(shown)],
+        "roles": [],
+        "channels": [],
+        "emojis": [],
+        "stickers": [],
+        "features": []
+    }
+    if presences:
+        data["presences"] = [
+            {"user": {"id": str(first_id + i)}, "status": "online", "activities": [],
+             "client_status": {"desktop": "online"}}
+            for i in range(0, shown, 3)  # about a third online
+        ]
+    return data
+
+
+def run(mode, guild_count, member_count):
+    import discord
+
+    if mode == "all":
+        intents = discord.Intents.all()
+        cache_flags = discord.MemberCacheFlags.from_intents(intents)
+    else:
+        import dotzbot  # works the profile out from the cog classes when it's imported
+        intents, cache_flags = dotzbot.intents, dotzbot.member_cache
+
+    client = discord.Client(intents=intents, member_cache_flags=cache_flags)
+    state = client._connection  # skipcq: PYL-W0212
+
+    rss_before = get_rss_kb()
+    tracemalloc.start()
+    guilds = [
+        discord.Guild(data=make_guild(guild_id, member_count, chunked=mode == "all",
+                                      presences=intents.presences), state=state)
+        for guild_id in range(1, guild_count + 1)
+    ]
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cached = sum(len(guild.members) for guild in guilds)
+    print(f"{mode:>8}: intents={intents.value:<8} cached members={cached:<8} "
+          f"python heap={traced // 1024}KB rss growth={get_rss_kb() - rss_before}KB")
+
+
+def main():
+    guild_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    member_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    print(f"{guild_count} guilds x {member_count} members")
+    for mode in ("all", "profile"):
+        subprocess.run([sys.executable, __file__, "--mode", mode, str(guild_count), str(member_count)],
+                       check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--mode":
+        run(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
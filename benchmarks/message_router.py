@@ -0,0 +1,70 @@
+# What it costs to get one chat message to the game that's waiting for it, with
+# more and more games going at once. The message router should stay flat, the
+# wait_for way (what a bot.wait_for("message") per game does: every waiting
+# check runs for every message) is there to compare.
+#
+# Half the messages are from someone with a game going, half are just chat.
+#
+# Usage: python benchmarks/message_router.py [messages per size]
+
+import asyncio
+import os
+import secrets
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotzbot import MessageRouter  # noqa: E402
+
+SIZES = (10, 100, 1000, 10000)
+CHANNELS = 50
+
+
+def make_message(channel_id, user_id):
+    return SimpleNamespace(channel=SimpleNamespace(id=channel_id), author=SimpleNamespace(id=user_id), content="42")
+
+
+async def handle(message):
+    pass
+
+
+async def run(size, count):
+    router = MessageRouter(max_timeout=60)
+    waiters = []  # (future, check) like discord.py keeps for wait_for
+    loop = asyncio.get_running_loop()
+    for user_id in range(size):
+        channel_id = user_id % CHANNELS
+        router.add(channel_id, user_id, handle, timeout=60, on_timeout=None)
+        waiters.append((loop.create_future(),
+                        lambda m, c=channel_id, u=user_id: m.channel.id == c and m.author.id == u))
+
+    messages = []
+    for number in range(count):
+        user_id = secrets.randbelow(size) if number % 2 else size + number  # playing, or just chatting
+        messages.append(make_message(user_id % CHANNELS, user_id))
+
+    start = time.perf_counter()
+    for message in messages:
+        await router.dispatch(message)
+    routed = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    for message in messages:
+        for future, check in waiters:
+            if not future.done() and check(message):
+                break  # Would set the result, left alone so the next size has the same waiters
+    waited = (time.perf_counter() - start) / count
+
+    print(f"{size:>6} games: router {routed * 1e9:7.0f}ns/message  wait_for {waited * 1e9:10.0f}ns/message")
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for size in SIZES:
+        await run(size, count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
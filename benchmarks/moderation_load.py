@@ -0,0 +1,80 @@
+# Throughput of the batched moderation commands against fakediscord.py: one
+# command per action with a file of user IDs attached, timed from the message
+# to the final progress edit. The fake rate limits each moderation route per
+# server (fakediscord.MODERATION_LIMIT) and sends discord's headers, and the
+# bench sets MODERATION_RATE/MODERATION_BURST just under it, so this shows how
+# close the worker pool gets to that limit and if it still runs into a 429.
+# The final progress message says how many targets were skipped or failed and
+# why, that gets printed too.
+#
+# Usage: python benchmarks/moderation_load.py [targets] [--real-limits]
+#
+# --real-limits keeps MODERATION_RATE and the other limits from .env/the
+# defaults instead of the bench ones.
+
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakediscord import MODERATION_LIMIT, OWNER_ID, next_id, start_offline_bot, stop_offline_bot  # noqa: E402
+
+# name, command
+SCENARIOS = (
+    ("ban", "$ban benchmark"),
+    ("kick", "$kick benchmark"),
+    ("timeout", "$timeout 10m benchmark"),
+    ("unban", "$unban benchmark")
+)
+
+
+def summarize(edit):
+    """"done, skipped n (why), failed n (why)" out of the final progress embed. The embed only
+    lists the first few problems, so the reasons are counted from those."""
+    if not edit or not edit.get("embeds"):
+        return "no progress message"
+    embed = edit["embeds"][0]
+    parts = [embed.get("description", "")]
+    for field in embed.get("fields", []):
+        name, _, count = field["name"].partition(" (")
+        if not count:  # The done count
+            parts.append(f"{name.lower()} {field['value']}")
+            continue
+        reasons = Counter(line.split(" ", 1)[1] for line in field["value"].splitlines() if line.startswith("`"))
+        shown = ", ".join(f"{why} x{n}" for why, n in reasons.most_common())
+        parts.append(f"{name.lower()} {count.rstrip(')')} ({shown})")
+    return ", ".join(parts)
+
+
+async def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if args else 500
+    fake, injector = await start_offline_bot(real_limits="--real-limits" in sys.argv)
+
+    limit, per = MODERATION_LIMIT
+    print(f"{count} targets per command, fake limit {limit} requests per {per:g}s per route")
+    try:
+        for name, content in SCENARIOS:
+            targets = "\n".join(str(next_id()) for _ in range(count)).encode()
+            requests_before = dict(fake.requests)
+            limited_before = fake.rate_limited
+            start = time.perf_counter()
+            # As the owner, so the hierarchy checks don't skip anyone
+            error = await injector.message(content, user_id=OWNER_ID, timeout=600,
+                                           attachments={"targets.txt": targets})
+            elapsed = time.perf_counter() - start
+            calls = {route: n - requests_before.get(route, 0) for route, n in fake.requests.items()
+                     if n != requests_before.get(route, 0)}
+            print(f"{name:>8}: {count / elapsed:7.0f} targets/s  {elapsed:6.2f}s  429s={fake.rate_limited - limited_before}"
+                  + (f"  error={type(error).__name__}: {error}" if error is not None else ""))
+            print("          " + summarize(fake.last_edit))
+            print("          " + ", ".join(f"{route}={n}" for route, n in sorted(calls.items())))
+    finally:
+        await stop_offline_bot(fake)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+# How fast the poker hand evaluator is: building the lookup tables vs loading
+# them from the cache, then 5 and 7 card hands evaluated per second.
+#
+# Usage: python benchmarks/poker_eval.py [hands] [--check]
+#
+# --check also runs every one of the 2,598,960 five card hands and compares how
+# many of each hand there are to the real numbers, so a broken table shows up.
+
+import collections
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.poker import DECK, HandEvaluator, hand_name  # noqa: E402
+
+# Straight flushes include the 4 royal flushes here
+FREQUENCIES = {
+    "Straight Flush": 40,
+    "Four of a Kind": 624,
+    "Full House": 3744,
+    "Flush": 5108,
+    "Straight": 10200,
+    "Three of a Kind": 54912,
+    "Two Pair": 123552,
+    "One Pair": 1098240,
+    "High Card": 1302540
+}
+
+
+def check(evaluator):
+    counts = collections.Counter()
+    for hand in itertools.combinations(DECK, 5):
+        name = hand_name(evaluator.evaluate5(*hand))
+        counts["Straight Flush" if name == "Royal Flush" else name] += 1
+    for name, expected in FREQUENCIES.items():
+        print(f"{name:>15}: {counts[name]:8} {'ok' if counts[name] == expected else f'WRONG, should be {expected}'}")
+    return counts == FREQUENCIES
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if args else 1000000
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "poker_tables.bin")
+        start = time.perf_counter()
+        HandEvaluator.load(path)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        evaluator = HandEvaluator.load(path)
+        loaded = time.perf_counter() - start
+        size = os.path.getsize(path)
+    print(f"tables: built in {built:.2f}s, loaded from the cache in {loaded * 1000:.0f}ms ({size // 1024}KB)")
+
+    # Dealt up front so the timing is only the evaluator
+    hands5 = [random.sample(DECK, 5) for _ in range(count)]
+    evaluate5 = evaluator.evaluate5
+    start = time.perf_counter()
+    for hand in hands5:
+        evaluate5(*hand)
+    elapsed = time.perf_counter() - start
+    print(f"5 cards: {count / elapsed:10.0f} hands/s")
+
+    hands7 = [random.sample(DECK, 7) for _ in range(count)]
+    evaluate7 = evaluator.evaluate7
+    start = time.perf_counter()
+    for hand in hands7:
+        evaluate7(hand)
+    elapsed = time.perf_counter() - start
+    print(f"7 cards: {count / elapsed:10.0f} hands/s")
+
+    if "--check" in sys.argv and not check(evaluator):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# The trivia bank with a lot of questions in it: how long building and opening
+# it takes, what opening it costs in memory, how fast a random question comes
+# out of it, and what checking a chat message against the open question costs.
+#
+# The questions are made up, it's the size that matters. Banks get built with
+# tools/build_trivia.py like a big one would be ahead of time, at a few sizes
+# up to [questions] so you can see opening doesn't grow with it (only the
+# offsets get read, the questions stay on disk until they're picked).
+#
+# Usage: python benchmarks/trivia_bank.py [questions] [lookups]
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cogs.trivia import Question, RecentQuestions, TriviaBank, normalize_answer  # noqa: E402
+from intents_memory import get_rss_kb  # noqa: E402
+
+BUILD_TOOL = os.path.join(ROOT, "tools", "build_trivia.py")
+CATEGORIES = 20
+SIZES = (0.02, 0.2, 1)  # fractions of [questions]
+CHAT = (
+    "lol",
+    "what",
+    "no way that's the answer",
+    "I think it's the one with the big red building, my cousin went there once and said it was huge",
+    "The Eiffel Tower!",
+    "eiffel tower"
+)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def write_source(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for number in range(count):
+            f.write(f"Category {number % CATEGORIES}\tMade up question number {number}, what's the answer?\t"
+                    f"Answer {number}\tThe answer {number}|{number}\n")
+
+
+def build_with_tool(source, path):
+    """Runs tools/build_trivia.py, returns how long it took."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, BUILD_TOOL, source, path], capture_output=True, text=True, check=False)
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        sys.exit(f"build_trivia.py failed: {result.stdout}{result.stderr}")
+    return elapsed
+
+
+def open_bank(path):
+    """Opens it and returns (bank, ms to open, rss KB it added)."""
+    rss_before = get_rss_kb()
+    start = time.perf_counter()
+    bank = TriviaBank(path)
+    opened = time.perf_counter() - start
+    return bank, opened * 1000, get_rss_kb() - rss_before
+
+
+def is_answer(current, content):
+    """Same check as Trivia.check_answer."""
+    return current.shortest <= len(content) <= current.longest and normalize_answer(content) in current.accepted
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    with tempfile.TemporaryDirectory() as directory:
+        for fraction in SIZES:
+            size = max(1, int(count * fraction))
+            source = os.path.join(directory, f"trivia{size}.tsv")
+            path = os.path.join(directory, f"trivia{size}.bank")
+            write_source(source, size)
+            built = build_with_tool(source, path)
+            bank, opened, rss = open_bank(path)
+            print(f"{size:>8} questions: built in {built * 1000:5.0f}ms (whole tool), "
+                  f"{os.path.getsize(path) // 1024:6}KB on disk, opened in {opened:.2f}ms, rss +{rss}KB")
+            if fraction != SIZES[-1]:
+                bank.close()
+        rss_before = get_rss_kb()
+
+        recent = RecentQuestions(100)
+        latencies = []
+        for _ in range(lookups):
+            start = time.perf_counter()
+            question_id = bank.pick(recent)
+            recent.add(question_id)
+            bank.question(question_id)
+            latencies.append(time.perf_counter() - start)
+        print(f"random question: p50={percentile(latencies, 0.5) * 1e6:.1f}us  p99={percentile(latencies, 0.99) * 1e6:.1f}us  "
+              f"rss +{get_rss_kb() - rss_before}KB after {lookups} lookups")
+
+        current = Question("Eiffel Tower", ["eiffel tower"], 0)
+        for content in CHAT:
+            start = time.perf_counter()
+            for _ in range(lookups):
+                is_answer(current, content)
+            elapsed = time.perf_counter() - start
+            print(f"check {content[:40]!r:>44}: {elapsed / lookups * 1e9:6.0f}ns  {'right' if is_answer(current, content) else ''}")
+        bank.close()
+
+
+if __name__ == "__main__":
+    main()
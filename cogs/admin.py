@@ -0,0 +1,179 @@
+# --- Imports ---
+
+
+# Standard library
+import logging
+from datetime import datetime
+
+# Third-party
+import discord
+from discord.ext import commands
+
+# dotzbot
+import dotzbot
+from dotzbot import (BOT_START_TIME, DOTZBOT_CHANNEL_ID, EXTENSIONS, LAZY_EXTENSIONS, CategoryCog,
+                     announce, command_metrics, extension_times, get_tree_fingerprint, get_uptime,
+                     http_client, load_cog, load_tree_hashes, refill_memes, send_reply, startup_times,
+                     sync_tree)
+
+
+# --- ADMIN COMMANDS ---
+
+
+class Admin(CategoryCog):
+    category = "admin"
+
+    @commands.command(description="Shuts down the bot (dotz only)", hidden=True, aliases=["die", "kys", "fuckingdie", "de-exist"])
+    @commands.is_owner()
+    async def shutdown(self, ctx):
+        time_at_shutdown = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        embed = discord.Embed(
+            title="dotzbot is offline",
+            description=time_at_shutdown,
+            color=discord.Color.red()
+        )
+
+        embed.add_field(name="", value=f"Uptime: {get_uptime()}")
+        embed.add_field(name="Started at",
+                        value=BOT_START_TIME.strftime("%Y-%m-%d %H:%M:%S"))
+        dotzbot_channel = await self.bot.fetch_channel(DOTZBOT_CHANNEL_ID)
+        emoji = "✅"  # defines emoji to react with
+        await ctx.message.add_reaction(emoji)
+        await announce(dotzbot_channel, embed=embed)
+        logging.info("%s (%s) used $shutdown command!", ctx.author, ctx.author.id)
+        logging.info("Bot was up for %s", get_uptime())
+        refill_memes.cancel()
+        if dotzbot.metrics_runner is not None:  # set in setup_hook, so not imported above
+            await dotzbot.metrics_runner.cleanup()
+        await http_client.close()
+        await self.bot.close()
+
+    @commands.command(description="List all servers the bot is in (dotz only)", hidden=True, aliases=["servers"])
+    @commands.is_owner()
+    async def serverlist(self, ctx):
+        embed = discord.Embed(
+            title="Server List",
+            description=f"The bot is in {len(self.bot.guilds)} servers:",
+            color=discord.Color.gold()
+        )
+
+        for guild in self.bot.guilds:  # Adds each guild as it's own field
+            embed.add_field(
+                name=guild.name,
+                value=f"ID: {guild.id} | Members: {guild.member_count}",
+                inline=False
+            )
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) used $serverlist command (%s servers)",
+                     ctx.author, ctx.author.id, len(self.bot.guilds))
+
+    @commands.command(description="Show command latency/error stats (dotz only)", hidden=True, aliases=["perf"])
+    @commands.is_owner()
+    async def metrics(self, ctx):
+        embed = discord.Embed(
+            title="Command Metrics",
+            description="p50 / p95 total, average http / discord / compute (ms)",
+            color=discord.Color.gold()
+        )
+        busiest = sorted(command_metrics.commands.items(), key=lambda item: item[1]["invocations"], reverse=True)
+        for name, stats in busiest[:22]:  # 25 field limit, the last 3 are http client/startup/cogs
+            phases = stats["phases"]
+            count = phases["total"].count or 1
+            http_ms, discord_ms, compute_ms = (round(phases[phase].sum / count * 1000)
+                                               for phase in ("http", "discord", "compute"))
+            embed.add_field(
+                name=f"${name}",
+                value=(f"{stats['invocations']} runs, {stats['errors']} errors\n"
+                       f"{round(phases['total'].quantile(0.5) * 1000)} / {round(phases['total'].quantile(0.95) * 1000)}\n"
+                       f"{http_ms} / {discord_ms} / {compute_ms}")
+            )
+        http_stats = http_client.stats()
+        embed.add_field(name="HTTP Client",
+                        value=f"{http_stats['requests']} requests, {http_stats['reused']} reused, {http_stats['handshakes']} handshakes",
+                        inline=False)
+        embed.add_field(name="Startup",
+                        value=f"cogs loaded in {startup_times.get('cogs', 0):.0f}ms, "
+                              f"ready {startup_times.get('ready', 0):.1f}s after starting",
+                        inline=False)
+        embed.add_field(name="Cogs (last load)",
+                        value=", ".join(f"{name.removeprefix('cogs.')} {ms:.0f}ms"
+                                        for name, ms in extension_times.items()) or "None",
+                        inline=False)
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) used $metrics command", ctx.author, ctx.author.id)
+
+    @commands.command(description="Sync application commands globally, --force to sync even if nothing changed (dotz only)", hidden=True)
+    @commands.is_owner()
+    async def synctree(self, ctx, flag: str = None):  # this entire command is written by copilot gpt5
+        force = flag in ("--force", "-f", "force")
+        embed = discord.Embed(
+            title="Syncing application commands",
+            description="Attempting global sync..." + (" (forced)" if force else ""),
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+
+        try:
+            if not await sync_tree(force=force):
+                embed = discord.Embed(
+                    title="Global sync skipped",
+                    description="Application commands haven't changed since the last sync. Use `$synctree --force` to sync anyway.",
+                    color=discord.Color.gold()
+                )
+                await send_reply(ctx, embed=embed, mention_author=True)
+                logging.info("%s (%s) ran $synctree: nothing changed, skipped",
+                             ctx.author, ctx.author.id)
+                return
+            embed = discord.Embed(
+                title="Global sync complete",
+                description="Application commands have been synced globally.",
+                color=discord.Color.green()
+            )
+            await send_reply(ctx, embed=embed, mention_author=True)
+            logging.info("%s (%s) ran $synctree: global sync successful",
+                         ctx.author, ctx.author.id)
+        except Exception as e:
+            embed = discord.Embed(
+                title="Global sync failed",
+                description=f"Failed to sync application commands globally: {e}",
+                color=discord.Color.red()
+            )
+            await send_reply(ctx, embed=embed, mention_author=True)
+            logging.exception(
+                "Failed to globally sync application commands via $synctree (%s)", e)
+
+    @commands.command(description="Reload a cog without restarting, like $reload fun (dotz only)", hidden=True)
+    @commands.is_owner()
+    async def reload(self, ctx, name: str):
+        extension = name if name.startswith("cogs.") else f"cogs.{name}"
+        if extension not in EXTENSIONS and extension not in LAZY_EXTENSIONS:
+            cogs = ", ".join(cog.removeprefix("cogs.") for cog in (*EXTENSIONS, *LAZY_EXTENSIONS))
+            await send_reply(ctx, f"There's no cog called {name}, try one of: {cogs}", mention_author=True)
+            return
+
+        try:
+            elapsed = await load_cog(extension)
+        except commands.ExtensionError as e:  # The old version keeps running
+            embed = discord.Embed(
+                title=f"Reloading {extension} failed",
+                description=f"{type(e).__name__}: {e.__cause__ or e}",
+                color=discord.Color.red()
+            )
+            embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+            await send_reply(ctx, embed=embed, mention_author=True)
+            logging.exception("%s (%s) failed to reload %s", ctx.author, ctx.author.id, extension)
+            return
+
+        description = f"Took {elapsed:.1f}ms"
+        if get_tree_fingerprint() != load_tree_hashes().get("global"):
+            description += "\nApplication commands changed, run `$synctree` so discord sees them"
+        embed = discord.Embed(title=f"Reloaded {extension}", description=description, color=discord.Color.green())
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) reloaded %s in %.1fms", ctx.author, ctx.author.id, extension, elapsed)
+
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
@@ -0,0 +1,311 @@
+# --- Imports ---
+
+
+# Standard library
+import asyncio
+import logging
+import secrets
+
+# Third-party
+import discord
+from discord.ext import commands, tasks
+
+# dotzbot
+from dotzbot import CategoryCog, TimerWheel, get_env_int, layout_only, send_reply, stats_store, timed_callback
+
+
+# --- BLACKJACK ---
+
+
+DECKS_PER_SHOE = 6
+RESHUFFLE_AT = 0.75  # reshuffle before a new hand once 3/4 of the shoe is dealt
+IDLE_TIMEOUT = get_env_int("BLACKJACK_IDLE_TIMEOUT", 120)  # seconds without a click before a table gets closed
+
+# Cards are ints 0-51, card % 13 is the rank (0 is a 2, 12 is an ace) and card // 13 the suit
+RANKS = ("2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A")
+SUITS = ("♠", "♥", "♦", "♣")
+CARD_NAMES = tuple(f"{rank}{suit}" for suit in SUITS for rank in RANKS)
+CARD_VALUES = (2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11)  # aces get knocked down to 1 in hand_value
+ACE = 12
+
+# result -> what the embed says and it's color
+RESULTS = {
+    "blackjack": ("Blackjack! You win", discord.Color.green()),
+    "win": ("You win!", discord.Color.green()),
+    "loss": ("Dealer wins", discord.Color.red()),
+    "push": ("Push, nobody wins", discord.Color.yellow())
+}
+
+shuffler = secrets.SystemRandom()
+
+
+def hand_value(hand):
+    """Best total for a hand, and if it's soft (an ace still counting as 11)."""
+    total = 0
+    aces = 0
+    for card in hand:
+        rank = card % 13
+        total += CARD_VALUES[rank]
+        aces += rank == ACE
+    while total > 21 and aces:
+        total -= 10
+        aces -= 1
+    return total, aces > 0
+
+
+def show_hand(hand):
+    return " ".join(CARD_NAMES[card] for card in hand)
+
+
+class Shoe:
+    """DECKS_PER_SHOE decks in one bytearray, every table in a channel deals from the same one."""
+
+    __slots__ = ("cards", "position")
+
+    def __init__(self):
+        self.cards = bytearray(range(52)) * DECKS_PER_SHOE
+        self.position = 0
+        self.shuffle()
+
+    def shuffle(self):
+        order = list(self.cards)
+        shuffler.shuffle(order)
+        self.cards[:] = order
+        self.position = 0
+
+    def needs_shuffle(self):
+        return self.position >= len(self.cards) * RESHUFFLE_AT
+
+    def draw(self):
+        if self.position == len(self.cards):  # Lots of tables at once in one channel, shouldn't really happen
+            self.shuffle()
+        card = self.cards[self.position]
+        self.position += 1
+        return card
+
+
+class Table:
+    """One player against the dealer. Hands are bytearrays of cards, result is None until it's over."""
+
+    __slots__ = ("player_id", "channel_id", "shoe", "player", "dealer", "doubled", "result")
+
+    def __init__(self, player_id, channel_id, shoe):
+        self.player_id = player_id
+        self.channel_id = channel_id
+        self.shoe = shoe
+        draw = shoe.draw
+        self.player = bytearray((draw(), draw()))
+        self.dealer = bytearray((draw(), draw()))
+        self.doubled = False
+        self.result = None
+
+        # Naturals end it right away, the dealer peeks like in a casino
+        player_blackjack = hand_value(self.player)[0] == 21
+        dealer_blackjack = hand_value(self.dealer)[0] == 21
+        if player_blackjack and dealer_blackjack:
+            self.result = "push"
+        elif player_blackjack:
+            self.result = "blackjack"
+        elif dealer_blackjack:
+            self.result = "loss"
+
+    def can_double(self):
+        return len(self.player) == 2 and self.result is None
+
+    def act(self, action):
+        """hit, stand or double. Returns False if that move isn't allowed right now."""
+        if self.result is not None:
+            return False
+        if action == "hit":
+            self.player.append(self.shoe.draw())
+            if hand_value(self.player)[0] >= 21:  # Bust, or 21 and there's nothing left to do
+                self.finish()
+        elif action == "stand":
+            self.finish()
+        elif action == "double":
+            if not self.can_double():
+                return False
+            self.doubled = True
+            self.player.append(self.shoe.draw())
+            self.finish()
+        else:
+            return False
+        return True
+
+    def finish(self):
+        player_total = hand_value(self.player)[0]
+        if player_total > 21:
+            self.result = "loss"
+            return
+        # Dealer hits until 17 and stands on soft 17
+        while hand_value(self.dealer)[0] < 17:
+            self.dealer.append(self.shoe.draw())
+        dealer_total = hand_value(self.dealer)[0]
+        if dealer_total > 21 or player_total > dealer_total:
+            self.result = "win"
+        elif player_total < dealer_total:
+            self.result = "loss"
+        else:
+            self.result = "push"
+
+
+def render(table, player):
+    """The embed for a table, the dealer's second card stays hidden until it's over."""
+    player_total, soft = hand_value(table.player)
+    if table.result is None:
+        dealer = f"{CARD_NAMES[table.dealer[0]]} ??"
+        description = "Hit, stand or double?"
+        color = discord.Color.gold()
+    else:
+        dealer = f"{show_hand(table.dealer)} ({hand_value(table.dealer)[0]})"
+        description, color = RESULTS[table.result]
+        if table.doubled:
+            description += " (doubled)"
+
+    embed = discord.Embed(title="Blackjack", description=description, color=color)
+    embed.add_field(name="Your hand",
+                    value=f"{show_hand(table.player)} ({'soft ' if soft and player_total < 21 else ''}{player_total})",
+                    inline=False)
+    embed.add_field(name="Dealer", value=dealer, inline=False)
+    embed.set_footer(text=f"Requested by {player} ({player.id})")
+    return embed
+
+
+class BlackjackView(discord.ui.View):
+    """Hit/stand/double buttons. The one from cog_load is persistent and handles the clicks
+    for every table (the custom_id says what, the message id says which table), so there's
+    no view or timeout per game. The ones in Blackjack.layouts are only for drawing the buttons."""
+
+    def __init__(self, cog, can_double=True):
+        super().__init__(timeout=None)  # Has to be None to be persistent
+        self.cog = cog
+        self.double.disabled = not can_double
+
+    @discord.ui.button(label="Hit", style=discord.ButtonStyle.green, custom_id="blackjack:hit")
+    @timed_callback("blackjack:hit")
+    async def hit(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.play(interaction, "hit")
+
+    @discord.ui.button(label="Stand", style=discord.ButtonStyle.red, custom_id="blackjack:stand")
+    @timed_callback("blackjack:stand")
+    async def stand(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.play(interaction, "stand")
+
+    @discord.ui.button(label="Double", style=discord.ButtonStyle.blurple, custom_id="blackjack:double")
+    @timed_callback("blackjack:double")
+    async def double(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.play(interaction, "double")
+
+
+class Blackjack(CategoryCog):
+    category = "minigame"
+    kept = ("tables", "playing", "shoes", "idle")
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.tables = {}  # message id -> Table
+        self.playing = {}  # (channel id, player id) -> message id, one table per person per channel
+        self.shoes = {}  # channel id -> Shoe
+        self.idle = TimerWheel(tick=1, max_delay=IDLE_TIMEOUT)  # message ids
+        self.view = BlackjackView(self)
+        self.layouts = {can_double: layout_only(BlackjackView(None, can_double)) for can_double in (True, False)}
+
+    async def cog_load(self):
+        self.bot.add_view(self.view)
+        self.evict_idle.start()
+
+    async def cog_unload(self):
+        self.view.stop()  # Takes it out of the view store, the reloaded cog adds it's own
+        self.evict_idle.cancel()
+        if self.tables:  # A reload hands them to the new cog, shutting down just leaves them
+            logging.info("Unloading with %s open blackjack tables", len(self.tables))
+
+    def close(self, message_id):
+        table = self.tables.pop(message_id, None)
+        if table is not None:
+            self.playing.pop((table.channel_id, table.player_id), None)
+            self.idle.cancel(message_id)
+        return table
+
+    def finish(self, table, player):
+        stats_store.record(table.player_id, "blackjack", table.result)
+        logging.info("%s (%s) %s at blackjack with %s against %s%s", player, player.id, table.result,
+                     hand_value(table.player)[0], hand_value(table.dealer)[0], " (doubled)" if table.doubled else "")
+
+    @commands.command(description="Literally just blackjack", aliases=["bj"])
+    async def blackjack(self, ctx):
+        key = (ctx.channel.id, ctx.author.id)
+        if key in self.playing:
+            await send_reply(ctx, "You already have a table open here, finish that one first!", mention_author=True)
+            return
+
+        shoe = self.shoes.get(ctx.channel.id)
+        if shoe is None:
+            shoe = self.shoes[ctx.channel.id] = Shoe()
+        elif shoe.needs_shuffle():
+            shoe.shuffle()
+        table = Table(ctx.author.id, ctx.channel.id, shoe)
+
+        if table.result is not None:  # Natural, nothing to click
+            self.finish(table, ctx.author)
+            await send_reply(ctx, embed=render(table, ctx.author), mention_author=True)
+            return
+
+        self.playing[key] = None  # Taken before the await so spamming $bj can't open two
+        message = None
+        try:
+            message = await send_reply(ctx, embed=render(table, ctx.author), view=self.layouts[True],
+                                       mention_author=True)
+        finally:
+            if message is None:  # Failed, or dropped by the outbound scheduler since the channel's too busy
+                del self.playing[key]
+        if message is None:
+            return
+        self.tables[message.id] = table
+        self.playing[key] = message.id
+        self.idle.schedule(message.id, IDLE_TIMEOUT)
+        logging.info("%s (%s) opened a blackjack table", ctx.author, ctx.author.id)
+
+    async def play(self, interaction, action):
+        message_id = interaction.message.id
+        table = self.tables.get(message_id)
+        if table is None:
+            await interaction.response.send_message("This table is closed, open a new one with $blackjack",
+                                                    ephemeral=True)
+            return
+        if interaction.user.id != table.player_id:
+            await interaction.response.send_message("That's not your table, open your own with $blackjack!",
+                                                    ephemeral=True)
+            return
+        if not table.act(action):
+            await interaction.response.send_message("You can only double on your first two cards", ephemeral=True)
+            return
+
+        if table.result is None:
+            self.idle.schedule(message_id, IDLE_TIMEOUT)
+            view = self.layouts[table.can_double()]
+        else:
+            self.close(message_id)
+            self.finish(table, interaction.user)
+            view = None
+        await interaction.response.edit_message(embed=render(table, interaction.user), view=view)
+
+    @tasks.loop(seconds=1)  # Same as the wheel's tick
+    async def evict_idle(self):
+        expired = self.idle.advance()
+        if expired:
+            await asyncio.gather(*(self.expire(message_id) for message_id in expired))
+
+    async def expire(self, message_id):
+        table = self.close(message_id)
+        if table is None:
+            return
+        message = self.bot.get_partial_messageable(table.channel_id).get_partial_message(message_id)
+        try:
+            await message.edit(content=f"This table closed after {IDLE_TIMEOUT}s without a move", view=None)
+        except discord.HTTPException:
+            pass  # Message got deleted, nothing to close
+
+
+async def setup(bot):
+    await bot.add_cog(Blackjack(bot))
@@ -0,0 +1,106 @@
+# --- Imports ---
+
+
+# Standard library
+import asyncio
+import logging
+import secrets
+
+# Third-party
+import aiohttp
+import discord
+from discord.ext import commands
+
+# dotzbot
+from dotzbot import (BufferReader, CategoryCog, CircuitOpenError, MEME_API, RetryableError, fetch_meme,
+                     meme_buffer, send_reply, stats_store)
+
+
+# --- FUN COMMANDS ---
+
+
+class Fun(CategoryCog):
+    category = "fun"
+
+    @commands.hybrid_command(with_app_command=True, description="Get a random meme", aliases=["memes"],
+                             extras={"latency_budget": 2.0})  # seconds, a live fetch when the buffer is empty can take a while
+    async def meme(self, ctx):
+        item = meme_buffer.pop()  # Already downloaded, almost instant
+        if item is None:  # Buffer is empty, so get one live like before
+            try:
+                item = await fetch_meme()
+            except (RetryableError, CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                await send_reply(ctx, "Couldn't get a meme right now, try again later", mention_author=True)
+                logging.info("%s's request for a meme failed (%s)", ctx.author, e)
+                return
+
+        embed = discord.Embed(
+            title=item["title"],
+            description=f"r/{item['subreddit']}",
+            color=discord.Color.green()
+        )
+        embed.add_field(name="API", value=MEME_API)
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        if item["image"] is None:  # Too big to re-upload, discord loads it from reddit instead
+            embed.set_image(url=item["url"])
+            await send_reply(ctx, embed=embed, mention_author=True)
+        else:
+            file = discord.File(fp=BufferReader(item["image"]), filename=item["filename"])
+            embed.set_image(url=f"attachment://{item['filename']}")
+            await send_reply(ctx, embed=embed, file=file, mention_author=True)
+        logging.info("%s (%s) fetched meme %s",
+                     ctx.author, ctx.author.id, item["postLink"])
+
+    @commands.hybrid_command(with_app_command=True, description="Roll an X sided dice", aliases=["dice", "dice_roll", "diceroll", "rolldice", "roll_dice"])
+    async def roll(self, ctx, dice_sides: int = 100):
+        if dice_sides <= 0:  # If equal or less
+            embed = discord.Embed(
+                title="Dice Roll",
+                description=f"{ctx.author.mention} just tried to roll a {dice_sides}-sided dice",
+                color=discord.Color.red()
+            )
+            embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+            await send_reply(ctx, embed=embed, mention_author=True)
+            logging.info("%s (%s) just tried to roll a %s-sided dice",
+                         ctx.author, ctx.author.id, dice_sides)
+            return  # to not continue code
+
+        dice_roll = 1 + secrets.randbelow(dice_sides)
+        stats_store.record(ctx.author.id, "roll", "max" if dice_roll == dice_sides else "normal")
+        embed = discord.Embed(
+            title="Dice Roll",
+            description=f"{ctx.author.mention} rolled a {dice_sides}-sided dice and got {dice_roll}",
+            color=discord.Color.green()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) rolled a %s-sided dice and got %s",
+                     ctx.author, ctx.author.id, dice_sides, dice_roll)
+
+    @commands.hybrid_command(with_app_command=True, description="Flip a coin, Heads or tails?", aliases=["cf", "coin", "flip", "flipacoin"])
+    async def coinflip(self, ctx, heads: str = None, tails: str = None):
+        coin_sides = ["heads", "tails"]
+        coin = secrets.choice(coin_sides)
+        stats_store.record(ctx.author.id, "coinflip", coin)
+        if heads is None and tails is None:
+            embed = discord.Embed(
+                title="Coin Flip",
+                description=f"{ctx.author.mention} flipped a coin and it landed on {coin}",
+                color=discord.Color.green()
+            )
+        else:
+            embed = discord.Embed(
+                title="Coin Flip",
+                description=f"{ctx.author.mention} flipped a coin and it landed on {coin}",
+                color=discord.Color.green()
+            )
+            embed.add_field(name="", value=f"Heads is \"{heads}\"")
+            embed.add_field(name="", value=f"Tails is \"{tails}\"")
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s's (%s) coin landed on %s",
+                     ctx.author, ctx.author.id, coin)
+
+
+async def setup(bot):
+    await bot.add_cog(Fun(bot))
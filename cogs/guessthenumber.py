@@ -0,0 +1,121 @@
+# --- Imports ---
+
+
+# Standard library
+import logging
+import secrets
+
+# Third-party
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+# dotzbot
+from dotzbot import CategoryCog, get_env_int, message_router, reply_to, send_reply, send_to, stats_store
+
+
+# --- GUESS THE NUMBER ---
+
+
+DEFAULT_MAX = 100
+HIGHEST_MAX = 1_000_000
+IDLE_TIMEOUT = get_env_int("GUESS_IDLE_TIMEOUT", 60)  # seconds without a guess before the game ends
+
+
+class Session:
+    """One person's game in one channel."""
+
+    __slots__ = ("number", "maximum", "guesses")
+
+    def __init__(self, maximum):
+        self.number = 1 + secrets.randbelow(maximum)
+        self.maximum = maximum
+        self.guesses = 0
+
+
+class GuessTheNumber(CategoryCog):
+    category = "minigame"
+    kept = ("sessions",)  # The routes for them get pointed at the reloaded cog too
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        # (channel id, user id) -> Session. Guesses get here through the message router,
+        # so there's no wait_for per game, and games in one channel don't get in each other's way
+        self.sessions = {}
+
+    @commands.hybrid_command(with_app_command=True, description="Can you guess the bot's number?", aliases=["gnm"])
+    @app_commands.describe(maximum=f"Highest the number can be, defaults to {DEFAULT_MAX}")
+    async def guessthenumber(self, ctx, maximum: int = DEFAULT_MAX):
+        key = (ctx.channel.id, ctx.author.id)
+        if key in self.sessions:
+            await send_reply(ctx, "You've already got a game going here, just type a number!", mention_author=True)
+            return
+        if not 2 <= maximum <= HIGHEST_MAX:
+            await send_reply(ctx, f"Pick a maximum between 2 and {HIGHEST_MAX:,}", mention_author=True)
+            return
+
+        # Open before the reply goes out, so a fast guess doesn't get missed
+        self.sessions[key] = Session(maximum)
+        message_router.add(*key, self.guess, timeout=IDLE_TIMEOUT, on_timeout=self.give_up)
+
+        embed = discord.Embed(
+            title="Guess the Number",
+            description=f"I'm thinking of a number between 1 and {maximum:,}, type your guesses in chat!\n"
+                        f"The game ends after {IDLE_TIMEOUT} seconds without a guess.",
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        message = await send_reply(ctx, embed=embed, mention_author=True)
+        if message is None:  # Dropped by the outbound scheduler, nobody knows there's a game
+            self.close(*key)
+            return
+        logging.info("%s (%s) started guess the number up to %s", ctx.author, ctx.author.id, maximum)
+
+    def close(self, channel_id, user_id):
+        message_router.remove(channel_id, user_id)
+        return self.sessions.pop((channel_id, user_id), None)
+
+    async def guess(self, message):
+        """Gets every message from someone with a game going in that channel, through the message router."""
+        content = message.content.strip()
+        if not content.isdecimal() or len(content) > 7:  # Just talking, not a guess
+            return
+        key = (message.channel.id, message.author.id)
+        session = self.sessions.get(key)
+        if session is None:
+            return
+
+        number = int(content)
+        session.guesses += 1
+        if number == session.number:
+            self.close(*key)
+            stats_store.record(message.author.id, "guessthenumber", "win")
+            logging.info("%s (%s) guessed %s in %s guesses", message.author, message.author.id,
+                         session.number, session.guesses)
+            await reply_to(message, f"You got it! It was **{session.number}**, that took you {session.guesses} "
+                                    f"{'guess' if session.guesses == 1 else 'guesses'}", category=self.category)
+            return
+
+        message_router.touch(*key, IDLE_TIMEOUT)
+        if not 1 <= number <= session.maximum:
+            hint = f"It's between 1 and {session.maximum:,}, silly"
+        elif number < session.number:
+            hint = "Higher!"
+        else:
+            hint = "Lower!"
+        await reply_to(message, hint, category=self.category)
+
+    async def give_up(self, channel_id, user_id):
+        session = self.sessions.pop((channel_id, user_id), None)
+        if session is None:
+            return
+        stats_store.record(user_id, "guessthenumber", "loss")
+        try:
+            await send_to(self.bot.get_partial_messageable(channel_id),
+                          f"<@{user_id}> took too long, the number was **{session.number}**", category=self.category)
+        except discord.HTTPException:
+            pass  # Channel's gone or we can't talk there anymore
+
+
+async def setup(bot):
+    await bot.add_cog(GuessTheNumber(bot))
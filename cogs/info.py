@@ -0,0 +1,365 @@
+# --- Imports ---
+
+
+# Standard library
+import asyncio
+import logging
+import platform
+from collections import defaultdict
+
+# Third-party
+import aiohttp
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+# dotzbot
+from dotzbot import (CategoryCog, CircuitOpenError, RetryableError, commit_cache,
+                     get_command_count, get_member_lazy, get_uptime, handler, help_catalogue,
+                     http_client, is_owner_cached, meme_buffer, send_reply, stats_store, timed_callback,
+                     user_cache)
+
+
+# --- INFO COMMANDS ---
+
+
+# What $stats shows for each game, {total} is every result added up
+STATS_FIELDS = (
+    ("highcard", "High Card", "{win} wins, {loss} losses, {tie} ties"),
+    ("rps", "Rock Paper Scissors", "{win} wins, {loss} losses, {tie} ties"),
+    ("blackjack", "Blackjack", "{win} wins (+{blackjack} blackjacks), {loss} losses, {push} pushes"),
+    ("poker", "Poker", "{win} wins, {split} split pots, {loss} losses"),
+    ("trivia", "Trivia", "{win} questions answered right"),
+    ("guessthenumber", "Guess the Number", "{win} guessed, {loss} ran out of time"),
+    ("roll", "Dice", "{total} rolls, {max} max rolls"),
+    ("coinflip", "Coin Flip", "{heads} heads, {tails} tails"),
+    ("eightball", "8 Ball", "{yes} yes, {no} no, {unknown} unsure")
+)
+
+
+class HelpView(discord.ui.View):
+    """Previous/next buttons for the $help pages, only the person who ran it can use them."""
+
+    def __init__(self, pages, author):
+        super().__init__(timeout=120)
+        self.pages = pages
+        self.page = 0
+        self.author = author
+        self.message = None
+        self.update_buttons()
+
+    def render(self):
+        embed = self.pages[self.page].copy()  # the catalogue's pages are shared
+        embed.set_footer(
+            text=f"Requested by {self.author} ({self.author.id}) | Page {self.page + 1}/{len(self.pages)}")
+        return embed
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page == len(self.pages) - 1
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author.id:
+            await interaction.response.send_message("That's not your $help, run it yourself!", ephemeral=True)
+            return False
+        return True
+
+    async def turn(self, interaction, step):
+        self.page += step
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.grey)
+    @timed_callback("help:previous")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, -1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.grey)
+    @timed_callback("help:next")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.turn(interaction, 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass  # message got deleted, nothing to disable
+
+
+class Info(CategoryCog):
+    category = "info"
+
+    @commands.hybrid_command(with_app_command=True, description="Shows this list!", aliases=["?"])
+    async def help(self, ctx):  # skipcq: PYL-W0622
+        # Hidden commands only show up for the bot owner
+        pages = help_catalogue.get_pages(await is_owner_cached(ctx.author))
+        view = HelpView(pages, ctx.author)
+        if len(pages) == 1:  # No need for buttons
+            await send_reply(ctx, embed=view.render(), mention_author=True)
+        else:
+            view.message = await send_reply(ctx, embed=view.render(), view=view, mention_author=True)
+        logging.info("%s (%s) used the $help command", ctx.author, ctx.author.id)
+
+    @commands.hybrid_command(with_app_command=True, description="Show the bot's latency", aliases=["latency", "lag", "ms"])
+    async def ping(self, ctx):
+        # Copilot told me to multiply this by a thousand so
+        latency = round(self.bot.latency * 1000)
+        embed = discord.Embed(
+            title="Pong!",
+            description=f"Latency: {latency} ms",
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) used the $ping command (%sms)",
+                     ctx.author, ctx.author.id, latency)
+
+    @commands.hybrid_command(with_app_command=True, description="Show how long the bot has been running", aliases=["lifetime", "upkeep"])
+    async def uptime(self, ctx):
+        uptime_str = get_uptime()
+        embed = discord.Embed(
+            title="dotzbot's Uptime",
+            description=f"The bot has been running for: {uptime_str}",
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) used the $uptime command (%s)",
+                     ctx.author, ctx.author.id, uptime_str)
+
+    @commands.hybrid_command(with_app_command=True, description="General info about the bot", aliases=["bot", "about"],
+                             extras={"latency_budget": 2.0})  # the first github fetch
+    async def botinfo(self, ctx):
+        # Fetch commit code, by chatgpt ofc
+        try:  # Only waits on github the very first time, after that it's cached
+            latest_commit = await commit_cache.get()
+            commit_msg = latest_commit["commit"]["message"]
+            commit_url = latest_commit["html_url"]
+            commit_sha = latest_commit["sha"][:7]  # short sha
+            commit_age = f" (checked {int(commit_cache.age)}s ago)"
+        except (RetryableError, CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError):
+            commit_msg = "Could not fetch"
+            commit_url = ""
+            commit_sha = ""
+            commit_age = ""
+
+        visible, hidden = get_command_count(self.bot)
+        total = visible + hidden
+
+        embed = discord.Embed(
+            title="dotzbot",
+            description="By <@550378971426979856> / Open-Source!",
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        embed.add_field(name="Open-Source Info", value=f"", inline=False)
+        embed.add_field(name="GitHub Link",
+                        value="[dotztv/dotzbot](https://github.com/dotztv/dotzbot)")
+        embed.add_field(name="Latest Commit",
+                        value=f"[{commit_sha}]({commit_url}){commit_age}")
+        embed.add_field(name="Commit Message", value=commit_msg)
+        embed.add_field(name="Support", value="", inline=False)
+        embed.add_field(name="Discord Server",
+                        value="[dotz's corner](https://discord.gg/WgzRu2NB7S)")
+        embed.add_field(name="Developer DMs", value="@<550378971426979856>")
+        embed.add_field(name="Software", value="", inline=False)
+        embed.add_field(name="discord.py version", value=discord.__version__)
+        embed.add_field(name="Python Version", value=platform.python_version())
+        embed.add_field(name="Hosting", value="", inline=False)
+        embed.add_field(name="Machine", value="Raspberry Pi 5")
+        embed.add_field(name="Model", value="4GB Model")
+        embed.add_field(name="Statistics", value="", inline=False)
+        embed.add_field(name="Current Log Length",
+                        value=f"{handler.lines} lines ({handler.bytes // 1024}KB)")
+        embed.add_field(name="Server Count", value=len(self.bot.guilds))
+        http_stats = http_client.stats()
+        embed.add_field(name="HTTP Connections",
+                        value=f"{http_stats['reused']} reused / {http_stats['handshakes']} new")
+        embed.add_field(name="Meme Buffer",
+                        value=f"{len(meme_buffer)} ready ({meme_buffer.hits} hits / {meme_buffer.misses} misses)")
+        # for example, 9 total commands, 2 of which are hidden.
+        embed.add_field(name="Command Amount", value=f"{total} ({hidden})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) used the $botinfo command",
+                     ctx.author, ctx.author.id)
+
+    @commands.hybrid_command(with_app_command=True, description="Get info about a User", aliases=["user", "checkuser"],
+                             extras={"intents": ("members",),  # joined_at and roles
+                                     "latency_budget": 1.5})  # fetch_user + maybe asking the gateway for the member
+    async def userinfo(self, ctx, user_id: str = None):  # Defaults arg to None, unless provided
+        embed = discord.Embed(  # Default embed in case user_id is not set
+            title="$userinfo wrong usage",
+            description="You're supposed to provide a user with a ping or their ID",
+            color=discord.Color.red()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+
+        if isinstance(user_id, str):
+            # Removes ping casing to get ID only
+            user_id = user_id.replace("<@", "").replace("!", "").replace(">", "")
+        else:  # If user_id wasn't provided, send the error
+            await send_reply(ctx, embed=embed, mention_author=True)
+            logging.info("%s (%s) failed to use $userinfo (%s)",
+                         ctx.author, ctx.author.id, ctx.message.content)
+            return
+
+        try:  # if it isn't an ID, it'll raise ValueError and send the error message
+            user_id = int(user_id)
+        except ValueError:  # If it's not a UserID but instead some failed ping or something
+            await send_reply(ctx, embed=embed, mention_author=True)
+            logging.info("%s (%s) failed to use $userinfo (%s)",
+                         ctx.author, ctx.author.id, ctx.message.content)
+            return
+
+        # gets member object if in a server -github copilot, from the cache when it's there
+        member_obj = await get_member_lazy(ctx.guild, user_id) if ctx.guild else None
+        if member_obj is None:  # Not in this server (or a DM), so the API is the only way to get them
+            user = await user_cache.get(user_id)
+        else:  # The member has everything but the banner, only show it if we've fetched them recently anyways
+            user = user_cache.peek(user_id)
+        if user is None and member_obj is None:  # User doesn't exist
+            await send_reply(ctx, "User doesn't seem to exist? Try again with copying their ID or pinging them", mention_author=True)
+            logging.error("%s (%s) provided a user we couldn't fetch? (%s)",
+                          ctx.author, ctx.author.id, ctx.message.content)
+            return
+        # not going to lie, i dont know why this is here but i'm too scared to remove it
+        target_user = member_obj if member_obj else user
+
+        # Special people
+        if user_id == 550378971426979856:  # dotz
+            description = "Hey, It's my creator!"
+        elif user_id == 1267637358942224516:  # dotzbot
+            description = "Wait a minute, that's me!"
+        else:  # literally nobody
+            description = ""
+
+        embed = discord.Embed(  # Changes the embed to the actual user info
+            title="User Information",
+            description=description,
+            color=discord.Color.green()
+        )
+        # Stuff the bot can fetch anyways
+        embed.add_field(name="Username", value=target_user.name)
+        embed.add_field(name="User ID", value=str(target_user.id))
+        embed.add_field(name="Account Created",
+                        value=target_user.created_at.strftime("%Y-%m-%d %H:%M:%S"))
+        embed.add_field(name="Bot?", value="Yes" if target_user.bot else "No")
+
+        if target_user.avatar:  # If they have a custom pfp
+            # Sets user's pfp as thumbnail (small, top right)
+            embed.set_thumbnail(url=target_user.avatar.url)
+
+        # Stuff the bot can only fetch from a server
+        if member_obj and member_obj.joined_at:  # If run in a server
+            embed.add_field(name="Joined Server",
+                            value=member_obj.joined_at.strftime("%Y-%m-%d %H:%M:%S"))
+
+        if member_obj and member_obj.roles:
+            embed.add_field(
+                name="Roles",
+                value=", ".join(
+                    [role.name for role in member_obj.roles if role.name != "@everyone"])
+            )
+
+        # Nitro users only
+        if hasattr(user, "banner") and user.banner:  # If they have a custom banner (Nitro Feature)
+            # Sets user's banner as image (big, underneath)
+            embed.set_image(url=user.banner.url)
+
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) used %s", ctx.author,
+                     ctx.author.id, ctx.message.content)
+
+    @commands.hybrid_command(with_app_command=True, description="Get info about the current server", aliases=["server", "checkserver"],
+                             extras={"intents": ("members",)})  # server owner
+    async def serverinfo(self, ctx):
+        if ctx.guild:  # if run in a server (True)
+            server_name = ctx.guild.name
+            embed_desc = ""
+            embed_color = discord.Color.green()
+        else:  # if not run a in a server, therefore DM (False)
+            server_name = "This is a DM"
+            embed_desc = "But I'll try to give you some information anyways"
+            embed_color = discord.Color.gold()
+
+        embed = discord.Embed(
+            title=server_name,
+            description=embed_desc,
+            color=embed_color
+        )
+
+        if ctx.guild:  # If run in a server
+            if ctx.guild.icon:
+                embed.set_thumbnail(url=ctx.guild.icon.url)
+            if ctx.guild.description:
+                embed.add_field(name="Server Description", value=str(
+                    ctx.guild.description), inline=False)
+            embed.add_field(name="Server ID", value=str(ctx.guild.id), inline=True)
+            embed.add_field(name="Server Creation Date", value=ctx.guild.created_at.strftime(
+                "%Y-%m-%d %H:%M:%S"), inline=True)
+            embed.add_field(name="Server Member Count", value=str(
+                ctx.guild.member_count), inline=True)
+            owner = ctx.guild.owner or await get_member_lazy(ctx.guild, ctx.guild.owner_id)
+            embed.add_field(name="Server Owner", value=str(owner), inline=True)
+            embed.add_field(name="Verification Level", value=str(
+                ctx.guild.verification_level), inline=True)
+            embed.add_field(name="AFK Channel", value=str(
+                ctx.guild.afk_channel), inline=True)
+            embed.add_field(name="AFK Timeout", value=str(
+                ctx.guild.afk_timeout), inline=True)
+            embed.add_field(name="Server Boosts", value=str(
+                ctx.guild.premium_subscription_count), inline=True)
+            embed.add_field(name="Server Features", value=str(
+                ctx.guild.features), inline=False)
+        else:  # If not run in a server, therefore DM
+            embed.add_field(name="Channel ID", value=str(
+                ctx.channel.id), inline=True)
+            embed.add_field(name="Channel Creation Date", value=ctx.channel.created_at.strftime(
+                "%Y-%m-%d %H:%M:%S"), inline=True)
+            embed.add_field(name="Channel Type", value=str(
+                ctx.channel.type), inline=True)
+            embed.add_field(name="Your Username",
+                            value=ctx.author.name, inline=True)
+            embed.add_field(name="Your User ID", value=str(
+                ctx.author.id), inline=True)
+            embed.add_field(name="Your Account Created", value=ctx.author.created_at.strftime(
+                "%Y-%m-%d %H:%M:%S"), inline=True)
+            embed.add_field(name="Are you a bot?",
+                            value="Yes" if ctx.author.bot else "No", inline=True)
+            if ctx.author.avatar:
+                # Sets user's pfp as thumbnail (small, top right)
+                embed.set_thumbnail(url=ctx.author.avatar.url)
+
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) used the $serverinfo command in %s",
+                     ctx.author, ctx.author.id, ctx.guild)
+
+    @commands.hybrid_command(with_app_command=True, description="Minigame stats for you or someone else", aliases=["stat", "wins"])
+    @app_commands.describe(user="Whose stats, defaults to you")
+    async def stats(self, ctx, user: discord.User = None):
+        user = user or ctx.author
+        summary = await stats_store.get(user.id)  # From memory, only the first lookup for a user hits the database
+        embed = discord.Embed(
+            title=f"{user.display_name}'s stats",
+            description="" if summary else "No games played yet!",
+            color=discord.Color.gold()
+        )
+        for game, name, template in STATS_FIELDS:
+            counts = defaultdict(int, {result: times for (stat_game, result), times in summary.items()
+                                       if stat_game == game})
+            if counts:
+                counts["total"] = sum(counts.values())
+                embed.add_field(name=name, value=template.format_map(counts), inline=False)
+        played = sum(stats_store.totals.values())
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id}) | {played} games played by everyone")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        logging.info("%s (%s) used the $stats command for %s (%s)",
+                     ctx.author, ctx.author.id, user, user.id)
+
+
+async def setup(bot):
+    await bot.add_cog(Info(bot))
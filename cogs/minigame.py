@@ -0,0 +1,199 @@
+# --- Imports ---
+
+
+# Standard library
+import logging
+import secrets
+
+# Third-party
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+# dotzbot
+from dotzbot import CategoryCog, send_reply, stats_store
+
+
+# --- MINIGAME COMMANDS ---
+
+
+class Minigame(CategoryCog):
+    category = "minigame"
+
+    @commands.hybrid_command(with_app_command=True, description="Highest card wins", aliases=["hc"])
+    async def highcard(self, ctx):
+        user_card = 1 + secrets.randbelow(13)
+
+        if user_card == 1:
+            user_card = 14
+            readable_user_card = "Ace"
+        elif user_card == 11:
+            readable_user_card = "Jack"
+        elif user_card == 12:
+            readable_user_card = "Queen"
+        elif user_card == 13:
+            readable_user_card = "King"
+        else:
+            readable_user_card = user_card
+
+        bot_card = 1 + secrets.randbelow(13)
+        if bot_card == 1:
+            bot_card = 14
+            readable_bot_card = "Ace"
+        elif bot_card == 11:
+            readable_bot_card = "Jack"
+        elif bot_card == 12:
+            readable_bot_card = "Queen"
+        elif bot_card == 13:
+            readable_bot_card = "King"
+        else:
+            readable_bot_card = bot_card
+
+        if user_card > bot_card:  # If user wins
+            stats_store.record(ctx.author.id, "highcard", "win")
+            embeddesc = f"{ctx.author.mention} won with a {readable_user_card} against {self.bot.user.mention}'s {readable_bot_card}"
+            embedcolor = discord.Color.green()
+            logging.info("%s (%s) won with a %s against %s's %s", ctx.author,
+                         ctx.author.id, readable_user_card, self.bot.user, readable_bot_card)
+        elif bot_card > user_card:  # or bot wins
+            stats_store.record(ctx.author.id, "highcard", "loss")
+            embeddesc = f"{self.bot.user.mention} won with a {readable_bot_card} against {ctx.author.mention}'s {readable_user_card}"
+            embedcolor = discord.Color.red()
+            logging.info("%s won with a %s against %s's (%s) %s", self.bot.user,
+                         readable_bot_card, ctx.author, ctx.author.id, readable_user_card)
+        else:  # or it's a tie
+            stats_store.record(ctx.author.id, "highcard", "tie")
+            embeddesc = f"It's a tie! Both drew a {readable_user_card}"
+            embedcolor = discord.Color.yellow()
+            logging.info("%s (%s) tied with %s with %s", ctx.author,
+                         ctx.author.id, self.bot.user, readable_user_card)
+
+        embed = discord.Embed(
+            title="High Card Result",
+            description=embeddesc,
+            color=embedcolor
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+
+    @commands.hybrid_command(with_app_command=True, description="Play Rock Paper Scissors, default choice is scissors")
+    @app_commands.describe(user_choice="Your choice: rock, paper or scissors")
+    async def rps(self, ctx, user_choice: str = None):
+        if isinstance(user_choice, str):  # If a choice was given (defined)
+            user_choice = user_choice.lower()  # Convert it to a string for future code use
+
+        rps_choices = ["rock", "paper", "scissors"]
+
+        # Default embed, when no choice is provided.
+        embed = discord.Embed(
+            title="$rps wrong usage",
+            description="You're supposed to say either rock, paper or scissors",
+            color=discord.Color.red()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+
+        if user_choice is None:
+            await send_reply(ctx, embed=embed, mention_author=True)  # Send default embed
+            logging.info(
+                "%s (%s) failed to provide either rock, paper or scissors", ctx.author, ctx.author.id)
+            return
+        else:
+            if user_choice not in rps_choices:  # If choice is defined, but not an available choice
+                # Also the default embed
+                await send_reply(ctx, embed=embed, mention_author=True)
+                logging.info("%s (%s) failed to provide either rock, paper or scissors (%s)",
+                             ctx.author, ctx.author.id, user_choice)  # it'll be funny to see typos
+                return  # to not process the rest of the code
+
+        bot_choice = secrets.choice(rps_choices)
+
+        beats = {  # Dictionary, way shorter if statement with this
+            "rock": "scissors",
+            "scissors": "paper",
+            "paper": "rock"}
+
+        # Winner check
+        if user_choice == bot_choice:
+            stats_store.record(ctx.author.id, "rps", "tie")
+            result = "It's a tie!"
+            color = discord.Color.gold()
+            logging.info("%s (%s) tied with %s using %s", ctx.author,
+                         ctx.author.id, self.bot.user, user_choice)
+        elif beats[user_choice] == bot_choice:
+            stats_store.record(ctx.author.id, "rps", "win")
+            result = f"{ctx.author.mention} wins!"  # User wins
+            color = discord.Color.green()
+            logging.info("%s (%s) beat %s with %s against %s", ctx.author,
+                         ctx.author.id, self.bot.user, user_choice, bot_choice)
+        else:
+            stats_store.record(ctx.author.id, "rps", "loss")
+            result = f"{self.bot.user.mention} wins!"  # Bot wins
+            color = discord.Color.red()
+            logging.info("%s beat %s (%s) with %s against %s", self.bot.user,
+                         ctx.author, ctx.author.id, bot_choice, user_choice)
+
+        embed = discord.Embed(  # Replaces the default embed
+            title="Rock Paper Scissors",
+            description=(  # Multi-line description
+                f"{ctx.author.mention} chose **{user_choice.capitalize()}**\n"  # Styling
+                # Don't ask why I didn't just use add_fields again
+                f"{self.bot.user.mention} chose **{bot_choice.capitalize()}**\n\n"
+                f"{result}"  # I don't know the answer to that question xD
+            ),
+            color=color
+            # Both 'color' and 'result' are set from the winner check
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+
+    @commands.hybrid_command(with_app_command=True, description="The wisdom of the eight ball upon you", aliases=["8ball", "8b"])
+    @app_commands.describe(question="Your question is?")
+    async def eightball(self, ctx, question: str = None):
+        yes_answers = [  # 7
+            "yes", "why not", "absolutely", "hell yeah", "without a doubt", "absolutely", "uh, obviously"
+        ]
+
+        no_answers = [  # 7
+            "no", "absolutely not", "fuck no", "nah", "are you stupid? no", "nuh uh", "not happening"
+        ]
+
+        unknown_answers = [  # 7
+            "i'm not too sure", "i don't know", "the answer lies in the question itself",
+            "the answer can be found in your soul", "do what your heart desires", "whatever you feel like",
+            "idk, ask the next guy"
+        ]
+
+        # makes it equal chance for yes, no or unknown in case there are different amounts of strings in each list
+        eight_ball_answers = ["yes", "no", "unknown"]
+        eight_ball_first_choice = secrets.choice(eight_ball_answers)
+        stats_store.record(ctx.author.id, "eightball", eight_ball_first_choice)
+
+        if eight_ball_first_choice == "yes":
+            eight_ball_real_choice = secrets.choice(yes_answers)
+            embed_color = discord.Color.green()
+        if eight_ball_first_choice == "no":
+            eight_ball_real_choice = secrets.choice(no_answers)
+            embed_color = discord.Color.red()
+        if eight_ball_first_choice == "unknown":
+            eight_ball_real_choice = secrets.choice(unknown_answers)
+            embed_color = discord.Color.yellow()
+
+        embed = discord.Embed(
+            title="8 ball's answer",
+            description=f"The 8 ball says: {eight_ball_real_choice}",
+            color=embed_color
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+
+        if question is not None:
+            embed.add_field(name="The question was:", value=question)
+        await send_reply(ctx, embed=embed, mention_author=True)
+        # For slash commands, ctx.message can be None; prefer the provided question if available
+        q_text = question if question is not None else (
+            getattr(getattr(ctx, "message", None), "content", "") or "")
+        logging.info("%s's (%s) 8ball answered to '%s' with %s",
+                     ctx.author, ctx.author.id, q_text, eight_ball_real_choice)
+
+
+async def setup(bot):
+    await bot.add_cog(Minigame(bot))
@@ -0,0 +1,337 @@
+# --- Imports ---
+
+
+# Standard library
+import asyncio
+import logging
+import re
+import time
+from datetime import timedelta
+
+# Third-party
+import discord
+from discord.ext import commands
+
+# dotzbot
+from dotzbot import CategoryCog, TokenBucket, get_env_int, send_reply
+
+
+# --- MODERATION COMMANDS ---
+
+
+MAX_TARGETS = get_env_int("MODERATION_MAX_TARGETS", 1000)
+WORKERS = get_env_int("MODERATION_WORKERS", 5)  # requests in flight at once for one command
+# Actions per second per server and action, shared by every command in that server. Any one second sees
+# ACTION_RATE + ACTION_BURST of them at most, keep that under discord's limit for the route so a big batch
+# doesn't depend on 429s and retries (discord.py still handles those if they happen anyway)
+ACTION_RATE = get_env_int("MODERATION_RATE", 10)
+ACTION_BURST = get_env_int("MODERATION_BURST", WORKERS)
+PROGRESS_INTERVAL = 2  # seconds between edits of the progress message
+MAX_ATTACHMENT_BYTES = 1_000_000
+BULK_BAN_SIZE = 200  # most users discord takes in one bulk ban
+DEFAULT_TIMEOUT = 600
+MAX_TIMEOUT = 28 * 24 * 3600  # longest timeout discord allows
+SHOWN_PROBLEMS = 10  # skipped/failed users listed in the embed, the rest is just a count
+
+TARGET = re.compile(r"<@!?(\d{15,20})>|(\d{15,20})")
+ANY_ID = re.compile(r"\b\d{15,20}\b")
+DURATION = re.compile(r"(?:\d+[smhdw])+", re.IGNORECASE)
+DURATION_PART = re.compile(r"(\d+)([smhdw])", re.IGNORECASE)
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+# action -> (permission it needs, what it's called once it's done, target has to be in the server)
+ACTIONS = {
+    "ban": ("ban_members", "Banned", False),
+    "kick": ("kick_members", "Kicked", True),
+    "timeout": ("moderate_members", "Timed out", True),
+    "unban": ("ban_members", "Unbanned", False)
+}
+
+
+def parse_targets(text):
+    """Mentions and IDs from the front of text, whatever comes after them is the reason. ([ids], reason)"""
+    words = text.split()
+    user_ids = []
+    for position, word in enumerate(words):
+        match = TARGET.fullmatch(word)
+        if match is None:
+            return user_ids, " ".join(words[position:])
+        user_ids.append(int(match.group(1) or match.group(2)))
+    return user_ids, ""
+
+
+def parse_duration(text):
+    """Takes a duration like 10m or 1h30m off the front of text. (seconds or None, the rest)"""
+    first, _, rest = text.strip().partition(" ")
+    if not DURATION.fullmatch(first):
+        return None, text
+    return sum(int(amount) * DURATION_UNITS[unit.lower()] for amount, unit in DURATION_PART.findall(first)), rest
+
+
+async def read_attachment_targets(message):
+    """IDs from the files attached to the command, anywhere in them and split by anything."""
+    user_ids = []
+    for attachment in message.attachments:
+        if attachment.size > MAX_ATTACHMENT_BYTES:
+            raise commands.BadArgument(f"{attachment.filename} is too big, {MAX_ATTACHMENT_BYTES // 1000}KB at most")
+        data = await attachment.read()
+        user_ids.extend(map(int, ANY_ID.findall(data.decode("utf-8", errors="replace"))))
+    return user_ids
+
+
+async def run_workers(items, work, workers=WORKERS):
+    """work(item) for every item, workers of them at once."""
+    remaining = iter(items)
+
+    async def worker():
+        for item in remaining:
+            await work(item)
+
+    await asyncio.gather(*(worker() for _ in range(min(workers, len(items)))))
+
+
+class Authority:
+    """What the invoker and the bot can do in a server. Worked out once per command,
+    so checking a target is just comparing a few ints."""
+
+    __slots__ = ("invoker_id", "bot_id", "owner_id", "invoker_position", "bot_position", "can_bulk_ban")
+
+    def __init__(self, invoker, me, owner_id):
+        self.invoker_id = invoker.id
+        self.bot_id = me.id
+        self.owner_id = owner_id
+        self.invoker_position = invoker.top_role.position
+        self.bot_position = me.top_role.position
+        permissions = me.guild_permissions
+        # Bulk bans need manage server too, and a discord.py that has them
+        self.can_bulk_ban = permissions.ban_members and permissions.manage_guild and hasattr(discord.Guild, "bulk_ban")
+
+    def check(self, user_id, member):
+        """Why this target can't be touched, or None if it can. member is None if they aren't in the server."""
+        if user_id == self.invoker_id:
+            return "that's you"
+        if user_id == self.bot_id:
+            return "that's me"
+        if user_id == self.owner_id:
+            return "they own the server"
+        if member is None:  # Nothing to compare, bans and unbans work on people who aren't in the server
+            return None
+        position = member.top_role.position
+        if position >= self.invoker_position and self.invoker_id != self.owner_id:
+            return "their top role isn't below yours"
+        if position >= self.bot_position:
+            return "their top role isn't below mine"
+        return None
+
+
+def check_permissions(ctx, action):
+    """The permission check for every moderation command, once per command and not per target.
+    Raises if the invoker or the bot doesn't have the permission, returns an Authority otherwise."""
+    if ctx.guild is None:
+        raise commands.NoPrivateMessage()
+    permission = ACTIONS[action][0]
+    if not getattr(ctx.author.guild_permissions, permission):
+        raise commands.MissingPermissions([permission])
+    me = ctx.guild.me
+    if not getattr(me.guild_permissions, permission):
+        raise commands.BotMissingPermissions([permission])
+    return Authority(ctx.author, me, ctx.guild.owner_id)
+
+
+class Batch:
+    """How far along one moderation command is, what the progress message shows."""
+
+    __slots__ = ("action", "total", "done", "skipped", "failed", "started", "finished")
+
+    def __init__(self, action, total):
+        self.action = action
+        self.total = total
+        self.done = 0
+        self.skipped = []  # (user id, why)
+        self.failed = []  # (user id, what discord said)
+        self.started = time.perf_counter()
+        self.finished = False
+
+    @property
+    def handled(self):
+        return self.done + len(self.skipped) + len(self.failed)
+
+    def embed(self, ctx):
+        if self.finished:
+            title = f"{self.action.capitalize()} done in {time.perf_counter() - self.started:.1f}s"
+            color = discord.Color.green() if not self.failed else discord.Color.orange()
+        else:
+            title = f"{self.action.capitalize()} in progress..."
+            color = discord.Color.gold()
+        embed = discord.Embed(title=title, description=f"{self.handled}/{self.total} users handled", color=color)
+        embed.add_field(name=ACTIONS[self.action][1], value=str(self.done))
+        for name, problems in (("Skipped", self.skipped), ("Failed", self.failed)):
+            if problems:
+                lines = [f"`{user_id}` {why}" for user_id, why in problems[:SHOWN_PROBLEMS]]
+                if len(problems) > SHOWN_PROBLEMS:
+                    lines.append(f"...and {len(problems) - SHOWN_PROBLEMS} more")
+                embed.add_field(name=f"{name} ({len(problems)})", value="\n".join(lines), inline=False)
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        return embed
+
+
+class Moderation(CategoryCog):
+    category = "moderation"
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.buckets = {}  # (guild id, action or "member") -> TokenBucket
+
+    def bucket(self, guild_id, name):
+        bucket = self.buckets.get((guild_id, name))
+        if bucket is None:
+            bucket = self.buckets[(guild_id, name)] = TokenBucket(ACTION_RATE, 1, ACTION_BURST)
+        return bucket
+
+    @commands.command(description="Bans the specified users (mentions, IDs or a file of IDs), then the reason",
+                      aliases=["begone"])
+    async def ban(self, ctx, *, targets: str = ""):
+        await self.moderate(ctx, "ban", targets)
+
+    @commands.command(description="Kicks the specified users (mentions, IDs or a file of IDs), then the reason",
+                      aliases=["fuckoff"])
+    async def kick(self, ctx, *, targets: str = ""):
+        await self.moderate(ctx, "kick", targets)
+
+    @commands.command(description="Times out the specified users for a while (like 10m or 1h30m, default 10m), "
+                                  "then the reason", aliases=["shutup"])
+    async def timeout(self, ctx, *, targets: str = ""):
+        duration, targets = parse_duration(targets)
+        duration = DEFAULT_TIMEOUT if duration is None else duration
+        if not 1 <= duration <= MAX_TIMEOUT:
+            await send_reply(ctx, "Timeouts can be 28 days at most", mention_author=True)
+            return
+        await self.moderate(ctx, "timeout", targets, duration)
+
+    @commands.command(description="Unbans the specified users (IDs or a file of IDs), then the reason",
+                      aliases=["sorry", "comeback"])
+    async def unban(self, ctx, *, targets: str = ""):
+        await self.moderate(ctx, "unban", targets)
+
+    async def moderate(self, ctx, action, text, duration=None):
+        authority = check_permissions(ctx, action)
+        user_ids, reason = parse_targets(text)
+        user_ids = list(dict.fromkeys(user_ids + await read_attachment_targets(ctx.message)))  # No doubles
+        if not user_ids:
+            await send_reply(ctx, "Who? Mention them, give their IDs or attach a file with IDs in it",
+                             mention_author=True)
+            return
+        if len(user_ids) > MAX_TARGETS:
+            await send_reply(ctx, f"That's {len(user_ids)} users, {MAX_TARGETS} at most at once", mention_author=True)
+            return
+
+        # One message that gets edited as it goes, instead of a reply per user
+        batch = Batch(action, len(user_ids))
+        message = await send_reply(ctx, embed=batch.embed(ctx), mention_author=True)
+        progress = asyncio.create_task(self.show_progress(ctx, message, batch)) if message is not None else None
+        audit_reason = f"{ctx.author} ({ctx.author.id}): {reason or 'no reason given'}"
+        try:
+            await self.run(ctx.guild, authority, batch, user_ids, audit_reason, duration)
+        finally:
+            batch.finished = True
+            if progress is not None:
+                progress.cancel()
+
+        if message is not None:
+            try:
+                await message.edit(embed=batch.embed(ctx))
+            except discord.HTTPException:
+                pass  # Progress message got deleted
+        logging.info("%s (%s) used $%s on %s users in %s (%s done, %s skipped, %s failed)", ctx.author, ctx.author.id,
+                     action, batch.total, ctx.guild.id, batch.done, len(batch.skipped), len(batch.failed))
+
+    async def show_progress(self, ctx, message, batch):
+        shown = 0
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            if batch.handled == shown:
+                continue
+            shown = batch.handled
+            try:
+                await message.edit(embed=batch.embed(ctx))
+            except discord.HTTPException:
+                pass  # Still tries again next time, the final edit matters more
+
+    async def run(self, guild, authority, batch, user_ids, reason, duration):
+        if batch.action == "ban" and authority.can_bulk_ban and len(user_ids) > 1:
+            allowed = []
+
+            async def vet(user_id):
+                try:
+                    if await self.vet(guild, authority, batch, user_id):
+                        allowed.append(user_id)
+                except discord.HTTPException as e:
+                    batch.failed.append((user_id, e.text or str(e.status)))
+
+            await run_workers(user_ids, vet)
+            for start in range(0, len(allowed), BULK_BAN_SIZE):
+                await self.bulk_ban(guild, batch, allowed[start:start + BULK_BAN_SIZE], reason)
+            return
+        await run_workers(user_ids, lambda user_id: self.act(guild, authority, batch, user_id, reason, duration))
+
+    async def fetch_member(self, guild, user_id):
+        """Member from the cache or the API, None if they aren't in the server."""
+        member = guild.get_member(user_id)
+        if member is not None:
+            return member
+        await self.bucket(guild.id, "member").take()
+        try:
+            return await guild.fetch_member(user_id)
+        except discord.NotFound:
+            return None
+
+    async def vet(self, guild, authority, batch, user_id):
+        """The per target checks. Returns the member (or True if they don't need to be one), False if it's a skip."""
+        member = None
+        if batch.action != "unban":
+            member = await self.fetch_member(guild, user_id)
+            if member is None and ACTIONS[batch.action][2]:
+                batch.skipped.append((user_id, "isn't in the server"))
+                return False
+        why = authority.check(user_id, member)
+        if why is not None:
+            batch.skipped.append((user_id, why))
+            return False
+        return member or True
+
+    async def act(self, guild, authority, batch, user_id, reason, duration):
+        action = batch.action
+        try:
+            member = await self.vet(guild, authority, batch, user_id)
+            if member is False:
+                return
+            await self.bucket(guild.id, action).take()
+            if action == "ban":
+                await guild.ban(discord.Object(user_id), reason=reason, delete_message_seconds=0)
+            elif action == "kick":
+                await guild.kick(member, reason=reason)
+            elif action == "timeout":
+                await member.timeout(timedelta(seconds=duration), reason=reason)
+            else:
+                await guild.unban(discord.Object(user_id), reason=reason)
+        except discord.NotFound:
+            batch.skipped.append((user_id, "isn't banned" if action == "unban" else "doesn't exist"))
+        except discord.HTTPException as e:
+            batch.failed.append((user_id, e.text or str(e.status)))
+        else:
+            batch.done += 1
+
+    async def bulk_ban(self, guild, batch, user_ids, reason):
+        await self.bucket(guild.id, "ban").take()
+        try:
+            result = await guild.bulk_ban([discord.Object(user_id) for user_id in user_ids], reason=reason,
+                                          delete_message_seconds=0)
+        except discord.HTTPException as e:
+            batch.failed.extend((user_id, e.text or str(e.status)) for user_id in user_ids)
+            return
+        batch.done += len(result.banned)
+        batch.failed.extend((user.id, "discord wouldn't ban them") for user in result.failed)
+
+
+async def setup(bot):
+    await bot.add_cog(Moderation(bot))
@@ -0,0 +1,562 @@
+# --- Imports ---
+
+
+# Standard library
+import asyncio
+import logging
+import os
+import secrets
+import struct
+import time
+from array import array
+from itertools import combinations, combinations_with_replacement
+
+# Third-party
+import discord
+from discord.ext import commands, tasks
+
+# dotzbot
+from dotzbot import CategoryCog, TimerWheel, get_env_int, layout_only, send_reply, stats_store, timed_callback
+
+
+# --- HAND EVALUATOR ---
+
+
+# Cactus Kev's card format, one int per card: xxxbbbbb bbbbbbbb cdhsrrrr xxpppppp
+# b = a bit for the rank, cdhs = a bit for the suit, r = the rank (0 is a 2, 12 is an ace), p = the rank's prime.
+# Multiplying the primes gives the same number for the same ranks in any order, that's the lookup key.
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+RANK_NAMES = ("2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A")
+SUITS = ("♠", "♥", "♦", "♣")  # suit bits 0x1000, 0x2000, 0x4000, 0x8000
+HIGH_FIRST = range(12, -1, -1)
+# Ace high down to the wheel (A-2-3-4-5), as 13 bit rank masks
+STRAIGHTS = tuple(0b11111 << shift for shift in range(8, -1, -1)) + (0b1000000001111,)
+
+# 1 is a royal flush, 7462 is 7-5-4-3-2 offsuit. Worst rank in each class, best class first
+HAND_CLASSES = (
+    (10, "Straight Flush"),
+    (166, "Four of a Kind"),
+    (322, "Full House"),
+    (1599, "Flush"),
+    (1609, "Straight"),
+    (2467, "Three of a Kind"),
+    (3325, "Two Pair"),
+    (6185, "One Pair"),
+    (7462, "High Card")
+)
+
+# Suit counting for 7 cards: each suit gets 3 bits (an octal digit) in one int,
+# FLUSH_SUITS says which suit has 5+ cards for every possible total (or 0)
+SUIT_COUNTS = (0, 1, 8, 0, 64, 0, 0, 0, 512)  # indexed by the suit's bit (card >> 12 & 0xF)
+FLUSH_SUITS = tuple(
+    next((0x1000 << suit for suit in range(4) if total >> 3 * suit & 7 >= 5), 0)
+    for total in range(8 ** 4)
+)
+
+TABLES_MAGIC = b"DZPK"
+TABLES_VERSION = 1
+TABLES_HEADER = struct.Struct("<4sHII")  # magic, version, 5 card products, 7 card products
+MASKS = 1 << 13  # every 13 bit rank mask
+
+
+def make_card(rank, suit):
+    return PRIMES[rank] | rank << 8 | 0x1000 << suit | 1 << 16 + rank
+
+
+DECK = tuple(make_card(rank, suit) for suit in range(4) for rank in range(13))
+
+
+def card_name(card):
+    return f"{RANK_NAMES[card >> 8 & 0xF]}{SUITS[(card >> 12 & 0xF).bit_length() - 1]}"
+
+
+def show_cards(cards):
+    return " ".join(card_name(card) for card in cards)
+
+
+def hand_name(rank):
+    if rank == 1:
+        return "Royal Flush"
+    for worst, name in HAND_CLASSES:
+        if rank <= worst:
+            return name
+    raise ValueError(f"{rank} isn't a hand rank")
+
+
+def prime_product(ranks):
+    product = 1
+    for rank in ranks:
+        product *= PRIMES[rank]
+    return product
+
+
+class HandEvaluator:
+    """Lookup table hand ranking, lower is better.
+
+    5 cards: flushes and 5 different ranks are looked up by their rank mask, anything
+    with a pair by the product of the primes. 7 cards: same idea, but the tables already
+    have the best 5 out of 7 in them, so it's still one lookup instead of 21.
+    Building the 7 card table takes a while, so load() caches everything to disk.
+    """
+
+    __slots__ = ("flushes", "unique5", "products", "flush7", "products7")
+
+    def __init__(self, flushes, unique5, products, flush7, products7):
+        self.flushes = flushes  # rank mask -> rank, 5 suited cards
+        self.unique5 = unique5  # rank mask -> rank, straights and high cards (0 if it has a pair)
+        self.products = products  # prime product -> rank, everything with a pair
+        self.flush7 = flush7  # rank mask of the flush suit's cards -> best flush in there
+        self.products7 = products7  # prime product of 7 ranks -> best 5 card rank, flushes aside
+
+    @classmethod
+    def build(cls):
+        flushes = array("H", [0]) * MASKS
+        unique5 = array("H", [0]) * MASKS
+        products = {}
+        # 5 different ranks that don't make a straight, best first
+        distinct = [mask for mask in (sum(1 << rank for rank in ranks) for ranks in combinations(HIGH_FIRST, 5))
+                    if mask not in STRAIGHTS]
+
+        # Every class of hand from best to worst, rank goes up by one for each
+        rank = 1
+        for mask in STRAIGHTS:  # straight flush
+            flushes[mask] = rank
+            rank += 1
+        for quads in HIGH_FIRST:
+            for kicker in HIGH_FIRST:
+                if kicker != quads:
+                    products[PRIMES[quads] ** 4 * PRIMES[kicker]] = rank
+                    rank += 1
+        for trips in HIGH_FIRST:  # full house
+            for pair in HIGH_FIRST:
+                if pair != trips:
+                    products[PRIMES[trips] ** 3 * PRIMES[pair] ** 2] = rank
+                    rank += 1
+        for mask in distinct:  # flush
+            flushes[mask] = rank
+            rank += 1
+        for mask in STRAIGHTS:
+            unique5[mask] = rank
+            rank += 1
+        for trips in HIGH_FIRST:
+            for kickers in combinations([kicker for kicker in HIGH_FIRST if kicker != trips], 2):
+                products[PRIMES[trips] ** 3 * prime_product(kickers)] = rank
+                rank += 1
+        for high, low in combinations(HIGH_FIRST, 2):  # two pair
+            for kicker in HIGH_FIRST:
+                if kicker != high and kicker != low:
+                    products[PRIMES[high] ** 2 * PRIMES[low] ** 2 * PRIMES[kicker]] = rank
+                    rank += 1
+        for pair in HIGH_FIRST:
+            for kickers in combinations([kicker for kicker in HIGH_FIRST if kicker != pair], 3):
+                products[PRIMES[pair] ** 2 * prime_product(kickers)] = rank
+                rank += 1
+        for mask in distinct:  # high card
+            unique5[mask] = rank
+            rank += 1
+        assert rank == HAND_CLASSES[-1][0] + 1
+
+        # Best flush in any 5-7 suited cards
+        flush7 = array("H", [0]) * MASKS
+        for mask in range(MASKS):
+            bits = [1 << rank for rank in range(13) if mask >> rank & 1]
+            if 5 <= len(bits) <= 7:
+                flush7[mask] = min(flushes[sum(five)] for five in combinations(bits, 5))
+
+        # Best 5 out of every 7 ranks you can actually be dealt (no more than 4 of one)
+        products7 = {}
+        for ranks in combinations_with_replacement(range(13), 7):
+            if any(ranks.count(rank) > 4 for rank in set(ranks)):
+                continue
+            best = HAND_CLASSES[-1][0]
+            for five in combinations(ranks, 5):
+                mask = sum(1 << rank for rank in set(five))
+                best = min(best, unique5[mask] if len(set(five)) == 5 else products[prime_product(five)])
+            products7[prime_product(ranks)] = best
+        return cls(flushes, unique5, products, flush7, products7)
+
+    def save(self, path):
+        """Native byte order, it's a cache for this machine and not something to copy around."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(TABLES_HEADER.pack(TABLES_MAGIC, TABLES_VERSION, len(self.products), len(self.products7)))
+            f.write(self.flushes.tobytes())
+            f.write(self.unique5.tobytes())
+            f.write(self.flush7.tobytes())
+            f.write(array("I", self.products.keys()).tobytes())
+            f.write(array("H", self.products.values()).tobytes())
+            f.write(array("Q", self.products7.keys()).tobytes())
+            f.write(array("H", self.products7.values()).tobytes())
+        os.replace(temp_path, path)  # So a crash halfway never leaves half a file
+
+    @classmethod
+    def read(cls, path):
+        """Returns None if there's no usable cache."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < TABLES_HEADER.size:
+            return None
+        magic, version, product_count, product7_count = TABLES_HEADER.unpack_from(data)
+        if magic != TABLES_MAGIC or version != TABLES_VERSION:
+            return None
+
+        sections = []
+        offset = TABLES_HEADER.size
+        for typecode, count in (("H", MASKS), ("H", MASKS), ("H", MASKS), ("I", product_count),
+                                ("H", product_count), ("Q", product7_count), ("H", product7_count)):
+            section = array(typecode)
+            end = offset + count * section.itemsize
+            if end > len(data):
+                return None
+            section.frombytes(data[offset:end])
+            sections.append(section)
+            offset = end
+        if offset != len(data):
+            return None
+        flushes, unique5, flush7, keys, values, keys7, values7 = sections
+        return cls(flushes, unique5, dict(zip(keys, values)), flush7, dict(zip(keys7, values7)))
+
+    @classmethod
+    def load(cls, path):
+        """The cached tables, or builds and caches them if there aren't any. Blocking, so use asyncio.to_thread."""
+        start = time.perf_counter()
+        evaluator = cls.read(path)
+        if evaluator is not None:
+            logging.info("Loaded the poker tables from %s in %.0fms", path, (time.perf_counter() - start) * 1000)
+            return evaluator
+
+        evaluator = cls.build()
+        try:
+            evaluator.save(path)
+        except OSError as e:  # Works without the cache, it just gets built again next time
+            logging.warning("Couldn't cache the poker tables to %s (%s)", path, e)
+        logging.info("Built the poker tables in %.1fs", time.perf_counter() - start)
+        return evaluator
+
+    def evaluate5(self, a, b, c, d, e):
+        mask = (a | b | c | d | e) >> 16
+        if a & b & c & d & e & 0xF000:  # All the same suit
+            return self.flushes[mask]
+        rank = self.unique5[mask]
+        if rank:
+            return rank
+        return self.products[(a & 0xFF) * (b & 0xFF) * (c & 0xFF) * (d & 0xFF) * (e & 0xFF)]
+
+    def evaluate7(self, cards):
+        product = 1
+        suits = 0
+        for card in cards:
+            product *= card & 0xFF
+            suits += SUIT_COUNTS[card >> 12 & 0xF]
+        flush_suit = FLUSH_SUITS[suits]
+        if flush_suit:  # With 7 cards there can't be quads or a full house next to a flush, so this is it
+            mask = 0
+            for card in cards:
+                if card & flush_suit:
+                    mask |= card
+            return self.flush7[mask >> 16]
+        return self.products7[product]
+
+    def evaluate(self, cards):
+        """Best 5 card rank out of 5, 6 or 7 cards."""
+        if len(cards) == 7:
+            return self.evaluate7(cards)
+        return min(self.evaluate5(*five) for five in combinations(cards, 5))
+
+
+# --- POKER ---
+
+
+MAX_PLAYERS = 8
+IDLE_TIMEOUT = get_env_int("POKER_IDLE_TIMEOUT", 300)  # seconds without a click before a lobby gets closed
+TABLES_PATH = os.getenv("POKER_TABLES", ".poker_tables.bin")
+# stage -> (name, community cards showing)
+STAGES = {
+    0: ("Waiting for players", 0),
+    1: ("Pre-flop", 0),
+    2: ("Flop", 3),
+    3: ("Turn", 4),
+    4: ("River", 5),
+    5: ("Showdown", 5)
+}
+
+shuffler = secrets.SystemRandom()
+
+
+class Lobby:
+    """A poker table, from people joining to the showdown. No betting, just who has the best hand."""
+
+    __slots__ = ("host_id", "channel_id", "players", "names", "folded", "hands", "board", "stage", "results")
+
+    def __init__(self, host_id, host_name, channel_id):
+        self.host_id = host_id
+        self.channel_id = channel_id
+        self.players = [host_id]
+        self.names = {host_id: host_name}
+        self.folded = set()
+        self.hands = {}  # player id -> 2 hole cards
+        self.board = ()  # all 5 community cards, STAGES says how many are showing
+        self.stage = 0
+        self.results = None  # player id -> hand rank, after the showdown
+
+    def join(self, player_id, name):
+        self.players.append(player_id)
+        self.names[player_id] = name
+
+    def leave(self, player_id):
+        self.players.remove(player_id)
+        del self.names[player_id]
+
+    def deal(self):
+        deck = list(DECK)
+        shuffler.shuffle(deck)
+        for player_id in self.players:
+            self.hands[player_id] = (deck.pop(), deck.pop())
+        self.board = tuple(deck.pop() for _ in range(5))
+        self.stage = 1
+
+    def in_hand(self):
+        return [player_id for player_id in self.players if player_id not in self.folded]
+
+    def winners(self):
+        if self.results is None:  # Everyone else folded
+            return self.in_hand()
+        best = min(self.results.values())
+        return [player_id for player_id, rank in self.results.items() if rank == best]
+
+    def showdown(self, evaluator):
+        self.stage = 5
+        self.results = {player_id: evaluator.evaluate7(self.hands[player_id] + self.board)
+                        for player_id in self.in_hand()}
+
+
+def render(lobby):
+    stage, showing = STAGES[lobby.stage]
+    over = lobby.stage == 5 or (lobby.stage and len(lobby.in_hand()) == 1)
+    embed = discord.Embed(title="Poker", description=stage, color=discord.Color.gold())
+
+    players = []
+    for player_id in lobby.players:
+        line = lobby.names[player_id] + (" (host)" if player_id == lobby.host_id else "")
+        if player_id in lobby.folded:
+            line += " - folded"
+        elif lobby.results is not None:
+            rank = lobby.results[player_id]
+            line += f" - {show_cards(lobby.hands[player_id])}, {hand_name(rank)}"
+        players.append(line)
+    embed.add_field(name=f"Players ({len(lobby.players)}/{MAX_PLAYERS})", value="\n".join(players), inline=False)
+
+    if lobby.stage:
+        embed.add_field(name="Board", value=show_cards(lobby.board[:showing]) or "Nothing yet", inline=False)
+    if over:
+        winners = lobby.winners()
+        embed.description = "Split pot!" if len(winners) > 1 else "Winner!"
+        embed.add_field(name="Won by", value=", ".join(lobby.names[player_id] for player_id in winners), inline=False)
+        embed.color = discord.Color.green()
+    elif lobby.stage:
+        embed.set_footer(text="Check your cards with My cards, the host deals the next street")
+    else:
+        embed.set_footer(text="Join, then the host starts it (needs 2 people, or it's you against the bot)")
+    return embed
+
+
+class PokerView(discord.ui.View):
+    """Buttons for every lobby, works like BlackjackView: one persistent instance with all six
+    buttons handles the clicks and finds the lobby by message id, the layouts (stage 0 for the
+    lobby, anything else once it's dealt) only draw the buttons that stage needs."""
+
+    def __init__(self, cog, stage=None):
+        super().__init__(timeout=None)
+        self.cog = cog
+        if stage is None:  # The persistent one, it has to know every custom id
+            return
+        lobby_buttons = (self.join, self.leave, self.start)
+        for item in (*lobby_buttons, self.cards, self.fold, self.next_street):
+            if stage and item in lobby_buttons or not stage and item not in lobby_buttons:
+                self.remove_item(item)
+
+    @discord.ui.button(label="Join", style=discord.ButtonStyle.green, custom_id="poker:join")
+    @timed_callback("poker:join")
+    async def join(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.click(interaction, "join")
+
+    @discord.ui.button(label="Leave", style=discord.ButtonStyle.grey, custom_id="poker:leave")
+    @timed_callback("poker:leave")
+    async def leave(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.click(interaction, "leave")
+
+    @discord.ui.button(label="Start", style=discord.ButtonStyle.blurple, custom_id="poker:start")
+    @timed_callback("poker:start")
+    async def start(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.click(interaction, "start")
+
+    @discord.ui.button(label="My cards", style=discord.ButtonStyle.grey, custom_id="poker:cards")
+    @timed_callback("poker:cards")
+    async def cards(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.click(interaction, "cards")
+
+    @discord.ui.button(label="Fold", style=discord.ButtonStyle.red, custom_id="poker:fold")
+    @timed_callback("poker:fold")
+    async def fold(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.click(interaction, "fold")
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.blurple, custom_id="poker:next")
+    @timed_callback("poker:next")
+    async def next_street(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.cog.click(interaction, "next")
+
+
+class Poker(CategoryCog):
+    category = "minigame"
+    kept = ("lobbies", "idle")
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.lobbies = {}  # message id -> Lobby
+        self.idle = TimerWheel(tick=1, max_delay=IDLE_TIMEOUT)  # message ids
+        self.view = PokerView(self)
+        self.layouts = {playing: layout_only(PokerView(None, stage=int(playing))) for playing in (False, True)}
+        self.evaluator_task = None
+
+    async def cog_load(self):
+        self.bot.add_view(self.view)
+        self.evict_idle.start()
+        # In the background so it never holds up startup, the first showdown waits for it if it has to
+        self.evaluator_task = asyncio.create_task(asyncio.to_thread(HandEvaluator.load, TABLES_PATH))
+
+    async def cog_unload(self):
+        self.view.stop()
+        self.evict_idle.cancel()
+        if self.lobbies:  # A reload hands them to the new cog, shutting down just leaves them
+            logging.info("Unloading with %s open poker lobbies", len(self.lobbies))
+
+    def close(self, message_id):
+        self.idle.cancel(message_id)
+        return self.lobbies.pop(message_id, None)
+
+    @commands.command(description="Probably not exactly like poker, but close enough", aliases=["pk"])
+    async def poker(self, ctx):
+        lobby = Lobby(ctx.author.id, ctx.author.display_name, ctx.channel.id)
+        message = await send_reply(ctx, embed=render(lobby), view=self.layouts[False], mention_author=True)
+        if message is None:  # Dropped by the outbound scheduler
+            return
+        self.lobbies[message.id] = lobby
+        self.idle.schedule(message.id, IDLE_TIMEOUT)
+        logging.info("%s (%s) opened a poker lobby", ctx.author, ctx.author.id)
+
+    async def click(self, interaction, action):
+        message_id = interaction.message.id
+        lobby = self.lobbies.get(message_id)
+        if lobby is None:
+            await interaction.response.send_message("This table is closed, open a new one with $poker", ephemeral=True)
+            return
+
+        user = interaction.user
+        error = self.check(lobby, user.id, action)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
+        if action == "cards":  # Only one that doesn't change the table
+            hand = lobby.hands[user.id]
+            await interaction.response.send_message(f"Your cards: {show_cards(hand)}", ephemeral=True)
+            return
+
+        if action == "join":
+            lobby.join(user.id, user.display_name)
+        elif action == "leave":
+            if user.id == lobby.host_id:
+                self.close(message_id)
+                await interaction.response.edit_message(content="The host left, so the table closed", embed=None,
+                                                        view=None)
+                return
+            lobby.leave(user.id)
+        elif action == "start":
+            if len(lobby.players) == 1:  # Heads up against the bot
+                lobby.join(self.bot.user.id, self.bot.user.display_name)
+            lobby.deal()
+        elif action == "fold":
+            lobby.folded.add(user.id)
+        elif action == "next":
+            if lobby.stage == 4:
+                # No awaiting the tables here, that could take longer than the 3s an interaction gets,
+                # and a second Next meanwhile would finish the game twice. Nothing below awaits
+                # until the lobby is closed, so a double click just finds the table closed
+                if not self.evaluator_task.done():
+                    await interaction.response.send_message("The hand tables are still loading, "
+                                                            "try again in a few seconds", ephemeral=True)
+                    return
+                lobby.showdown(self.evaluator_task.result())
+            else:
+                lobby.stage += 1
+
+        if lobby.stage == 5 or (lobby.stage and len(lobby.in_hand()) == 1):
+            self.close(message_id)
+            self.finish(lobby)
+            view = None
+        else:
+            self.idle.schedule(message_id, IDLE_TIMEOUT)
+            view = self.layouts[lobby.stage > 0]
+        await interaction.response.edit_message(embed=render(lobby), view=view)
+
+    def check(self, lobby, user_id, action):
+        """What's wrong with someone clicking that, or None if it's fine."""
+        if action == "join":
+            if lobby.stage:
+                return "This game already started, wait for the next one"
+            if user_id in lobby.names:
+                return "You're already at this table"
+            if len(lobby.players) >= MAX_PLAYERS:
+                return f"This table is full ({MAX_PLAYERS} players)"
+        elif action == "leave":
+            if lobby.stage:
+                return "The game already started, fold instead"
+            if user_id not in lobby.names:
+                return "You're not at this table"
+        elif action in ("start", "next"):
+            if user_id != lobby.host_id:
+                return "Only the host can do that"
+            if action == "start" and lobby.stage:
+                return "It already started"
+        elif action in ("cards", "fold"):
+            if user_id not in lobby.hands:
+                return "You're not in this game"
+            if action == "fold" and user_id in lobby.folded:
+                return "You already folded"
+        return None
+
+    def finish(self, lobby):
+        winners = lobby.winners()
+        for player_id in lobby.players:
+            if player_id == self.bot.user.id:
+                continue
+            if player_id in winners:
+                result = "split" if len(winners) > 1 else "win"
+            else:
+                result = "loss"
+            stats_store.record(player_id, "poker", result)
+        logging.info("Poker game in %s finished, won by %s", lobby.channel_id,
+                     ", ".join(lobby.names[player_id] for player_id in winners))
+
+    @tasks.loop(seconds=1)
+    async def evict_idle(self):
+        expired = self.idle.advance()
+        if expired:
+            await asyncio.gather(*(self.expire(message_id) for message_id in expired))
+
+    async def expire(self, message_id):
+        lobby = self.close(message_id)
+        if lobby is None:
+            return
+        message = self.bot.get_partial_messageable(lobby.channel_id).get_partial_message(message_id)
+        try:
+            await message.edit(content=f"This table closed after {IDLE_TIMEOUT}s without anyone doing anything",
+                               view=None)
+        except discord.HTTPException:
+            pass  # Message got deleted
+
+
+async def setup(bot):
+    await bot.add_cog(Poker(bot))
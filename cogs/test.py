@@ -0,0 +1,44 @@
+# --- Imports ---
+
+
+# Third-party
+import discord
+from discord.ext import commands
+
+# dotzbot
+from dotzbot import CategoryCog, send_reply
+
+
+# --- TEST COMMANDS ---
+
+
+class button_test_view(discord.ui.View):
+    def __init__(self):
+        super().__init__(timeout=30)  # seconds; set None for persistent
+
+    @discord.ui.button(label="click me cause im a button", style=discord.ButtonStyle.red)
+    async def click_me(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_message("congrats on doing el click", ephemeral=True)
+
+    @discord.ui.button(label="im another button", style=discord.ButtonStyle.green)
+    async def green_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_message("you picked the green button!", ephemeral=True)
+
+    @discord.ui.button(label="you dont see me", style=discord.ButtonStyle.grey)
+    async def special_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_message("no way! you saw me! here's a special role", ephemeral=True)
+        special_button_role = interaction.guild.get_role(1452851739647672471)
+        await interaction.user.add_roles(special_button_role)
+        # needs check if in correct server, or a try except
+
+
+class Test(CategoryCog):
+    category = "test"
+
+    @commands.command(description="Button Test", hidden=True)
+    async def button(self, ctx):
+        await send_reply(ctx, "these only work for 30 seconds", view=button_test_view())
+
+
+async def setup(bot):
+    await bot.add_cog(Test(bot))
@@ -0,0 +1,365 @@
+# --- Imports ---
+
+
+# Standard library
+import asyncio
+import bisect
+import logging
+import mmap
+import os
+import secrets
+import string
+import struct
+import sys
+import time
+import unicodedata
+from array import array
+
+# Third-party
+import discord
+from discord.ext import commands
+
+# dotzbot
+from dotzbot import CategoryCog, get_env_int, message_router, reply_to, send_reply, send_to, stats_store
+
+
+# --- QUESTION BANK ---
+
+
+# The bank file, all little endian:
+#   header
+#   category table: (first question id, question count) per category, sorted by name
+#   category names, utf-8 split by newlines
+#   offset index: where each question's record starts in the data, plus where the last one ends
+#   data: one record per question, "question \x1f answer \x1f accepted answer \x1f ..." in utf-8
+# Questions in a category are next to each other, so a category is just a range of ids.
+BANK_MAGIC = b"DZTQ"
+BANK_VERSION = 1
+BANK_HEADER = struct.Struct("<4sHxxIII")  # magic, version, questions, categories, size of the names
+CATEGORY_ENTRY = struct.Struct("<II")
+RECORD_SPAN = struct.Struct("<II")  # two neighbouring offsets, a record's start and end
+OFFSET_SIZE = 4
+FIELD_SEPARATOR = "\x1f"
+
+ARTICLES = ("the", "a", "an")
+# Punctuation gets dropped ("D.C." is "dc"), dashes and slashes split words ("Jay-Z" is "jay z")
+ANSWER_TRANSLATION = str.maketrans({
+    **{char: None for char in string.punctuation + "‘’“”«»¿¡…"},
+    **{char: " " for char in "-_/\\–—"}
+})
+
+
+def normalize_answer(text):
+    """Lowercase, no accents or punctuation, single spaces and no "the"/"a"/"an" in front."""
+    text = text.casefold()
+    if not text.isascii():
+        text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    words = text.translate(ANSWER_TRANSLATION).split()
+    if len(words) > 1 and words[0] in ARTICLES:
+        del words[0]
+    return " ".join(words)
+
+
+def read_source(path):
+    """Reads a tab separated source: category, question, answer and optionally more accepted
+    answers split by |. Blank lines and lines starting with # get skipped.
+    Returns {category key: (category name, [record bytes])}."""
+    categories = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = [field.strip() for field in line.split("\t")]
+            if len(fields) not in (3, 4) or not all(fields[:3]):
+                raise ValueError(f"{path}:{line_number} should be category, question, answer "
+                                 "and optionally other answers split by |, all split by tabs")
+            category, question, answer = fields[:3]
+            others = fields[3].split("|") if len(fields) == 4 else []
+            accepted = dict.fromkeys(filter(None, map(normalize_answer, [answer, *others])))  # unique, in order
+            if not accepted:
+                raise ValueError(f"{path}:{line_number} has no answer left after taking out the punctuation")
+            if any(FIELD_SEPARATOR in field for field in fields):
+                raise ValueError(f"{path}:{line_number} has a \\x1f in it")
+            record = FIELD_SEPARATOR.join((question, answer, *accepted)).encode("utf-8")
+            categories.setdefault(category.casefold(), (category, []))[1].append(record)
+    return categories
+
+
+def build_bank(source, path):
+    """Turns a source file into a bank file at path. Returns how many questions went in."""
+    categories = read_source(source)
+    entries = []
+    names = []
+    offsets = array("I", [0])
+    count = 0
+    for key in sorted(categories):
+        name, records = categories[key]
+        entries.append(CATEGORY_ENTRY.pack(count, len(records)))
+        names.append(name)
+        for record in records:
+            offsets.append(offsets[-1] + len(record))
+        count += len(records)
+    if count == 0:
+        raise ValueError(f"{source} doesn't have any questions in it")
+    names_blob = "\n".join(names).encode("utf-8")
+    if sys.byteorder == "big":
+        offsets.byteswap()
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(BANK_HEADER.pack(BANK_MAGIC, BANK_VERSION, count, len(entries), len(names_blob)))
+        f.writelines(entries)
+        f.write(names_blob)
+        f.write(offsets.tobytes())
+        for key in sorted(categories):
+            f.writelines(categories[key][1])
+    os.replace(temp_path, path)  # So the bot never opens half a bank
+    return count
+
+
+class TriviaBank:
+    """A bank file, memory mapped. Only the header and categories get read when it opens,
+    a question is one slice of the map at the offset the index says, so even a huge bank
+    costs next to nothing in memory and the OS caches the pages that get used."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < BANK_HEADER.size:
+                raise ValueError(f"{path} is too small to be a trivia bank")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # Stays valid after the file closes
+        try:
+            magic, version, self.count, category_count, names_size = BANK_HEADER.unpack_from(self.map)
+            if magic != BANK_MAGIC or version != BANK_VERSION:
+                raise ValueError(f"{path} isn't a version {BANK_VERSION} trivia bank")
+
+            names_start = BANK_HEADER.size + category_count * CATEGORY_ENTRY.size
+            self.index_start = names_start + names_size
+            self.data_start = self.index_start + (self.count + 1) * OFFSET_SIZE
+            if self.data_start > len(self.map):
+                raise ValueError(f"{path} is cut off, build it again")
+            data_size = struct.unpack_from("<I", self.map, self.data_start - OFFSET_SIZE)[0]
+            if self.data_start + data_size != len(self.map):
+                raise ValueError(f"{path} is cut off or has junk at the end, build it again")
+
+            names = self.map[names_start:self.index_start].decode("utf-8").split("\n")
+            self.categories = {}  # key -> (name, first question id, count)
+            self.firsts = []  # first question id of each category, for category_of
+            self.names = names
+            for position, name in enumerate(names):
+                first, count = CATEGORY_ENTRY.unpack_from(self.map, BANK_HEADER.size + position * CATEGORY_ENTRY.size)
+                self.categories[name.casefold()] = (name, first, count)
+                self.firsts.append(first)
+        except Exception:
+            self.map.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.map.close()
+
+    def question(self, question_id):
+        """(question, answer, accepted normalized answers) for one question id."""
+        start, end = RECORD_SPAN.unpack_from(self.map, self.index_start + question_id * OFFSET_SIZE)
+        question, answer, *accepted = self.map[self.data_start + start:self.data_start + end].decode(
+            "utf-8").split(FIELD_SEPARATOR)
+        return question, answer, accepted
+
+    def category_of(self, question_id):
+        return self.names[bisect.bisect_right(self.firsts, question_id) - 1]
+
+    def pick(self, recent, category=None):
+        """A random question id that's not in recent, from one category or all of them.
+        Small categories can run out, then it's just a random one."""
+        if category is None:
+            first, count = 0, self.count
+        else:
+            _, first, count = self.categories[category]
+        for _ in range(8):  # Almost always the first try for a big bank
+            question_id = first + secrets.randbelow(count)
+            if question_id not in recent:
+                return question_id
+        start = secrets.randbelow(count)
+        for step in range(count):  # Mostly asked already, walk from a random spot to whatever's left
+            candidate = first + (start + step) % count
+            if candidate not in recent:
+                return candidate
+        return question_id
+
+
+class RecentQuestions:
+    """The last few question ids asked in one guild, so they don't come up again too soon.
+    A fixed size ring of ids, plus a set of the same ids for the lookups."""
+
+    __slots__ = ("ids", "position", "asked")
+
+    def __init__(self, size):
+        self.ids = array("q", [-1]) * size
+        self.position = 0
+        self.asked = set()
+
+    def __contains__(self, question_id):
+        return question_id in self.asked
+
+    def add(self, question_id):
+        if question_id in self.asked:  # Only happens when a category ran out, it just keeps it's old spot
+            return
+        oldest = self.ids[self.position]
+        if oldest >= 0:
+            self.asked.discard(oldest)
+        self.ids[self.position] = question_id
+        self.asked.add(question_id)
+        self.position = (self.position + 1) % len(self.ids)
+
+
+def open_bank(path, source):
+    """Opens the bank at path, (re)building it from source first if that's newer.
+    None if there's no bank to open. Blocking, so use asyncio.to_thread."""
+    if os.path.exists(source) and (not os.path.exists(path) or os.path.getmtime(source) > os.path.getmtime(path)):
+        start = time.perf_counter()
+        try:
+            count = build_bank(source, path)
+        except (OSError, ValueError) as e:
+            logging.warning("Couldn't build the trivia bank from %s (%s)", source, e)
+        else:
+            logging.info("Built the trivia bank from %s, %s questions in %.0fms", source, count,
+                         (time.perf_counter() - start) * 1000)
+    try:
+        bank = TriviaBank(path)
+    except FileNotFoundError:
+        logging.warning("No trivia bank at %s, $trivia won't have any questions", path)
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning("Couldn't open the trivia bank %s (%s)", path, e)
+        return None
+    logging.info("Opened the trivia bank %s, %s questions in %s categories", path, len(bank), len(bank.categories))
+    return bank
+
+
+# --- TRIVIA ---
+
+
+BANK_PATH = os.getenv("TRIVIA_BANK", "trivia.bank")
+# The questions that come with the bot, found next to the code so the bank gets built on the first
+# run wherever the bot is started from. The bank itself goes in the working directory like stats.db
+SOURCE_PATH = os.getenv("TRIVIA_SOURCE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                      "data", "trivia.tsv"))
+ANSWER_TIME = get_env_int("TRIVIA_ANSWER_TIME", 30)  # seconds to answer
+RECENT_SIZE = get_env_int("TRIVIA_RECENT", 100)  # questions a guild has to go through before one can repeat
+ANSWER_SLACK = 16  # how much longer than the longest answer a message can be and still get checked
+
+
+class Question:
+    """The question that's open in a channel."""
+
+    __slots__ = ("answer", "accepted", "shortest", "longest", "asker_id")
+
+    def __init__(self, answer, accepted, asker_id):
+        self.answer = answer
+        self.accepted = frozenset(accepted)
+        # Normalizing only ever makes things shorter (give or take some odd unicode), so anything
+        # shorter than the shortest answer or way longer than the longest one doesn't need normalizing at all
+        self.shortest = min(map(len, accepted))
+        self.longest = max(map(len, accepted)) + ANSWER_SLACK
+        self.asker_id = asker_id
+
+
+class Trivia(CategoryCog):
+    category = "minigame"
+    kept = ("open", "recent")  # The routes for open questions get pointed at the reloaded cog too
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.open = {}  # channel id -> Question
+        self.recent = {}  # guild id (channel id in DMs) -> RecentQuestions
+        self.bank_task = None
+
+    async def cog_load(self):
+        # Building a big bank can take a bit, so it happens in the background, $trivia waits if it has to
+        self.bank_task = asyncio.create_task(asyncio.to_thread(open_bank, BANK_PATH, SOURCE_PATH))
+
+    async def cog_unload(self):
+        bank = await self.bank_task
+        if bank is not None:
+            bank.close()
+
+    @commands.command(description="Trivia Time!!", aliases=["quiz"])
+    async def trivia(self, ctx, *, category: str = None):
+        bank = await self.bank_task
+        if bank is None:
+            await send_reply(ctx, "There aren't any trivia questions set up, sorry!", mention_author=True)
+            return
+        if ctx.channel.id in self.open:
+            await send_reply(ctx, "There's already a question going here, answer that one first!", mention_author=True)
+            return
+
+        if category is not None and category.casefold() not in bank.categories:
+            embed = discord.Embed(
+                title="Trivia categories" if category.casefold() == "categories" else f"No category called {category}",
+                description="\n".join(f"{name} ({count} questions)" for name, _, count in bank.categories.values()),
+                color=discord.Color.blue()
+            )
+            embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+            await send_reply(ctx, embed=embed, mention_author=True)
+            return
+
+        recent_key = ctx.guild.id if ctx.guild else ctx.channel.id
+        recent = self.recent.get(recent_key)
+        if recent is None:
+            # Never more than half the bank, or a small one would have nothing left to pick
+            recent = self.recent[recent_key] = RecentQuestions(min(RECENT_SIZE, max(1, len(bank) // 2)))
+        question_id = bank.pick(recent, category.casefold() if category else None)
+        recent.add(question_id)
+        question, answer, accepted = bank.question(question_id)
+
+        # Open before the reply goes out, so a fast answer doesn't get missed
+        self.open[ctx.channel.id] = Question(answer, accepted, ctx.author.id)
+        message_router.add(ctx.channel.id, None, self.check_answer, timeout=ANSWER_TIME, on_timeout=self.time_up)
+
+        embed = discord.Embed(
+            title=f"Trivia: {bank.category_of(question_id)}",
+            description=f"{question}\n\nType your answer in chat, you've got {ANSWER_TIME} seconds!",
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        message = await send_reply(ctx, embed=embed, mention_author=True)
+        if message is None:  # Dropped by the outbound scheduler, nobody saw the question
+            self.close(ctx.channel.id)
+            return
+        logging.info("%s (%s) asked trivia question %s", ctx.author, ctx.author.id, question_id)
+
+    def close(self, channel_id):
+        message_router.remove(channel_id, None)
+        return self.open.pop(channel_id, None)
+
+    async def check_answer(self, message):
+        """Gets every message in a channel with an open question, through the message router."""
+        current = self.open.get(message.channel.id)
+        # Most messages stop here, no normalizing or anything for chat that's obviously not an answer
+        if current is None or not current.shortest <= len(message.content) <= current.longest:
+            return
+        if normalize_answer(message.content) not in current.accepted:
+            return
+
+        self.close(message.channel.id)
+        stats_store.record(message.author.id, "trivia", "win")
+        logging.info("%s (%s) answered a trivia question right (%s)", message.author, message.author.id,
+                     current.answer)
+        await reply_to(message, f"{message.author.mention} got it! The answer was **{current.answer}**",
+                       category=self.category)
+
+    async def time_up(self, channel_id, user_id):
+        current = self.open.pop(channel_id, None)
+        if current is None:
+            return
+        try:
+            await send_to(self.bot.get_partial_messageable(channel_id),
+                          f"Time's up! The answer was **{current.answer}**", category=self.category)
+        except discord.HTTPException:
+            pass  # Channel's gone or we can't talk there anymore
+
+
+async def setup(bot):
+    await bot.add_cog(Trivia(bot))
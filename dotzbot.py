@@ -2,17 +2,34 @@
 
 
 # Standard library
+import asyncio
+import contextvars
+import functools
+import gzip
+import hashlib
+import importlib
+import io
+import json
 import logging
+import logging.handlers
+import math
+import mmap
 import os
-import platform
+import queue
+import shutil
 import secrets
+import sqlite3
+import sys
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
 # Third-party
 import aiohttp
 import discord
-from discord import app_commands, Button, ButtonStyle
+from aiohttp import web
+from discord import Button, ButtonStyle
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 
@@ -38,106 +55,2175 @@ def get_uptime() -> str:
 
 
 def get_command_count(bot):  # Partly made by chatgpt
-    visible = len([cmd for cmd in bot.commands if not cmd.hidden])
-    hidden = len([cmd for cmd in bot.commands if cmd.hidden])
+    all_commands = [*bot.commands, *get_unloaded_commands(bot)]
+    visible = len([cmd for cmd in all_commands if not cmd.hidden])
+    hidden = len([cmd for cmd in all_commands if cmd.hidden])
     return visible, hidden
 
 
+def get_env_int(name, default):
+    """Returns an int from the .env file, or the default if it's missing/broken."""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        logging.warning("%s isn't a number, using %s", name, default)
+        return default
+
+
+async def get_member_lazy(guild, user_id):
+    """Member from the cache, or asks the gateway for just that one member.
+
+    Members aren't chunked at startup anymore, so the cache only has people the bot has seen.
+    People who aren't in the guild get remembered by user_cache for a bit, so they don't get asked for every time.
+    """
+    member = guild.get_member(user_id)
+    if member is not None or not bot.intents.members:
+        return member
+    if user_cache.not_member(guild.id, user_id):
+        return None
+    try:
+        members = await guild.query_members(user_ids=[user_id], limit=1, cache=True)
+    except asyncio.TimeoutError:
+        return None  # not remembered, it might just be the gateway being slow
+    if not members:
+        user_cache.add_not_member(guild.id, user_id)
+        return None
+    return members[0]
+
+
+async def is_owner_cached(user):
+    """bot.is_owner, but only awaited once per user."""
+    if user.id not in owner_cache:
+        try:
+            owner_cache[user.id] = await bot.is_owner(user)
+        # Connection Failed (API Unreachable / Network Issue), No Permission or User doesn't exist
+        except (discord.HTTPException, discord.Forbidden, discord.NotFound):
+            return False  # not cached, so it tries again next time
+    return owner_cache[user.id]
+
+
+def get_env_ids(name, default):
+    """Comma separated IDs from the .env file as a frozenset, or the default."""
+    value = os.getenv(name)
+    if not value:
+        return frozenset(default)
+    try:
+        return frozenset(int(part) for part in value.split(",") if part.strip())
+    except ValueError:
+        logging.warning("%s has something that isn't an ID, using the default", name)
+        return frozenset(default)
+
+
 async def check_allowed_server(guild):
-    allowedservers = [
-        1303080585216131082,
-        1345174170572554362,
-        907012194175176714]
-    #   Allowed Servers: (in order)
-    #   dotz's corner
-    #   gamers inc. (reincarnated)
-    #   .PlaySpace
-
-    owner = guild.owner or await bot.fetch_user(guild.owner_id)
-
-    if guild.id in allowedservers:
+    """Leaves the guild if it isn't allowed, returns True if it left."""
+    if guild.id in ALLOWED_SERVERS:
+        return False
+
+    # Mentioning by ID works without the owner being cached, so no fetch_user needed
+    owner_mention = guild.owner.mention if guild.owner else f"<@{guild.owner_id}>"
+    channels = [guild.system_channel] if guild.system_channel else []
+    for channel in channels + guild.text_channels:  # System channel first, it's usually the right one
+        if channel.permissions_for(guild.me).send_messages:
+            await announce(channel, f"Sorry {owner_mention}, This server isn't apart of dotz's allowed server list. Contact dotz for help.")
+            break
+    await guild.leave()
+    logging.info("Left disallowed server, %s (%s)", guild.name, guild.id)
+    return True
+
+
+async def sweep_guilds(guilds):
+    """Checks a bunch of guilds at once (a few at a time), instead of one after another."""
+    semaphore = asyncio.Semaphore(get_env_int("ALLOWLIST_CONCURRENCY", 5))
+
+    async def check(guild):
+        async with semaphore:
+            try:
+                return await check_allowed_server(guild)
+            except discord.HTTPException as e:
+                logging.error("Couldn't check/leave %s (%s): %s", guild.name, guild.id, e)
+                return False
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(check(guild) for guild in guilds))
+    sweep_stats["guilds"] = len(results)
+    sweep_stats["left"] = sum(results)
+    sweep_stats["seconds"] = time.perf_counter() - start
+    logging.info("Checked %s servers in %.2fs, left %s", sweep_stats["guilds"],
+                 sweep_stats["seconds"], sweep_stats["left"])
+
+
+# --- HTTP ---
+
+
+class HttpClient:
+    """One shared aiohttp session for every outbound API call (meme-api, github, etc)"""
+
+    def __init__(self, limit=20, limit_per_host=4, dns_ttl=300, keepalive=30, timeout=10):
+        self.limit = limit
+        self.limit_per_host = limit_per_host  # so one slow API can't eat the whole pool
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.session = None
+        # Counters, shows if the pool is actually reusing connections
+        self.requests = 0
+        self.reused = 0
+        self.handshakes = 0  # new connections (TCP + TLS)
+        self.dns_lookups = 0
+        self.dns_cache_hits = 0
+
+    async def start(self):
+        if self.session is not None and not self.session.closed:
+            return
+
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_connection_create)
+        trace.on_connection_reuseconn.append(self._on_connection_reuse)
+        trace.on_dns_resolvehost_end.append(self._on_dns_lookup)
+        trace.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_request_end.append(self._on_request_end)
+        trace.on_request_exception.append(self._on_request_end)
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[trace],
+            headers={"User-Agent": "dotzbot (https://github.com/dotztv/dotzbot)"}
+        )
+        logging.info("Started HTTP client (pool %s, %s per host)",
+                     self.limit, self.limit_per_host)
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+            logging.info("Closed HTTP client (%s requests, %s reused, %s handshakes)",
+                         self.requests, self.reused, self.handshakes)
+
+    def get(self, url, *, timeout=None, **kwargs):
+        """Same as session.get, use with 'async with'. timeout is in seconds."""
+        if self.session is None or self.session.closed:
+            raise RuntimeError("HTTP client isn't started")
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        self.requests += 1
+        return self.session.get(url, **kwargs)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "reused": self.reused,
+            "handshakes": self.handshakes,
+            "dns_lookups": self.dns_lookups,
+            "dns_cache_hits": self.dns_cache_hits
+        }
+
+    # Trace callbacks, aiohttp calls these with (session, context, params)
+    async def _on_connection_create(self, *_):
+        self.handshakes += 1
+
+    async def _on_connection_reuse(self, *_):
+        self.reused += 1
+
+    async def _on_dns_lookup(self, *_):
+        self.dns_lookups += 1
+
+    async def _on_dns_cache_hit(self, *_):
+        self.dns_cache_hits += 1
+
+    async def _on_request_start(self, _session, context, _params):
+        context.start = time.perf_counter()
+
+    async def _on_request_end(self, _session, context, _params):
+        # Counts towards the "http" phase of whatever command is running
+        command_metrics.add_time("http", time.perf_counter() - context.start)
+
+
+# --- RETRIES ---
+
+
+class RetryableError(Exception):
+    """Raise inside a retried call to try again (bad status, nsfw meme, etc)
+
+    counts_as_failure=False means the API itself is fine, so it won't trip the circuit breaker.
+    retry_after is the API's Retry-After in seconds, if it sent one.
+    """
+
+    def __init__(self, message, counts_as_failure=True, retry_after=None):
+        super().__init__(message)
+        self.counts_as_failure = counts_as_failure
+        self.retry_after = retry_after
+
+
+def status_error(name, resp):
+    """RetryableError for a response that wasn't 200, with the Retry-After (429/503) if there is one."""
+    retry_after = None
+    try:
+        retry_after = float(resp.headers.get("Retry-After", ""))
+    except ValueError:  # Missing, or the HTTP date form which nobody we call uses
         pass
-    else:
-        for channel in guild.text_channels:
-            if channel.permissions_for(guild.me).send_messages:
-                await channel.send(f"Sorry {owner.mention}, This server isn't apart of dotz's allowed server list. Contact dotz for help.")
-                logging.info("Left disallowed server, %s (%s)",
-                             guild.name, guild.id)
+    return RetryableError(f"{name} returned {resp.status}", retry_after=retry_after)
+
+
+class CircuitOpenError(Exception):
+    """An API failed too many times in a row, so we don't even try for a bit."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is down, retrying in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Per-endpoint breaker, use as 'async with breaker:' around a request."""
+
+    FAILURES = (RetryableError, aiohttp.ClientError, asyncio.TimeoutError)
+
+    def __init__(self, name, failure_threshold=5, reset_after=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after  # seconds before letting one request through again
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False  # half-open, only one request gets to test the API
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return "open"
+        return "half-open"
+
+    async def __aenter__(self):
+        state = self.state
+        if state == "open" or (state == "half-open" and self.trial_running):
+            retry_after = self.reset_after - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(self.name, max(retry_after, 0))
+        if state == "half-open":
+            self.trial_running = True
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.trial_running = False
+        if exc_type is None:
+            self.failures = 0
+            self.opened_at = None
+        elif issubclass(exc_type, self.FAILURES) and getattr(exc, "counts_as_failure", True):
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.state == "half-open":
+                    logging.warning("Circuit for %s opened after %s failures",
+                                    self.name, self.failures)
+                self.opened_at = time.monotonic()
+        return False  # never swallows the exception
+
+
+circuit_breakers = {}
+
+
+def get_breaker(name):
+    if name not in circuit_breakers:
+        circuit_breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=get_env_int("BREAKER_THRESHOLD", 5),
+            reset_after=get_env_int("BREAKER_RESET", 30)
+        )
+    return circuit_breakers[name]
+
+
+class RetryPolicy:
+    """Retries a coroutine function with capped exponential backoff + jitter.
+
+    If the API said how long to wait (Retry-After) it waits at least that long,
+    or gives up straight away if that's longer than max_delay.
+    """
+
+    RETRY_ON = (RetryableError, aiohttp.ClientError, asyncio.TimeoutError)
+
+    def __init__(self, attempts=3, base_delay=0.5, max_delay=5.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """Full jitter, somewhere between 0 and base * 2^attempt (capped)"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return ceiling * secrets.randbelow(1001) / 1000
+
+    async def run(self, func, *args):
+        for attempt in range(self.attempts):
+            try:
+                return await func(*args)
+            except self.RETRY_ON as e:  # CircuitOpenError isn't in here, so it fails fast
+                if attempt + 1 >= self.attempts:
+                    raise
+                delay = self.delay(attempt)
+                retry_after = getattr(e, "retry_after", None)
+                if retry_after is not None:
+                    if retry_after > self.max_delay:
+                        raise  # not keeping a command waiting that long
+                    delay = max(delay, retry_after)
+                logging.info("%s failed (%s), retry %s/%s in %.2fs", getattr(func, "__name__", func),
+                             e or type(e).__name__, attempt + 1, self.attempts - 1, delay)
+                await asyncio.sleep(delay)
+
+
+# --- MEMES ---
+
+
+# Magic bytes, so the attachment gets the right extension instead of always .png
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif")
+)
+
+
+def detect_image_type(head):
+    """Returns the file extension from the first few bytes of an image, or None."""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def make_meme(post, image=None, extension=None):
+    """Turns a meme-api post and it's image into what $meme sends.
+
+    image is the bytearray it was downloaded into, or None when it was too big,
+    then $meme just embeds the url instead.
+    """
+    return {
+        "title": post.get("title"),
+        "subreddit": post.get("subreddit"),
+        "postLink": post.get("postLink", post.get("url")),
+        "url": post.get("url"),
+        "image": image,
+        "filename": f"meme.{extension}" if extension else None
+    }
+
+
+def meme_size(item):
+    return len(item["image"]) if item["image"] is not None else 0
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only file over a bytearray, for discord.File.
+
+    BytesIO copies anything that isn't bytes, this reads straight out of the
+    buffer so a meme is only ever in memory once, even with a few sends going.
+    """
+
+    def __init__(self, buffer):
+        super().__init__()
+        self.view = memoryview(buffer).cast("B")
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        chunk = self.view[self.position:self.position + len(b)]
+        b[:len(chunk)] = chunk
+        self.position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+async def fetch_meme_posts(count=1):
+    """Gets up to count SFW posts from meme-api, nsfw ones are thrown away before downloading anything."""
+    url = MEME_API if count == 1 else f"{MEME_API}/{count}"
+    async with get_breaker("meme-api"):
+        async with http_client.get(url, timeout=5) as resp:
+            if resp.status != 200:
+                raise status_error("meme-api", resp)
+            json_data = await resp.json()
+
+    posts = json_data.get("memes", [json_data])  # /gimme/N gives a list, /gimme gives one
+    return [post for post in posts if post.get("url") and not post.get("nsfw", False)]
+
+
+async def download_meme(post):
+    """Streams the image in chunks and gives up once it's over MEME_MAX_BYTES,
+    so a huge gif never sits fully in memory."""
+    async with get_breaker("meme-images"):
+        async with http_client.get(post["url"]) as img_resp:
+            if img_resp.status != 200:
+                raise status_error("meme image", img_resp)
+            # Don't even start if the server already says it's too big
+            if img_resp.content_length and img_resp.content_length > MEME_MAX_BYTES:
+                return make_meme(post)
+
+            # Sized up front when the server says how big it is, growing it as it goes leaves up to 1/8 unused
+            image = bytearray(img_resp.content_length or 0)
+            size = 0
+            async for chunk in img_resp.content.iter_chunked(64 * 1024):
+                image[size:size + len(chunk)] = chunk
+                size += len(chunk)
+                if size > MEME_MAX_BYTES:
+                    return make_meme(post)  # closing the response drops the rest
+            del image[size:]  # if it sent less than it said
+
+    extension = detect_image_type(bytes(image[:16]))
+    if extension is None:  # Not an image we know, let discord figure out the url
+        return make_meme(post)
+    return make_meme(post, image, extension)  # no bytes(image), that'd be a second copy of it
+
+
+async def fetch_one_meme():
+    posts = await fetch_meme_posts()
+    if not posts:  # It was NSFW, the API is fine though
+        raise RetryableError("got an NSFW meme", counts_as_failure=False)
+    return await download_meme(posts[0])
+
+
+async def fetch_meme():
+    """Live fetch with retries, used when the buffer is empty."""
+    return await retry_policy.run(fetch_one_meme)
+
+
+class MemeBuffer:
+    """Memes that are already checked and downloaded, so $meme doesn't have to wait for 2 requests."""
+
+    def __init__(self, size=10, max_bytes=20_000_000, concurrency=3):
+        self.size = size
+        self.max_bytes = max_bytes  # total image bytes kept in memory
+        self.concurrency = concurrency
+        self.memes = deque()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.memes)
+
+    def pop(self):
+        """Returns a buffered meme, or None if it's empty."""
+        if not self.memes:
+            self.misses += 1
+            return None
+        self.hits += 1
+        item = self.memes.popleft()
+        self.bytes -= meme_size(item)
+        return item
+
+    def add(self, item):
+        """Returns False if it doesn't fit."""
+        size = meme_size(item)
+        if len(self.memes) >= self.size or self.bytes + size > self.max_bytes:
+            return False
+        self.memes.append(item)
+        self.bytes += size
+        return True
+
+    async def refill(self):
+        missing = self.size - len(self.memes)
+        if missing <= 0:
+            return 0
+
+        # A few extra since some get thrown out, meme-api caps at 50
+        posts = await fetch_meme_posts(min(missing + 2, 50))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def download(post):
+            async with semaphore:
+                try:
+                    return await download_meme(post)
+                except (RetryableError, CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError):
+                    return None  # just skip it, the next refill gets another one
+
+        added = 0
+        for item in await asyncio.gather(*(download(post) for post in posts[:missing])):
+            if item is not None and self.add(item):
+                added += 1
+        return added
+
+    def stats(self):
+        return {
+            "buffered": len(self.memes),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# --- GITHUB ---
+
+
+class CommitCache:
+    """Latest commit for $botinfo, so it doesn't ask github every single time.
+
+    Once it's older than the ttl the old one is still returned while a refresh
+    runs in the background (stale-while-revalidate). Refreshes send the ETag,
+    and a 304 doesn't count against github's 60 requests/hour.
+    """
+
+    def __init__(self, repo, ttl=600):
+        self.repo = repo
+        self.ttl = ttl
+        self.commit = None
+        self.etag = None
+        self.fetched_at = None
+        self.refresh_task = None
+
+    @property
+    def age(self):
+        """Seconds since github last confirmed the commit, None if never."""
+        if self.fetched_at is None:
+            return None
+        return time.monotonic() - self.fetched_at
+
+    async def get(self):
+        if self.commit is None:  # Nothing to show yet, so this one has to wait
+            await asyncio.shield(self.start_refresh())
+        elif self.age > self.ttl:
+            self.start_refresh()
+        return self.commit
+
+    def start_refresh(self):
+        """Starts a refresh, or returns the one that's already running so they don't pile up."""
+        if self.refresh_task is None or self.refresh_task.done():
+            self.refresh_task = asyncio.create_task(self.refresh())
+            self.refresh_task.add_done_callback(self._refresh_done)
+        return self.refresh_task
+
+    @staticmethod
+    def _refresh_done(task):
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning("Couldn't refresh the latest commit (%s)", task.exception())
+
+    async def refresh(self):
+        await retry_policy.run(self._fetch)
+
+    async def _fetch(self):
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+
+        async with get_breaker("github"):
+            async with http_client.get(f"{GITHUB_API}/repos/{self.repo}/commits",
+                                       params={"per_page": 1}, headers=headers) as resp:
+                if resp.status == 304:  # Nothing new
+                    self.fetched_at = time.monotonic()
+                    return
+                if resp.status != 200:
+                    raise status_error("github", resp)
+                data = await resp.json()
+
+        self.commit = data[0]
+        self.etag = resp.headers.get("ETag")
+        self.fetched_at = time.monotonic()
+
+
+# --- LOGGING ---
+
+
+def count_lines(path, limit=None, chunk_size=1024 * 1024):
+    """Counts newlines in the first limit bytes of a file, 1MB at a time with mmap.
+
+    Blocking, so run it with asyncio.to_thread.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if limit is not None:
+            size = min(size, limit)
+        if size == 0:  # mmap can't map an empty file
+            return 0
+        lines = 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in range(0, size, chunk_size):
+                lines += mm[start:min(start + chunk_size, size)].count(b"\n")
+    return lines
+
+
+def gzip_namer(name):
+    return name + ".gz"
+
+
+def gzip_rotator(source, dest):
+    """Compresses the rotated log, runs on the log thread so it doesn't block anything."""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class LogFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that also keeps count of the lines/bytes it writes,
+    so $botinfo doesn't have to read the whole log every time.
+
+    Rotates when the file reaches max_bytes or every rotate_every seconds (0 turns either off).
+    The file isn't opened until the first record gets written.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=5, rotate_every=0, compress=False, encoding=None):
+        super().__init__(filename, mode="a", maxBytes=max_bytes,
+                         backupCount=backup_count, encoding=encoding, delay=True)
+        self.rotate_every = rotate_every
+        self.next_rotation = time.time() + rotate_every if rotate_every else None
+        if compress:
+            self.namer = gzip_namer
+            self.rotator = gzip_rotator
+        # Whatever was already in the file gets counted once by scan_existing
+        self.start_size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+        self.lines = 0
+        self.bytes = self.start_size
+        self.rotations = 0
+
+    def format(self, record):
+        # emit() calls this under the handler lock, so the counts are thread safe
+        msg = super().format(record)
+        self.lines += msg.count("\n") + 1
+        self.bytes += len(msg.encode(self.encoding or "utf-8", "replace")) + len(self.terminator)
+        return msg
+
+    def shouldRollover(self, record):
+        # The default one formats every record a second time just to measure it, we already know the size
+        if self.next_rotation is not None and time.time() >= self.next_rotation:
+            return True
+        return self.maxBytes > 0 and self.bytes >= self.maxBytes
+
+    def doRollover(self):
+        super().doRollover()
+        self.lines = 0
+        self.bytes = 0
+        self.start_size = 0
+        self.rotations += 1
+        if self.rotate_every:
+            self.next_rotation = time.time() + self.rotate_every
+
+    async def scan_existing(self):
+        if self.start_size:
+            rotations = self.rotations
+            lines = await asyncio.to_thread(count_lines, self.baseFilename, self.start_size)
+            if rotations == self.rotations:  # It's a different file if it rotated meanwhile
+                self.lines += lines
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for LOG_JSON=1."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+# --- INTENTS ---
+
+
+# What every prefix command needs no matter what, guilds is also needed for the guild/channel cache
+BASE_INTENTS = ("guilds", "guild_messages", "dm_messages", "message_content")
+
+
+def get_intent_profile(command_list):
+    """Works out the smallest intents + member cache flags from each command's .intents"""
+    profile = discord.Intents.none()
+    for name in BASE_INTENTS:
+        setattr(profile, name, True)
+    for command in command_list:
+        for name in getattr(command, "intents", ()):
+            setattr(profile, name, True)
+
+    # Only keep members we actually run into, nothing for voice since no command uses it
+    cache_flags = discord.MemberCacheFlags.none()
+    cache_flags.joined = profile.members
+    return profile, cache_flags
+
+
+# --- COMMAND TREE ---
+
+
+TREE_HASH_FILE = ".tree_hash.json"
+
+
+def get_tree_fingerprint(guild=None):
+    """Hash of everything a sync would send to discord (names, descriptions, parameters)
+    plus the hybrid commands' aliases, so it only changes when the commands do."""
+    payload = []
+    for command in sorted(bot.tree.get_commands(guild=guild), key=lambda c: c.name):
+        try:
+            payload.append(command.to_dict(bot.tree))
+        except TypeError:  # Older discord.py doesn't take the tree
+            payload.append(command.to_dict())
+    aliases = {command.name: sorted(command.aliases) for command in bot.commands
+               if isinstance(command, commands.HybridCommand)}
+    blob = json.dumps({"commands": payload, "aliases": aliases}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def load_tree_hashes():
+    try:
+        with open(TREE_HASH_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_tree_hashes(hashes):
+    with open(TREE_HASH_FILE, "w", encoding="utf-8") as f:
+        json.dump(hashes, f, indent=2)
+
+
+async def sync_tree(guild=None, force=False):
+    """Syncs the app commands, but only if they changed since the last sync. Returns True if it synced."""
+    scope = f"guild:{guild.id}" if guild else "global"
+    fingerprint = get_tree_fingerprint(guild)
+    hashes = load_tree_hashes()
+    if not force and hashes.get(scope) == fingerprint:
+        logging.info("Skipped %s sync, application commands haven't changed", scope)
+        return False
+
+    await bot.tree.sync(guild=guild)
+    hashes[scope] = fingerprint  # Only saved after it actually worked
+    save_tree_hashes(hashes)
+    logging.info("Synced application commands (%s)", scope)
+    return True
+
+
+# --- HELP ---
+
+
+# Order of the $help pages, anything else (like test commands) goes at the end as "Other"
+HELP_CATEGORIES = {
+    "fun": "Fun",
+    "minigame": "Minigames",
+    "info": "Info",
+    "moderation": "Moderation",
+    "admin": "Admin (dotz only)"
+}
+HELP_FIELDS_PER_PAGE = 10  # discord's limit is 25 fields per embed
+
+
+class HelpCatalogue:
+    """The $help pages, built once and only rebuilt when commands get added or removed.
+
+    Pages are shared between everyone, so copy() them before changing anything.
+    """
+
+    def __init__(self):
+        self.commands_key = None
+        self.pages = {False: (), True: ()}  # is_owner -> pages
+
+    def get_pages(self, is_owner):
+        commands_key = frozenset(bot.commands)
+        if commands_key != self.commands_key:
+            self.build()
+            self.commands_key = commands_key
+        return self.pages[is_owner]
+
+    def build(self):
+        for is_owner in (False, True):
+            groups = {}
+            for command in [*bot.commands, *get_unloaded_commands(bot)]:
+                if command.hidden and not is_owner:
+                    continue
+                category = getattr(command, "category", None)
+                groups.setdefault(category if category in HELP_CATEGORIES else None, []).append(command)
+
+            pages = []
+            for category in [*HELP_CATEGORIES, None]:
+                group = sorted(groups.get(category, []), key=lambda c: c.name)
+                for start in range(0, len(group), HELP_FIELDS_PER_PAGE):
+                    embed = discord.Embed(
+                        title=f"dotzbot's commands - {HELP_CATEGORIES.get(category, 'Other')}",
+                        description="",
+                        color=discord.Color.gold()
+                    )
+                    for command in group[start:start + HELP_FIELDS_PER_PAGE]:
+                        embed.add_field(
+                            name=f"${command.name}",
+                            value=command.description or "No description.",
+                            inline=False
+                        )
+                    pages.append(embed)
+            self.pages[is_owner] = tuple(pages)
+        logging.info("Built the $help catalogue (%s pages, %s for owner)",
+                     len(self.pages[False]), len(self.pages[True]))
+
+
+# --- METRICS ---
+
+
+# The timings dict of the command (or button click) running in the current task, set in before_invoke/timed_callback
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+METRIC_PHASES = ("total", "http", "discord", "compute")
+
+
+class Histogram:
+    """Prometheus style histogram, bucket bounds are in seconds."""
+
+    BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.BOUNDS):
+            if value <= bound:
                 break
-        await guild.leave()
+        else:
+            i = len(self.BOUNDS)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Rough quantile, the upper bound of the bucket it lands in."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.BOUNDS[i] if i < len(self.BOUNDS) else float("inf")
+        return float("inf")
+
+
+class CommandMetrics:
+    """Per-command invocation/error counts and latency histograms, split into
+    external HTTP, discord API and local compute (whatever's left).
+
+    Button clicks are in here too (see timed_callback), named like "blackjack:hit".
+    """
 
-# --- Setup ---
+    def __init__(self):
+        self.commands = {}
+        self.expired_interactions = 0  # slash commands that took longer than discord's 3 seconds
+
+    def get(self, name):
+        if name not in self.commands:
+            self.commands[name] = {
+                "invocations": 0,
+                "errors": 0,
+                "phases": {phase: Histogram() for phase in METRIC_PHASES}
+            }
+        return self.commands[name]
+
+    @staticmethod
+    def add_time(phase, seconds):
+        timings = current_timings.get()
+        if timings is not None:
+            timings[phase] += seconds
+
+    @staticmethod
+    def begin(trace_discord=False):
+        """New timings for whatever's running in this task. trace_discord counts every
+        request on discord's session (discord_trace), for clicks that answer with interaction.response."""
+        timings = {"start": time.perf_counter(), "http": 0.0, "discord": 0.0, "done": False,
+                   "trace_discord": trace_discord}
+        current_timings.set(timings)
+        return timings
+
+    def start(self, ctx):
+        ctx.timings = self.begin()
+
+        # Times replies/sends (slash ones don't go through bot.http, so this catches both)
+        send = ctx.send
+
+        async def timed_send(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await send(*args, **kwargs)
+            finally:
+                self.add_time("discord", time.perf_counter() - start)
+        ctx.send = timed_send
+
+    def finish(self, ctx, failed=False):
+        name = ctx.command.qualified_name if ctx.command else "unknown"
+        self.record(name, getattr(ctx, "timings", None), failed)
+
+    def record(self, name, timings, failed=False):
+        stats = self.get(name)
+        if failed:
+            stats["errors"] += 1
+        if timings is None or timings["done"]:  # never started, or already counted
+            return
+        timings["done"] = True
+        total = time.perf_counter() - timings["start"]
+        stats["invocations"] += 1
+        phases = stats["phases"]
+        phases["total"].observe(total)
+        phases["http"].observe(timings["http"])
+        phases["discord"].observe(timings["discord"])
+        phases["compute"].observe(max(total - timings["http"] - timings["discord"], 0.0))
+
+    def prometheus(self):
+        """Everything in the prometheus text format."""
+        lines = [
+            "# TYPE dotzbot_command_invocations_total counter",
+            "# TYPE dotzbot_command_errors_total counter",
+            "# TYPE dotzbot_command_phase_seconds histogram"
+        ]
+        for name, stats in sorted(self.commands.items()):
+            lines.append(f'dotzbot_command_invocations_total{{command="{name}"}} {stats["invocations"]}')
+            lines.append(f'dotzbot_command_errors_total{{command="{name}"}} {stats["errors"]}')
+            for phase, histogram in stats["phases"].items():
+                labels = f'command="{name}",phase="{phase}"'
+                cumulative = 0
+                for bound, count in zip((*Histogram.BOUNDS, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f'dotzbot_command_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"dotzbot_command_phase_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"dotzbot_command_phase_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# TYPE dotzbot_http_client gauge")
+        for key, value in http_client.stats().items():
+            lines.append(f'dotzbot_http_client{{stat="{key}"}} {value}')
+        lines.append("# TYPE dotzbot_meme_buffer gauge")
+        for key, value in meme_buffer.stats().items():
+            lines.append(f'dotzbot_meme_buffer{{stat="{key}"}} {value}')
+        lines.append("# TYPE dotzbot_user_cache gauge")
+        for key, value in user_cache.stats().items():
+            lines.append(f'dotzbot_user_cache{{stat="{key}"}} {value}')
+        lines.append("# TYPE dotzbot_outbound gauge")
+        for key, value in outbound.stats().items():
+            lines.append(f'dotzbot_outbound{{stat="{key}"}} {value}')
+        lines.append("# TYPE dotzbot_cooldowns gauge")
+        for key, value in cooldowns.stats().items():
+            lines.append(f'dotzbot_cooldowns{{stat="{key}"}} {value}')
+        lines.append("# TYPE dotzbot_message_routes gauge")
+        for key, value in message_router.stats().items():
+            lines.append(f'dotzbot_message_routes{{stat="{key}"}} {value}')
+        lines.append("# TYPE dotzbot_circuit_open gauge")
+        for name, breaker in circuit_breakers.items():
+            lines.append(f'dotzbot_circuit_open{{endpoint="{name}"}} {int(breaker.state != "closed")}')
+        lines.append("# TYPE dotzbot_log_lines gauge")
+        lines.append(f"dotzbot_log_lines {handler.lines}")
+        lines.append("# TYPE dotzbot_expired_interactions_total counter")
+        lines.append(f"dotzbot_expired_interactions_total {self.expired_interactions}")
+        lines.append("# TYPE dotzbot_allowlist_sweep_seconds gauge")
+        lines.append(f'dotzbot_allowlist_sweep_seconds {sweep_stats["seconds"]:.6f}')
+        lines.append("# TYPE dotzbot_gateway_latency_seconds gauge")
+        lines.append(f"dotzbot_gateway_latency_seconds {bot.latency:.6f}")
+        lines.append("# TYPE dotzbot_loop_lag_seconds gauge")
+        lines.append(f'dotzbot_loop_lag_seconds{{stat="p99"}} {health.lag.quantile(0.99):.6f}')
+        lines.append(f'dotzbot_loop_lag_seconds{{stat="max"}} {health.max_lag:.6f}')
+        if health.rss:
+            lines.append("# TYPE dotzbot_rss_bytes gauge")
+            lines.append(f"dotzbot_rss_bytes {health.rss[-1]}")
+        if health.fds is not None:
+            lines.append("# TYPE dotzbot_open_fds gauge")
+            lines.append(f"dotzbot_open_fds {health.fds}")
+        return "\n".join(lines) + "\n"
+
+    def discord_trace(self):
+        """TraceConfig for the bot's own HTTP session (bot = commands.Bot(http_trace=...))."""
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_discord_request_start)
+        trace.on_request_end.append(self._on_discord_request_end)
+        trace.on_request_exception.append(self._on_discord_request_end)
+        return trace
+
+    @staticmethod
+    async def _on_discord_request_start(_session, context, _params):
+        context.start = time.perf_counter()
+
+    @staticmethod
+    async def _on_discord_request_end(_session, context, _params):
+        # Commands already time their ctx.send, so only for the ones that asked
+        timings = current_timings.get()
+        if timings is not None and timings["trace_discord"]:
+            timings["discord"] += time.perf_counter() - context.start
+
+
+def timed_callback(name):
+    """Puts a view callback (a button) in command_metrics as name, goes under @discord.ui.button."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(view, interaction, item):
+            timings = command_metrics.begin(trace_discord=True)
+            failed = True
+            try:
+                await func(view, interaction, item)
+                failed = False
+            finally:  # errors still go on to the view's on_error
+                command_metrics.record(name, timings, failed)
+        return wrapper
+    return decorator
+
+
+async def metrics_endpoint(_request):
+    # The prometheus text format's content type, version and all
+    return web.Response(body=command_metrics.prometheus().encode(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+async def start_metrics_server(host, port):
+    """Serves /metrics for prometheus, only on localhost by default."""
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_endpoint)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info("Serving metrics on http://%s:%s/metrics", host, port)
+    return runner
+
+
+# --- SLOW COMMANDS ---
+
+
+# Discord gives slash commands 3 seconds for the first response, defer anything expected to take longer than this
+DEFER_HISTORY = 20  # runs needed before the measured p95 is trusted over .latency_budget
+
+
+def expected_latency(command):
+    """p95 of how long the command actually takes, or its declared .latency_budget
+    until it has run enough times."""
+    stats = command_metrics.commands.get(command.qualified_name)
+    if stats and stats["phases"]["total"].count >= DEFER_HISTORY:
+        return stats["phases"]["total"].quantile(0.95)
+    return getattr(command, "latency_budget", 0.0)
+
+
+async def defer_if_slow(ctx):
+    """Slash: defers so the reply becomes a followup instead of failing after 3s.
+    Prefix: shows "dotzbot is typing..." so people know it's working on it."""
+    if ctx.command is None or expected_latency(ctx.command) < DEFER_THRESHOLD:
+        return
+    if ctx.interaction is not None:
+        if not ctx.interaction.response.is_done():
+            await ctx.defer()
+    else:
+        await ctx.typing()  # Lasts until the reply is sent (or 10 seconds)
+
+
+def is_expired_interaction(error):
+    """Unknown interaction (10062) is what discord says when we took too long."""
+    original = getattr(error, "original", error)
+    original = getattr(original, "original", original)  # hybrid errors are wrapped twice
+    return isinstance(original, discord.NotFound) and original.code == 10062
+
+
+# --- USERS ---
+
+
+class UserCache:
+    """bot.fetch_user with an LRU + TTL cache.
+
+    IDs that don't exist are remembered for a bit too, and if the same ID is
+    looked up while it's already being fetched they share the one request.
+    Also remembers who isn't in a guild, for get_member_lazy.
+    """
+
+    def __init__(self, size=500, ttl=600, negative_ttl=60):
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.users = OrderedDict()  # id -> (expires, user), oldest first
+        self.missing = OrderedDict()  # id -> expires, for NotFound
+        self.not_members = OrderedDict()  # (guild id, id) -> expires, for empty query_members
+        self.pending = {}  # id -> task of the fetch that's running
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+
+    async def get(self, user_id):
+        """Returns the User, or None if it doesn't exist."""
+        now = time.monotonic()
+        entry = self.users.get(user_id)
+        if entry is not None and entry[0] > now:
+            self.users.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+        if self.missing.get(user_id, 0) > now:
+            self.hits += 1
+            return None
+
+        self.misses += 1
+        task = self.pending.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(user_id))
+            self.pending[user_id] = task
+            task.add_done_callback(lambda _: self.pending.pop(user_id, None))
+        # shield so one caller getting cancelled doesn't cancel it for everyone else
+        return await asyncio.shield(task)
+
+    def peek(self, user_id):
+        """The cached User, or None. Never fetches."""
+        entry = self.users.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def not_member(self, guild_id, user_id):
+        """True if the gateway said they aren't in that guild recently."""
+        return self.not_members.get((guild_id, user_id), 0) > time.monotonic()
+
+    def add_not_member(self, guild_id, user_id):
+        self._store(self.not_members, (guild_id, user_id), time.monotonic() + self.negative_ttl)
+
+    def forget_not_member(self, guild_id, user_id):
+        self.not_members.pop((guild_id, user_id), None)
+
+    async def _fetch(self, user_id):
+        self.fetches += 1
+        try:
+            user = await bot.fetch_user(user_id)
+        except discord.NotFound:
+            self._store(self.missing, user_id, time.monotonic() + self.negative_ttl)
+            return None
+        self.missing.pop(user_id, None)
+        self._store(self.users, user_id, (time.monotonic() + self.ttl, user))
+        return user
+
+    def _store(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.size:
+            cache.popitem(last=False)
+
+    def stats(self):
+        return {
+            "cached": len(self.users),
+            "missing": len(self.missing),
+            "not_members": len(self.not_members),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetches": self.fetches
+        }
+
+
+# --- OUTBOUND ---
+
+
+# Send priority, lower goes first
+LANE_HIGH = 0  # admin stuff and announcements
+LANE_NORMAL = 1
+LANE_LOW = 2  # fun/minigame replies, the first to get dropped when things get busy
+CATEGORY_LANES = {
+    "admin": LANE_HIGH,
+    "moderation": LANE_HIGH,
+    "info": LANE_NORMAL,
+    "fun": LANE_LOW,
+    "minigame": LANE_LOW
+}
+
+
+class TokenBucket:
+    """rate tokens per per seconds, take() waits until there's one. It holds burst tokens at most
+    (rate if not given), so any per seconds long window sees rate + burst takes at most."""
+
+    def __init__(self, rate, per, burst=None):
+        self.capacity = rate if burst is None else burst
+        self.tokens = float(self.capacity)
+        self.fill_rate = rate / per
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+
+    @property
+    def full(self):
+        self.refill()
+        return self.tokens >= self.capacity
+
+    async def take(self):
+        while True:
+            self.refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+
+class ChannelQueue:
+    __slots__ = ("lanes", "bucket", "worker")
+
+    def __init__(self, bucket):
+        self.lanes = (deque(), deque(), deque())  # one per LANE_*
+        self.bucket = bucket
+        self.worker = None
+
+    def __len__(self):
+        return sum(len(lane) for lane in self.lanes)
+
+    def pop(self):
+        for lane in self.lanes:
+            if lane:
+                return lane.popleft()
+        return None
+
+
+class OutboundScheduler:
+    """Every message the bot sends goes through here, so bursts get spread out
+    instead of running into discord's 429s (and discord.py sleeping inside the command).
+
+    Each channel has it's own token bucket and there's a global one on top.
+    Identical channel messages (announce/send_to) that are still waiting get sent once,
+    replies never do since each one answers someone else. When a channel's queue
+    is deep the low priority (fun) replies get dropped first.
+    """
+
+    def __init__(self, channel_rate=5, channel_per=5.0, global_rate=45, global_per=1.0, max_depth=10):
+        self.channel_rate = channel_rate
+        self.channel_per = channel_per
+        self.global_bucket = TokenBucket(global_rate, global_per)
+        self.max_depth = max_depth
+        self.channels = {}  # channel id -> ChannelQueue
+        self.pending = {}  # coalesce key -> future of the send that's waiting
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    async def submit(self, channel_id, send, lane=LANE_NORMAL, key=None):
+        """send is a coroutine function that does the actual sending, whatever it
+        returns gets returned here. Returns None if it got dropped."""
+        if key is not None and key in self.pending:
+            self.coalesced += 1
+            return await asyncio.shield(self.pending[key])
+
+        queue = self.channels.get(channel_id)
+        if queue is None:
+            if len(self.channels) > 256:
+                self.prune()
+            queue = self.channels[channel_id] = ChannelQueue(
+                TokenBucket(self.channel_rate, self.channel_per))
+
+        if len(queue) >= self.max_depth:
+            if lane == LANE_LOW:
+                self.dropped += 1
+                return None
+            self.drop_oldest_low(queue)  # make room for the important one
+
+        future = asyncio.get_running_loop().create_future()
+        queue.lanes[lane].append((send, future, key))
+        if key is not None:
+            self.pending[key] = future
+        if queue.worker is None:
+            # In a fresh context, or it'd keep the contextvars (current_timings) of whichever
+            # command happened to start it and every later send would get timed against that one
+            queue.worker = contextvars.Context().run(asyncio.create_task, self.drain(queue))
+        # shield so the message still gets sent even if the command gets cancelled
+        return await asyncio.shield(future)
+
+    def drop_oldest_low(self, queue):
+        if queue.lanes[LANE_LOW]:
+            _, future, key = queue.lanes[LANE_LOW].popleft()
+            if key is not None:
+                self.pending.pop(key, None)
+            future.set_result(None)
+            self.dropped += 1
+
+    async def drain(self, queue):
+        try:
+            while len(queue):
+                # Wait for the tokens first, so something important that shows up meanwhile still goes next
+                await queue.bucket.take()
+                await self.global_bucket.take()
+                item = queue.pop()
+                if item is None:  # it got dropped while waiting, nothing got sent so both tokens go back
+                    queue.bucket.tokens += 1
+                    self.global_bucket.tokens += 1
+                    break
+                send, future, key = item
+                try:
+                    result = await send()
+                except Exception as e:  # goes back to whoever submitted it
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    self.sent += 1
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    if key is not None:
+                        self.pending.pop(key, None)
+        finally:
+            queue.worker = None
+
+    def prune(self):
+        """Forgets channels that aren't sending anything and have a full bucket, keeps it O(active channels)"""
+        for channel_id, queue in list(self.channels.items()):
+            if queue.worker is None and not len(queue) and queue.bucket.full:
+                del self.channels[channel_id]
+
+    def stats(self):
+        return {
+            "channels": len(self.channels),
+            "queued": sum(len(queue) for queue in self.channels.values()),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped
+        }
+
+
+def coalesce_key(channel_id, args, kwargs):
+    """Same channel + same content/embed = same key. Files and views are never merged.
+    Only for plain channel sends (announce/send_to), a reply merged into someone else's
+    would leave whoever asked without an answer."""
+    if "file" in kwargs or "files" in kwargs or "view" in kwargs:
+        return None
+    embed = kwargs.get("embed")
+    blob = json.dumps([channel_id, args, kwargs.get("content"), embed.to_dict() if embed else None],
+                      sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+async def send_reply(ctx, *args, **kwargs):
+    """ctx.reply through the outbound scheduler, the lane comes from the command's category.
+
+    Slash commands skip the queue, interaction responses don't count against the
+    channel's limit and have to be fast anyways.
+    """
+    if ctx.interaction is not None:
+        return await ctx.reply(*args, **kwargs)
+    lane = CATEGORY_LANES.get(getattr(ctx.command, "category", None), LANE_NORMAL)
+    start = time.perf_counter()
+    try:
+        return await outbound.submit(ctx.channel.id, lambda: ctx.reply(*args, **kwargs), lane=lane)
+    finally:
+        # The send runs on the channel's worker, outside this command's timings, so the
+        # whole wait (queue + rate limit + the send itself) gets counted here
+        command_metrics.add_time("discord", time.perf_counter() - start)
 
 
-load_dotenv()
-# Gives it all intents, TODO: Make it only have what it needs, same with permissions
-intents = discord.Intents.all()
-# Sets up bot with discord.ext command prefix, all intents and removes default help command
-bot = commands.Bot(command_prefix="$", intents=intents, help_command=None)
+async def reply_to(message, *args, category=None, **kwargs):
+    """message.reply through the scheduler, for replying to routed messages that don't have a ctx."""
+    lane = CATEGORY_LANES.get(category, LANE_NORMAL)
+    return await outbound.submit(message.channel.id, lambda: message.reply(*args, **kwargs), lane=lane)
 
-TOKEN = os.getenv("DISCORD_TOKEN")  # Gets the discord token from the .env file
-CESTIME = ZoneInfo("Europe/Oslo")  # should definetely name that better
-BOT_START_TIME = datetime.now(CESTIME)
-online = False
 
-handler = logging.FileHandler(
-    filename="discord.log", encoding="utf-8", mode="w")  # Sets up logging
-logging.basicConfig(
-    format="%(asctime)s / %(levelname)s = %(message)s", level=logging.INFO)
+async def send_to(channel, *args, category=None, **kwargs):
+    """channel.send through the scheduler with the lane from category, for game messages that
+    don't answer anything (like a timeout). announce() is for the ones that have to go first."""
+    lane = CATEGORY_LANES.get(category, LANE_NORMAL)
+    key = coalesce_key(channel.id, args, kwargs)
+    return await outbound.submit(channel.id, lambda: channel.send(*args, **kwargs), lane=lane, key=key)
 
 
-# --- Bot Events ---
+async def announce(channel, *args, **kwargs):
+    """channel.send through the scheduler, always high priority. Not a reply to anyone, so the
+    same announcement waiting twice in a channel only goes out once."""
+    key = coalesce_key(channel.id, args, kwargs)
+    return await outbound.submit(channel.id, lambda: channel.send(*args, **kwargs), lane=LANE_HIGH, key=key)
 
 
-@bot.event
-async def on_ready():
-    global online  # So it's reusable
-    if not online:  # Now it won't send multiple times if the bot reconnects
-        embed = discord.Embed(
-            title="dotzbot is online",
-            # Formats to a more readable version
-            description=BOT_START_TIME.strftime("%Y-%m-%d %H:%M:%S"),
-            color=discord.Color.green()
-        )
-        # Channel ID of my server's channel for the bot
-        dotzbot_channel = bot.get_channel(1399359500049190912)
-        # Sends it to the specified channel
-        await dotzbot_channel.send(embed=embed)
-        logging.info("Logged in as %s", bot.user)
+def layout_only(view):
+    """Stops a view, so sending it just draws the buttons and doesn't register it for that
+    message. For games where one persistent view (bot.add_view) handles every click."""
+    view.stop()
+    return view
 
-        # Sync application commands: first to dev guild for fast testing, then globally
+
+# --- COOLDOWNS ---
+
+
+class SlowDown(commands.CommandError):
+    """Someone's going too fast, on_command_error turns it into a friendly reply."""
+
+    def __init__(self, retry_after, busy=False):
+        if busy:
+            message = f"You've already got one of those running, try again in {retry_after:.0f}s"
+        else:
+            message = f"Slow down! Try again in {retry_after:.1f}s"
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# category or command -> (uses, per seconds, running at once) for one user. A whole guild gets GUILD_FACTOR times that.
+# The expensive commands have their own rule, so they don't eat the cheap ones' uses in the same category.
+# Categories that aren't in here (admin, moderation) have no limits
+DEFAULT_COOLDOWNS = {
+    "fun": (8, 10, 2),
+    "minigame": (6, 10, 2),
+    "info": (8, 10, 2),
+    "meme": (3, 10, 1),  # goes out to meme-api and uploads a file
+    "botinfo": (3, 10, 1),  # github commit + counting every command
+    "userinfo": (3, 10, 1)  # fetch_user + maybe asking the gateway for the member
+}
+
+
+def get_cooldown_rules():
+    """DEFAULT_COOLDOWNS, overridable with COOLDOWN_FUN=8/10/2 or COOLDOWN_MEME=3/10/1 etc in the .env file."""
+    rules = dict(DEFAULT_COOLDOWNS)
+    for name in rules:
+        value = os.getenv(f"COOLDOWN_{name.upper()}")
+        if not value:
+            continue
         try:
-            dev_guild = discord.Object(id=907012194175176714)
-            await bot.tree.sync(guild=dev_guild)
-            logging.info(
-                "Synced application commands to dev guild %s", dev_guild.id)
-        except Exception:
-            logging.error("Failed to sync application commands to dev guild")
+            uses, per, running = (int(part) for part in value.split("/"))
+            rules[name] = (uses, per, running)
+        except ValueError:
+            logging.warning("COOLDOWN_%s should look like uses/seconds/running, using the default",
+                            name.upper())
+    return rules
+
+
+class CooldownEngine:
+    """Per user and per guild rate limits + concurrency limits, by command category
+    (or by command, for the ones with their own rule).
+
+    Rate limits are token buckets. Buckets that have fully refilled are the same
+    as no bucket at all, so they get thrown away and memory stays O(active users).
+    """
+
+    def __init__(self, rules, guild_factor=5):
+        self.rules = rules
+        self.guild_factor = guild_factor
+        self.buckets = {}  # (scope, id, rule) -> [tokens, last update]
+        self.running = {}  # (scope, id, rule) -> commands running right now
+        self.checks = 0
+        self.rejected = 0
+
+    def limits(self, key):
+        """(capacity, seconds to refill, max running) for a bucket key."""
+        uses, per, running = self.rules[key[2]]
+        factor = self.guild_factor if key[0] == "guild" else 1
+        return uses * factor, per, running * factor
+
+    def tokens(self, key, now):
+        capacity, per, _ = self.limits(key)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return capacity
+        return min(capacity, bucket[0] + (now - bucket[1]) * capacity / per)
+
+    def rule_for(self, command):
+        """The command's own rule if it has one, otherwise its category's."""
+        if command.qualified_name in self.rules:
+            return command.qualified_name
+        return getattr(command, "category", None)
+
+    def acquire(self, user_id, guild_id, rule):
+        """Takes a use, raises SlowDown if it's over a limit. Returns the keys to
+        give to release() once the command is done (None if the rule doesn't exist)"""
+        if rule not in self.rules:
+            return None
+        now = time.monotonic()
+        self.checks += 1
+        if self.checks % 256 == 0:
+            self.evict(now)
+
+        keys = [("user", user_id, rule)]
+        if guild_id is not None:
+            keys.append(("guild", guild_id, rule))
+
+        levels = [(key, self.tokens(key, now)) for key in keys]
+        retry_after = 0.0
+        for key, tokens in levels:
+            if tokens < 1:
+                capacity, per, _ = self.limits(key)
+                retry_after = max(retry_after, (1 - tokens) * per / capacity)
+        if retry_after:
+            self.rejected += 1
+            raise SlowDown(retry_after)
+        for key in keys:
+            if self.running.get(key, 0) >= self.limits(key)[2]:
+                self.rejected += 1
+                raise SlowDown(1, busy=True)
+
+        # Only take anything once everything passed
+        for key, tokens in levels:
+            self.buckets[key] = [tokens - 1, now]
+            self.running[key] = self.running.get(key, 0) + 1
+        return keys
+
+    def release(self, keys):
+        for key in keys or ():
+            count = self.running.get(key, 0) - 1
+            if count > 0:
+                self.running[key] = count
+            else:
+                self.running.pop(key, None)
+
+    def evict(self, now):
+        for key in list(self.buckets):
+            if self.tokens(key, now) >= self.limits(key)[0]:
+                del self.buckets[key]
+
+    def stats(self):
+        return {
+            "buckets": len(self.buckets),
+            "running": sum(self.running.values()),
+            "checks": self.checks,
+            "rejected": self.rejected
+        }
+
+
+async def acquire_cooldown(ctx):
+    """Owner doesn't get limited."""
+    ctx.cooldown_keys = None
+    if ctx.command is None or await is_owner_cached(ctx.author):
+        return
+    ctx.cooldown_keys = cooldowns.acquire(
+        ctx.author.id, ctx.guild.id if ctx.guild else None, cooldowns.rule_for(ctx.command))
+
+
+def release_cooldown(ctx):
+    """Safe to call more than once, hybrid errors skip after_invoke so on_command_error calls it too."""
+    keys = getattr(ctx, "cooldown_keys", None)
+    ctx.cooldown_keys = None
+    cooldowns.release(keys)
+
+
+# --- STATS ---
+
+
+# The primary keys double as the lookup index, user_stats is only ever searched by user_id (the prefix)
+STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER NOT NULL,
+    game TEXT NOT NULL,
+    result TEXT NOT NULL,
+    times INTEGER NOT NULL,
+    PRIMARY KEY (user_id, game, result)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS total_stats (
+    game TEXT NOT NULL,
+    result TEXT NOT NULL,
+    times INTEGER NOT NULL,
+    PRIMARY KEY (game, result)
+) WITHOUT ROWID;
+"""
+
+
+class StatsStore:
+    """Minigame results per user in SQLite, without a command ever waiting on the disk.
+
+    record() only adds to an in-memory batch, flush() writes the whole batch in one
+    transaction on a thread. get() answers from memory: the totals get loaded once in
+    open(), a user the first time someone asks (one lookup on the primary key), and
+    record() keeps both up to date after that.
+    """
+
+    def __init__(self, path, batch_size=500, cache_size=1000):
+        self.path = path
+        self.batch_size = batch_size  # flush early once this many different rows are waiting
+        self.cache_size = cache_size
+        self.db = None
+        self.lock = asyncio.Lock()  # One thing at a time on the connection
+        self.pending = {}  # (user_id, game, result) -> times, not written yet
+        self.totals = {}  # (game, result) -> times, everyone together
+        self.users = OrderedDict()  # user_id -> {(game, result): times}, least recently used first
+        self.flush_task = None
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    async def open(self):
+        self.db = await asyncio.to_thread(self._connect)
+        totals = await asyncio.to_thread(self._read_totals)
+        for key, times in self.totals.items():  # Anything recorded before open()
+            totals[key] = totals.get(key, 0) + times
+        self.totals = totals
+
+    def close(self):
+        """Writes whatever is left and closes the database. Blocking, it's for after the event loop stopped."""
+        if self.db is None:
+            return
+        if self.pending:
+            self._write(self.pending)
+            self.pending = {}
+        self.db.close()
+        self.db = None
+
+    def _connect(self):
+        # Only ever used through to_thread and under self.lock, so sharing it between threads is fine
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # Can lose the last commit on power loss, never corrupts
+        db.executescript(STATS_SCHEMA)
+        return db
+
+    def _read_totals(self):
+        rows = self.db.execute("SELECT game, result, times FROM total_stats")
+        return {(game, result): times for game, result, times in rows}
+
+    def _read_user(self, user_id):
+        rows = self.db.execute("SELECT game, result, times FROM user_stats WHERE user_id = ?", (user_id,))
+        return {(game, result): times for game, result, times in rows}
+
+    def _write(self, batch):
+        totals = {}
+        for (_, game, result), times in batch.items():
+            totals[(game, result)] = totals.get((game, result), 0) + times
+        with self.db:  # One transaction, rolled back if anything in it fails
+            self.db.executemany(
+                "INSERT INTO user_stats VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, game, result) DO UPDATE SET times = times + excluded.times",
+                [(*key, times) for key, times in batch.items()])
+            self.db.executemany(
+                "INSERT INTO total_stats VALUES (?, ?, ?) "
+                "ON CONFLICT (game, result) DO UPDATE SET times = times + excluded.times",
+                [(*key, times) for key, times in totals.items()])
+
+    def record(self, user_id, game, result):
+        """Counts one result. Never touches the database, so it's fine right in a command."""
+        key = (user_id, game, result)
+        self.pending[key] = self.pending.get(key, 0) + 1
+        self.totals[(game, result)] = self.totals.get((game, result), 0) + 1
+        summary = self.users.get(user_id)
+        if summary is not None:
+            summary[(game, result)] = summary.get((game, result), 0) + 1
+        if len(self.pending) >= self.batch_size and (self.flush_task is None or self.flush_task.done()):
+            self.flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Writes everything recorded so far, returns how many rows. A failed batch gets tried again next time."""
+        async with self.lock:
+            if not self.pending or self.db is None:
+                return 0
+            batch, self.pending = self.pending, {}
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except sqlite3.Error:
+                for key, times in batch.items():
+                    self.pending[key] = self.pending.get(key, 0) + times
+                self.failed_flushes += 1
+                raise
+        self.written += len(batch)
+        self.flushes += 1
+        return len(batch)
+
+    async def get(self, user_id):
+        """{(game, result): times} for one user. Shared, so don't change it."""
+        summary = self.users.get(user_id)
+        if summary is None:
+            async with self.lock:  # No flush halfway through, so the database + pending is everything
+                summary = self.users.get(user_id)  # Someone else might've loaded it while we waited
+                if summary is None:
+                    summary = await asyncio.to_thread(self._read_user, user_id) if self.db else {}
+                    for (pending_user, game, result), times in self.pending.items():
+                        if pending_user == user_id:
+                            summary[(game, result)] = summary.get((game, result), 0) + times
+                    self.users[user_id] = summary
+        self.users.move_to_end(user_id)
+        while len(self.users) > self.cache_size:
+            self.users.popitem(last=False)
+        return summary
+
+    def stats(self):
+        return {
+            "pending": len(self.pending),
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "cached_users": len(self.users)
+        }
+
+
+# --- TIMERS ---
+
+
+class TimerWheel:
+    """Timeouts for lots of things (games, sessions...) without a task or call_later each.
+
+    Keys sit in the slot for the tick they expire on, schedule() again moves them,
+    and whoever owns the wheel calls advance() once per tick (a tasks.loop) to get
+    everything that just expired. All O(1), expiry is up to one tick late.
+    """
+
+    def __init__(self, tick, max_delay):
+        self.tick = tick
+        self.slots = [set() for _ in range(math.ceil(max_delay / tick) + 1)]
+        self.position = 0
+        self.where = {}  # key -> slot index
+
+    def __len__(self):
+        return len(self.where)
+
+    def __contains__(self, key):
+        return key in self.where
+
+    def schedule(self, key, delay):
+        """Starts key's timer, or restarts it if it already had one. Longer than max_delay gets max_delay."""
+        self.cancel(key)
+        steps = min(len(self.slots) - 1, max(1, math.ceil(delay / self.tick)))
+        index = (self.position + steps) % len(self.slots)
+        self.slots[index].add(key)
+        self.where[key] = index
+
+    def cancel(self, key):
+        index = self.where.pop(key, None)
+        if index is not None:
+            self.slots[index].discard(key)
+
+    def advance(self):
+        """Moves one tick ahead, returns the keys that expired."""
+        self.position = (self.position + 1) % len(self.slots)
+        expired = self.slots[self.position]
+        if not expired:
+            return ()
+        self.slots[self.position] = set()
+        for key in expired:
+            del self.where[key]
+        return expired
+
+
+# --- MESSAGE ROUTES ---
+
+
+class MessageRouter:
+    """Sends messages that answer something (a guess, a trivia answer...) straight to whatever's waiting for them.
+
+    A bot.wait_for per game means every message gets checked by every waiter, so it gets
+    slower the more games are going. Here it's two dict lookups per message, no matter
+    how many there are. A route is for one person in a channel, or anyone in it (user_id
+    None), a message goes to both if both are there. Timeouts all share one TimerWheel
+    that the expire_routes task moves along.
+    """
+
+    def __init__(self, max_timeout):
+        self.routes = {}  # (channel id, user id or None) -> (on_message, on_timeout)
+        self.timers = TimerWheel(tick=1, max_delay=max_timeout)
+        self.dispatched = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self.routes)
+
+    def __contains__(self, key):
+        return key in self.routes
+
+    def add(self, channel_id, user_id, on_message, timeout=None, on_timeout=None):
+        """on_message(message) gets every message from user_id in channel_id (anyone if it's None)
+        until the route is removed, on_timeout(channel_id, user_id) runs if it's quiet for timeout seconds."""
+        key = (channel_id, user_id)
+        self.routes[key] = (on_message, on_timeout)
+        if timeout is None:
+            self.timers.cancel(key)
+        else:
+            self.timers.schedule(key, timeout)
+
+    def touch(self, channel_id, user_id, timeout):
+        """Restarts a route's timeout."""
+        self.timers.schedule((channel_id, user_id), timeout)
+
+    def remove(self, channel_id, user_id):
+        key = (channel_id, user_id)
+        self.timers.cancel(key)
+        return self.routes.pop(key, None) is not None
+
+    async def dispatch(self, message):
+        """Returns True if something was waiting for this message."""
+        channel_id = message.channel.id
+        user_route = self.routes.get((channel_id, message.author.id))
+        channel_route = self.routes.get((channel_id, None))
+        if user_route is None and channel_route is None:
+            return False
+        self.dispatched += 1
+        for route in (user_route, channel_route):
+            if route is None:
+                continue
+            try:
+                await route[0](message)
+            except Exception:  # A broken game shouldn't stop the message from being a command
+                logging.exception("Message route for %s in %s failed", message.author.id, channel_id)
+        return True
+
+    def advance(self):
+        """Moves the timeouts one tick, takes out the routes that expired and returns [(key, on_timeout)]."""
+        expired = []
+        for key in self.timers.advance():
+            route = self.routes.pop(key, None)
+            if route is not None:
+                expired.append((key, route[1]))
+        self.expired += len(expired)
+        return expired
+
+    def rebind(self, old, new):
+        """Points old's routes at the same methods on new, for a reloaded cog. Their timeouts keep going."""
+        for key, route in self.routes.items():
+            if getattr(route[0], "__self__", None) is old:
+                self.routes[key] = tuple(callback and getattr(new, callback.__name__) for callback in route)
+
+    def stats(self):
+        return {"routes": len(self.routes), "dispatched": self.dispatched, "expired": self.expired}
+
+
+# --- HEALTH ---
+
+
+def get_rss_bytes():
+    """Current memory use of the bot (resident set size)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # not linux, peak is the best we get
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
 
-        # Incase it was invited while offline
-        for guild in bot.guilds:
-            await check_allowed_server(guild)
 
-        # Removed if not is_running cause this will now only run once
-        random_activity.start()
-        im_alive.start()
-        online = True
+def get_open_fds():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+class HealthMonitor:
+    """Event loop lag, gateway latency, memory and open files, for the daily
+    digest and alerts in dotzbot's channel."""
+
+    def __init__(self, interval, lag_alert, rss_alert, alert_cooldown=600):
+        self.interval = interval
+        self.lag_alert = lag_alert  # seconds
+        self.rss_alert = rss_alert  # bytes
+        self.alert_cooldown = alert_cooldown
+        self.last_tick = None
+        # The histogram covers the whole digest period without keeping every sample
+        self.lag = Histogram()
+        self.max_lag = 0.0
+        self.recent_lag = deque(maxlen=120)
+        self.gateway = deque(maxlen=1440)  # 24h of per minute samples
+        self.rss = deque(maxlen=1440)
+        self.peak_rss = 0
+        self.fds = None
+        self.last_alerts = {}
+
+    def sample_lag(self):
+        """How late this tick woke up compared to when it was scheduled."""
+        now = time.monotonic()
+        last, self.last_tick = self.last_tick, now
+        if last is None:
+            return None
+        lag = max(now - last - self.interval, 0.0)
+        self.lag.observe(lag)
+        self.recent_lag.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        return lag
+
+    def sample_resources(self):
+        latency = bot.latency
+        if latency == latency and latency != float("inf"):  # nan/inf before the first heartbeat
+            self.gateway.append(latency)
+        rss = get_rss_bytes()
+        self.rss.append(rss)
+        self.peak_rss = max(self.peak_rss, rss)
+        self.fds = get_open_fds()
+        return rss
+
+    def reset_period(self):
+        self.lag = Histogram()
+        self.max_lag = 0.0
+        self.peak_rss = self.rss[-1] if self.rss else 0
+
+    async def alert(self, kind, message):
+        """Posts an alert, at most once per alert_cooldown for each kind."""
+        now = time.monotonic()
+        if now - self.last_alerts.get(kind, -self.alert_cooldown) < self.alert_cooldown:
+            return
+        self.last_alerts[kind] = now
+        logging.warning("Health alert (%s): %s", kind, message)
+        dotzbot_channel = bot.get_channel(DOTZBOT_CHANNEL_ID)
+        if dotzbot_channel is None:  # not ready yet
+            return
+        embed = discord.Embed(title="dotzbot health alert", description=message, color=discord.Color.red())
+        embed.set_footer(text=get_time_now())
+        try:
+            await announce(dotzbot_channel, embed=embed)
+        except discord.HTTPException as e:
+            logging.error("Couldn't send health alert: %s", e)
 
+    def add_digest_fields(self, embed):
+        embed.add_field(
+            name="Event Loop Lag",
+            value=(f"p50 {self.lag.quantile(0.5) * 1000:.0f}ms, p99 {self.lag.quantile(0.99) * 1000:.0f}ms, "
+                   f"max {self.max_lag * 1000:.0f}ms"),
+            inline=False)
+        if self.gateway:
+            embed.add_field(
+                name="Gateway Latency",
+                value=(f"avg {sum(self.gateway) / len(self.gateway) * 1000:.0f}ms, "
+                       f"max {max(self.gateway) * 1000:.0f}ms"),
+                inline=False)
+        if self.rss:
+            embed.add_field(
+                name="Memory",
+                value=f"{self.rss[-1] // (1024 * 1024)}MB now, {self.peak_rss // (1024 * 1024)}MB peak",
+                inline=False)
+        if self.fds is not None:
+            embed.add_field(name="Open Files", value=str(self.fds), inline=False)
+
+
+# --- COGS ---
+
+
+# Loaded in setup_hook, every command lives in one of these (cogs/<name>.py)
+EXTENSIONS = ("cogs.fun", "cogs.minigame", "cogs.guessthenumber", "cogs.info", "cogs.admin")
+# Prefix only cogs that aren't loaded until someone uses one of their commands, the heavy games
+# (poker's hand tables, the trivia bank, blackjack's shoes) and the ones hardly anyone uses.
+# Slash commands can't be lazy (they need to be in the tree before syncing). Their intents are
+# in the profile from the start like everyone else's
+LAZY_EXTENSIONS = ("cogs.blackjack", "cogs.poker", "cogs.trivia", "cogs.moderation", "cogs.test")
+lazy_catalogue = {}  # lazy extension -> its commands, from find_lazy_commands
+lazy_commands = {}  # name or alias -> lazy extension
+lazy_buttons = {}  # custom_id of a persistent button -> lazy extension
+
+
+class CategoryCog(commands.Cog):
+    """Base for the cogs in cogs/, every command in it gets the cog's category.
+
+    Cogs copy their commands when they're added, so command.x = ... after the def
+    doesn't survive that. Things like latency_budget and intents go in extras={}
+    instead and get copied onto the command here, so the getattr()s everywhere still work.
+    """
+
+    category = None
+    # Attributes the new instance takes over when the cog gets reloaded, so $reload doesn't end open games
+    kept = ()
+
+    def __init__(self, bot):  # skipcq: PYL-W0621
+        self.bot = bot
+        for command in self.walk_commands():
+            command.category = self.category
+            for key, value in command.extras.items():
+                setattr(command, key, value)
+
+    def take_over(self, old):
+        """Runs on the reloaded cog with the one it replaced, after that one's cog_unload."""
+        for name in self.kept:
+            setattr(self, name, getattr(old, name))
+        message_router.rebind(old, self)
+
+
+def find_commands(extension):
+    """The commands of the cogs in an extension, read off the cog classes. Only imports the
+    module, nothing gets made or added to the bot, so it works before there is one."""
+    module = importlib.import_module(extension)
+    found = []
+    for cog in vars(module).values():
+        if isinstance(cog, type) and issubclass(cog, CategoryCog) and cog.__module__ == module.__name__:
+            for command in cog.__cog_commands__:
+                if command.parent is None:
+                    command.category = cog.category
+                    for key, value in command.extras.items():  # Same as CategoryCog.__init__
+                        setattr(command, key, value)
+                    found.append(command)
+    return found
+
+
+def find_custom_ids(extension):
+    """custom_ids of the buttons in an extension's views, read off the view classes like find_commands."""
+    module = importlib.import_module(extension)
+    custom_ids = []
+    for view in vars(module).values():
+        if isinstance(view, type) and issubclass(view, discord.ui.View) and view.__module__ == module.__name__:
+            for item in getattr(view, "__view_children_items__", {}).values():
+                custom_id = getattr(item, "__discord_ui_model_kwargs__", {}).get("custom_id")
+                if custom_id:
+                    custom_ids.append(custom_id)
+    return custom_ids
+
+
+def find_lazy_commands():
+    """Fills lazy_catalogue/lazy_commands/lazy_buttons, so load_lazy_cog knows what to listen for and
+    $help, the command count and the intent profile have the lazy commands before they're loaded."""
+    for extension in LAZY_EXTENSIONS:
+        for custom_id in find_custom_ids(extension):
+            lazy_buttons[custom_id] = extension
+        lazy_catalogue[extension] = find_commands(extension)
+        for command in lazy_catalogue[extension]:
+            for name in (command.name, *command.aliases):
+                lazy_commands[name] = extension
+
+
+def get_unloaded_commands(bot):  # skipcq: PYL-W0621
+    return [command for extension, found in lazy_catalogue.items() if extension not in bot.extensions
+            for command in found]
+
+
+async def load_cog(name):
+    """Loads an extension, or reloads it in place if it already is. Returns how long it took in ms.
+
+    If the new version fails to load, discord.py keeps the old one running.
+    """
+    start = time.perf_counter()
+    if name in bot.extensions:
+        old = {cog_name: cog for cog_name, cog in bot.cogs.items() if cog.__module__ == name}
+        try:
+            await bot.reload_extension(name)
+        finally:  # Even if it failed, discord.py sets the old version up again as new cogs
+            for cog_name, cog in old.items():
+                new = bot.get_cog(cog_name)
+                if isinstance(new, CategoryCog) and new is not cog:
+                    new.take_over(cog)
+    else:
+        await bot.load_extension(name)
+    extension_times[name] = (time.perf_counter() - start) * 1000
+    return extension_times[name]
 
-@bot.event  # Vibe coded error handler
-async def on_command_error(ctx, error):
-    embed = discord.Embed(
-        title="An error occurred",
-        description=f"{type(error).__name__}: {error}",
-        color=discord.Color.red()
-    )
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.error("%s", error)
 
+async def load_cogs():
+    """Loads everything in EXTENSIONS, returns the total ms."""
+    start = time.perf_counter()
+    for name in EXTENSIONS:
+        await load_cog(name)
+    return (time.perf_counter() - start) * 1000
 
-@bot.event
-async def on_guild_join(guild):
-    await check_allowed_server(guild)
+
+async def load_lazy_cog(message):
+    """Loads the lazy cog a prefix command is in, so process_commands can find it after."""
+    if not message.content.startswith(bot.command_prefix):
+        return
+    words = message.content[len(bot.command_prefix):].split(maxsplit=1)
+    extension = lazy_commands.get(words[0]) if words else None
+    if extension is None or extension in bot.extensions:
+        return
+
+    async with lazy_lock:
+        if extension in bot.extensions:  # Someone else loaded it while we waited
+            return
+        elapsed = await load_cog(extension)
+    logging.info("Lazy loaded %s for $%s in %.1fms", extension, words[0], elapsed)
+
+
+async def answer_lazy_button(interaction):
+    """A click on a lazy cog's button while it isn't loaded, like a game from before a restart.
+    No view is there to answer it, and there's no game to go with it anyway."""
+    if interaction.type != discord.InteractionType.component:
+        return
+    extension = lazy_buttons.get((interaction.data or {}).get("custom_id"))
+    if extension is None or extension in bot.extensions:
+        return
+    await interaction.response.send_message("That game isn't going anymore, start a new one!", ephemeral=True)
+
+
+# --- Setup ---
+
+
+load_dotenv()
+TOKEN = os.getenv("DISCORD_TOKEN")  # Gets the discord token from the .env file
+CESTIME = ZoneInfo("Europe/Oslo")  # should definetely name that better
+BOT_START_TIME = datetime.now(CESTIME)
+online = False
+DOTZBOT_CHANNEL_ID = 1399359500049190912  # Channel ID of my server's channel for the bot
+
+ALLOWED_SERVERS = get_env_ids("ALLOWED_SERVERS", (
+    1303080585216131082,  # dotz's corner
+    1345174170572554362,  # gamers inc. (reincarnated)
+    907012194175176714    # .PlaySpace
+))
+sweep_stats = {"guilds": 0, "left": 0, "seconds": 0.0}  # Last startup allowlist check
+owner_cache = {}  # user id -> is owner, see is_owner_cached
+help_catalogue = HelpCatalogue()
+cooldowns = CooldownEngine(get_cooldown_rules(), guild_factor=get_env_int("COOLDOWN_GUILD_FACTOR", 5))
+outbound = OutboundScheduler(
+    channel_rate=get_env_int("CHANNEL_SEND_RATE", 5),  # messages per 5 seconds per channel
+    global_rate=get_env_int("GLOBAL_SEND_RATE", 45),  # messages per second, discord's limit is 50
+    max_depth=get_env_int("CHANNEL_QUEUE_DEPTH", 10)
+)
+user_cache = UserCache(
+    size=get_env_int("USER_CACHE_SIZE", 500),
+    ttl=get_env_int("USER_CACHE_TTL", 600),
+    negative_ttl=get_env_int("USER_CACHE_NEGATIVE_TTL", 60)
+)
+command_metrics = CommandMetrics()
+metrics_runner = None  # the /metrics web server, METRICS_PORT=0 turns it off
+extension_times = {}  # extension -> ms its last (re)load took
+startup_times = {}  # "cogs": ms to load EXTENSIONS, "ready": seconds from BOT_START_TIME to on_ready
+lazy_lock = asyncio.Lock()  # So two people using a lazy cog at once don't both load it
+# Longest timeout a route can have, anything longer gets cut down to this
+message_router = MessageRouter(max_timeout=get_env_int("ROUTE_MAX_TIMEOUT", 600))
+stats_store = StatsStore(
+    os.getenv("STATS_DB", "stats.db"),
+    batch_size=get_env_int("STATS_BATCH_SIZE", 500),
+    cache_size=get_env_int("STATS_CACHE_SIZE", 1000)
+)
+DEFER_THRESHOLD = get_env_int("DEFER_THRESHOLD_MS", 1500) / 1000
+health = HealthMonitor(
+    interval=get_env_int("LAG_SAMPLE_MS", 500) / 1000,
+    lag_alert=get_env_int("LAG_ALERT_MS", 250) / 1000,
+    rss_alert=get_env_int("RSS_ALERT_MB", 1024) * 1024 * 1024,
+    alert_cooldown=get_env_int("ALERT_COOLDOWN", 600)
+)
+
+# Can be pointed at a local stub server for testing
+MEME_API = os.getenv("MEME_API_URL", "https://meme-api.com/gimme")
+GITHUB_API = os.getenv("GITHUB_API_URL", "https://api.github.com")
+# Biggest meme image we download and re-upload, anything bigger is just embedded by url
+MEME_MAX_BYTES = get_env_int("MEME_MAX_BYTES", 8_000_000)
+
+# Shared HTTP client, started in setup_hook and closed on $shutdown
+http_client = HttpClient(
+    limit=get_env_int("HTTP_POOL_LIMIT", 20),
+    limit_per_host=get_env_int("HTTP_POOL_PER_HOST", 4),
+    dns_ttl=get_env_int("HTTP_DNS_TTL", 300),
+    keepalive=get_env_int("HTTP_KEEPALIVE", 30),
+    timeout=get_env_int("HTTP_TIMEOUT", 10)
+)
+
+# Used for every external API call
+retry_policy = RetryPolicy(attempts=get_env_int("RETRY_ATTEMPTS", 3))
+
+# Latest commit shown in $botinfo
+commit_cache = CommitCache("dotztv/dotzbot", ttl=get_env_int("COMMIT_CACHE_TTL", 600))
+
+# Prefetched memes, refilled by the refill_memes task
+meme_buffer = MemeBuffer(
+    size=get_env_int("MEME_BUFFER_SIZE", 10),
+    max_bytes=get_env_int("MEME_BUFFER_BYTES", 20_000_000),
+    concurrency=get_env_int("MEME_REFILL_CONCURRENCY", 3)
+)
+
+# Logging. Commands only put records on a queue, the actual writing happens on the
+# listener's thread so the SD card can't stall the event loop. Nothing gets opened or
+# started until setup_logging(), so importing dotzbot (benchmarks, tools) leaves logging alone
+handler = LogFileHandler(
+    filename="discord.log",
+    max_bytes=get_env_int("LOG_MAX_BYTES", 5_000_000),
+    backup_count=get_env_int("LOG_BACKUPS", 5),
+    rotate_every=get_env_int("LOG_ROTATE_HOURS", 0) * 3600,
+    compress=bool(get_env_int("LOG_COMPRESS", 1)),
+    encoding="utf-8"
+)
+log_format = logging.Formatter("%(asctime)s / %(levelname)s = %(message)s")
+handler.setFormatter(JsonFormatter() if get_env_int("LOG_JSON", 0) else log_format)
+console_handler = logging.StreamHandler()
+console_handler.setFormatter(log_format)
+
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(
+    log_queue, handler, console_handler, respect_handler_level=True)
+
+
+def setup_logging():
+    """Sends every log record to discord.log and the console, run this before starting the bot."""
+    logging.getLogger().addHandler(logging.handlers.QueueHandler(log_queue))
+    logging.getLogger().setLevel(logging.INFO)
+    log_listener.start()
 
 
 # --- TASKS ---
@@ -186,739 +2272,218 @@ async def before_loop():
 
 @tasks.loop(hours=24)
 async def im_alive():
-    if not online:  # no idea if this will work, meant to run before the online var is on
-        # Channel ID of my server's channel for the bot
-        dotzbot_channel = bot.get_channel(1399359500049190912)
-        embed = discord.Embed(
-            title="dotzbot hasn't crashed!",
-            # Formats to a more readable version
-            description=BOT_START_TIME.strftime("%Y-%m-%d %H:%M:%S"),
-            color=discord.Color.yellow()
-        )
-        embed.add_field(name="", value=f"Uptime: {get_uptime()}")
-        # Sends it to the specified channel
-        await dotzbot_channel.send(embed=embed)
-
-
-# Removed osu!pp war thing, maybe i should use the ossapi for a command?
-
-# --- FUN COMMANDS ---
-
-
-@bot.hybrid_command(with_app_command=True, description="Get a random meme", aliases=["memes"])
-async def meme(ctx):
-    gotmeme = False
-    attempts = 0
-    while not gotmeme:
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://meme-api.com/gimme") as resp:
-                if resp.status != 200:
-                    logging.info(
-                        "%s's request for a meme failed, retrying", ctx.author)
-                    attempts += 1
-                    return
-                json_data = await resp.json()
-
-            url = json_data.get("url")
-            nsfw = json_data.get("nsfw", False)
-            if nsfw:
-                logging.info("%s got an NSFW meme, retrying", ctx.author)
-                attempts += 1
-                return
-
-            async with session.get(url) as img_resp:
-                if img_resp.status != 200:
-                    logging.info(
-                        "%s failed to get a meme, retrying", ctx.author)
-                    attempts += 1
-                    return
-                img_bytes = await img_resp.read()
-
-        from io import BytesIO
-        bio = BytesIO(img_bytes)
-        bio.seek(0)
-        embed = discord.Embed(
-            title=json_data.get("title"),
-            description=f"r/{json_data.get('subreddit')}",
-            color=discord.Color.green()
-        )
-        embed.add_field(name="API", value="https://meme-api.com/gimme")
-        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-        await ctx.reply(embed=embed, file=discord.File(fp=bio, filename="meme.png"), mention_author=True)
-        post_link = json_data.get("postLink", url)
-        logging.info("%s (%s) fetched meme %s",
-                     ctx.author, ctx.author.id, post_link)
-        gotmeme = True
-meme.category = "fun"
-
-
-@bot.hybrid_command(with_app_command=True, description="Roll an X sided dice", aliases=["dice", "dice_roll", "diceroll", "rolldice", "roll_dice"])
-async def roll(ctx, dice_sides: int = 100):
-    if dice_sides <= 0:  # If equal or less
-        embed = discord.Embed(
-            title="Dice Roll",
-            description=f"{ctx.author.mention} just tried to roll a {dice_sides}-sided dice",
-            color=discord.Color.red()
-        )
-        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-        await ctx.reply(embed=embed, mention_author=True)
-        logging.info("%s (%s) just tried to roll a %s-sided dice",
-                     ctx.author, ctx.author.id, dice_sides)
-        return  # to not continue code
-
-    dice_roll = 1 + secrets.randbelow(dice_sides)
+    # The first run is right at startup, on_ready already says it's online then
+    if im_alive.current_loop == 0:
+        return
+    # Channel ID of my server's channel for the bot
+    dotzbot_channel = bot.get_channel(DOTZBOT_CHANNEL_ID)
     embed = discord.Embed(
-        title="Dice Roll",
-        description=f"{ctx.author.mention} rolled a {dice_sides}-sided dice and got {dice_roll}",
-        color=discord.Color.green()
+        title="dotzbot hasn't crashed!",
+        # Formats to a more readable version
+        description=BOT_START_TIME.strftime("%Y-%m-%d %H:%M:%S"),
+        color=discord.Color.yellow()
     )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.info("%s (%s) rolled a %s-sided dice and got %s",
-                 ctx.author, ctx.author.id, dice_sides, dice_roll)
-roll.category = "fun"
-
-
-@bot.hybrid_command(with_app_command=True, description="Flip a coin, Heads or tails?", aliases=["cf", "coin", "flip", "flipacoin"])
-async def coinflip(ctx, heads: str = None, tails: str = None):
-    coin_sides = ["heads", "tails"]
-    coin = secrets.choice(coin_sides)
-    if heads is None and tails is None:
-        embed = discord.Embed(
-            title="Coin Flip",
-            description=f"{ctx.author.mention} flipped a coin and it landed on {coin}",
-            color=discord.Color.green()
-        )
-    else:
-        embed = discord.Embed(
-            title="Coin Flip",
-            description=f"{ctx.author.mention} flipped a coin and it landed on {coin}",
-            color=discord.Color.green()
-        )
-        embed.add_field(name="", value=f"Heads is \"{heads}\"")
-        embed.add_field(name="", value=f"Tails is \"{tails}\"")
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.info("%s's (%s) coin landed on %s",
-                 ctx.author, ctx.author.id, coin)
-coinflip.category = "fun"
-
-
-# --- MINIGAME COMMANDS ---
-
-
-@bot.command(description="Literally just blackjack", aliases=["bj"])
-async def blackjack(ctx):
-    await ctx.reply("This command isn't complete yet! To be honest, I don't know if it ever will.", mention_author=True)
-    logging.info("%s (%s) attempted to use $blackjack",
-                 ctx.author, ctx.author.id)
-blackjack.category = "minigame"
-
-
-@bot.command(description="Probably not exactly like poker, but close enough", aliases=["pk"])
-async def poker(ctx):
-    await ctx.reply("This command isn't complete yet! To be honest, I don't know if it ever will.", mention_author=True)
-    logging.info("%s (%s) attempted to use $poker", ctx.author, ctx.author.id)
-poker.category = "minigame"
-
-
-@bot.command(description="Can you guess the bot's number?", aliases=["gnm"])
-async def guessthenumber(ctx):
-    await ctx.reply("This command isn't complete yet! To be honest, I don't know if it ever will.", mention_author=True)
-    logging.info("%s (%s) attempted to use $guessthenumber",
-                 ctx.author, ctx.author.id)
-guessthenumber.category = "minigame"
-
+    embed.add_field(name="", value=f"Uptime: {get_uptime()}")
+    health.add_digest_fields(embed)
+    # Sends it to the specified channel
+    await announce(dotzbot_channel, embed=embed)
+    health.reset_period()  # Next digest only covers the next 24h
 
-@bot.command(description="Trivia Time!!", aliases=["quiz"])
-async def trivia(ctx):
-    await ctx.reply("This command isn't complete yet! To be honest, I don't know if it ever will.", mention_author=True)
-    logging.info("%s (%s) attempted to use $trivia", ctx.author, ctx.author.id)
-trivia.category = "minigame"
 
+@tasks.loop(seconds=get_env_int("LAG_SAMPLE_MS", 500) / 1000)
+async def sample_loop_lag():
+    lag = health.sample_lag()
+    if lag is not None and lag > health.lag_alert:
+        await health.alert("lag", f"Event loop was blocked for {lag * 1000:.0f}ms, something is doing blocking work")
 
-@bot.hybrid_command(with_app_command=True, description="Highest card wins", aliases=["hc"])
-async def highcard(ctx):
-    user_card = 1 + secrets.randbelow(13)
 
-    if user_card == 1:
-        user_card = 14
-        readable_user_card = "Ace"
-    elif user_card == 11:
-        readable_user_card = "Jack"
-    elif user_card == 12:
-        readable_user_card = "Queen"
-    elif user_card == 13:
-        readable_user_card = "King"
-    else:
-        readable_user_card = user_card
-
-    bot_card = 1 + secrets.randbelow(13)
-    if bot_card == 1:
-        bot_card = 14
-        readable_bot_card = "Ace"
-    elif bot_card == 11:
-        readable_bot_card = "Jack"
-    elif bot_card == 12:
-        readable_bot_card = "Queen"
-    elif bot_card == 13:
-        readable_bot_card = "King"
-    else:
-        readable_bot_card = bot_card
-
-    if user_card > bot_card:  # If user wins
-        embeddesc = f"{ctx.author.mention} won with a {readable_user_card} against {bot.user.mention}'s {readable_bot_card}"
-        embedcolor = discord.Color.green()
-        logging.info("%s (%s) won with a %s against %s's %s", ctx.author,
-                     ctx.author.id, readable_user_card, bot.user, readable_bot_card)
-    elif bot_card > user_card:  # or bot wins
-        embeddesc = f"{bot.user.mention} won with a {readable_bot_card} against {ctx.author.mention}'s {readable_user_card}"
-        embedcolor = discord.Color.red()
-        logging.info("%s won with a %s against %s's (%s) %s", bot.user,
-                     readable_bot_card, ctx.author, ctx.author.id, readable_user_card)
-    else:  # or it's a tie
-        embeddesc = f"It's a tie! Both drew a {readable_user_card}"
-        embedcolor = discord.Color.yellow()
-        logging.info("%s (%s) tied with %s with %s", ctx.author,
-                     ctx.author.id, bot.user, readable_user_card)
+@tasks.loop(minutes=1)
+async def sample_health():
+    rss = health.sample_resources()
+    if rss > health.rss_alert:
+        await health.alert("memory", f"Memory use is at {rss // (1024 * 1024)}MB")
 
-    embed = discord.Embed(
-        title="High Card Result",
-        description=embeddesc,
-        color=embedcolor
-    )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    await ctx.reply(embed=embed, mention_author=True)
-highcard.category = "minigame"
 
+@tasks.loop(seconds=get_env_int("MEME_REFILL_INTERVAL", 30))
+async def refill_memes():
+    try:
+        added = await meme_buffer.refill()
+    except (RetryableError, CircuitOpenError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.warning("Meme buffer refill failed (%s)", e)
+        return
+    if added:
+        logging.info("Added %s memes to the buffer (%s buffered)",
+                     added, len(meme_buffer))
 
-@bot.hybrid_command(with_app_command=True, description="Play Rock Paper Scissors, default choice is scissors")
-@app_commands.describe(user_choice="Your choice: rock, paper or scissors")
-async def rps(ctx, user_choice: str = None):
-    if isinstance(user_choice, str):  # If a choice was given (defined)
-        user_choice = user_choice.lower()  # Convert it to a string for future code use
 
-    rps_choices = ["rock", "paper", "scissors"]
+@tasks.loop(seconds=get_env_int("STATS_FLUSH_INTERVAL", 5))
+async def flush_stats():
+    try:
+        await stats_store.flush()
+    except sqlite3.Error as e:  # Stays in memory and gets tried again next time
+        logging.error("Couldn't write the stats (%s), %s rows waiting",
+                      e, stats_store.stats()["pending"])
 
-    # Default embed, when no choice is provided.
-    embed = discord.Embed(
-        title="$rps wrong usage",
-        description="You're supposed to say either rock, paper or scissors",
-        color=discord.Color.red()
-    )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
 
-    if user_choice is None:
-        await ctx.reply(embed=embed, mention_author=True)  # Send default embed
-        logging.info(
-            "%s (%s) failed to provide either rock, paper or scissors", ctx.author, ctx.author.id)
+@tasks.loop(seconds=1)  # Same as the router's tick
+async def expire_routes():
+    expired = message_router.advance()
+    if not expired:
         return
-    else:
-        if user_choice not in rps_choices:  # If choice is defined, but not an available choice
-            # Also the default embed
-            await ctx.reply(embed=embed, mention_author=True)
-            logging.info("%s (%s) failed to provide either rock, paper or scissors (%s)",
-                         ctx.author, ctx.author.id, user_choice)  # it'll be funny to see typos
-            return  # to not process the rest of the code
-
-    bot_choice = secrets.choice(rps_choices)
-
-    beats = {  # Dictionary, way shorter if statement with this
-        "rock": "scissors",
-        "scissors": "paper",
-        "paper": "rock"}
-
-    # Winner check
-    if user_choice == bot_choice:
-        result = "It's a tie!"
-        color = discord.Color.gold()
-        logging.info("%s (%s) tied with %s using %s", ctx.author,
-                     ctx.author.id, bot.user, user_choice)
-    elif beats[user_choice] == bot_choice:
-        result = f"{ctx.author.mention} wins!"  # User wins
-        color = discord.Color.green()
-        logging.info("%s (%s) beat %s with %s against %s", ctx.author,
-                     ctx.author.id, bot.user, user_choice, bot_choice)
-    else:
-        result = f"{bot.user.mention} wins!"  # Bot wins
-        color = discord.Color.red()
-        logging.info("%s beat %s (%s) with %s against %s", bot.user,
-                     ctx.author, ctx.author.id, bot_choice, user_choice)
-
-    embed = discord.Embed(  # Replaces the default embed
-        title="Rock Paper Scissors",
-        description=(  # Multi-line description
-            f"{ctx.author.mention} chose **{user_choice.capitalize()}**\n"  # Styling
-            # Don't ask why I didn't just use add_fields again
-            f"{bot.user.mention} chose **{bot_choice.capitalize()}**\n\n"
-            f"{result}"  # I don't know the answer to that question xD
-        ),
-        color=color
-        # Both 'color' and 'result' are set from the winner check
-    )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    await ctx.reply(embed=embed, mention_author=True)
-rps.category = "minigame"
+    results = await asyncio.gather(*(on_timeout(*key) for key, on_timeout in expired if on_timeout is not None),
+                                   return_exceptions=True)
+    for result in results:  # One game's timeout failing shouldn't stop everyone else's
+        if isinstance(result, Exception):
+            logging.error("Message route timeout failed", exc_info=result)
 
 
-@bot.hybrid_command(with_app_command=True, description="The wisdom of the eight ball upon you", aliases=["8ball", "8b"])
-@app_commands.describe(question="Your question is?")
-async def eightball(ctx, question: str = None):
-    yes_answers = [  # 7
-        "yes", "why not", "absolutely", "hell yeah", "without a doubt", "absolutely", "uh, obviously"
-    ]
+# --- BOT ---
 
-    no_answers = [  # 7
-        "no", "absolutely not", "fuck no", "nah", "are you stupid? no", "nuh uh", "not happening"
-    ]
-
-    unknown_answers = [  # 7
-        "i'm not too sure", "i don't know", "the answer lies in the question itself",
-        "the answer can be found in your soul", "do what your heart desires", "whatever you feel like",
-        "idk, ask the next guy"
-    ]
 
-    # makes it equal chance for yes, no or unknown in case there are different amounts of strings in each list
-    eight_ball_answers = ["yes", "no", "unknown"]
-    eight_ball_first_choice = secrets.choice(eight_ball_answers)
+# The cogs do "from dotzbot import ...", without this running dotzbot.py would load a second copy of
+# this file when find_commands imports them
+sys.modules.setdefault("dotzbot", sys.modules[__name__])
+find_lazy_commands()
+# IDENTIFY sends whatever the bot was made with, so the profile comes from the cog classes before
+# there's a bot. TODO: same with permissions
+intents, member_cache = get_intent_profile(
+    [command for extension in (*EXTENSIONS, *LAZY_EXTENSIONS) for command in find_commands(extension)])
+# Sets up bot with discord.ext command prefix and removes default help command.
+# No chunking at startup, members get fetched when a command needs them (get_member_lazy)
+bot = commands.Bot(command_prefix="$", intents=intents, member_cache_flags=member_cache,
+                   chunk_guilds_at_startup=False, help_command=None, http_trace=command_metrics.discord_trace())
 
-    if eight_ball_first_choice == "yes":
-        eight_ball_real_choice = secrets.choice(yes_answers)
-        embed_color = discord.Color.green()
-    if eight_ball_first_choice == "no":
-        eight_ball_real_choice = secrets.choice(no_answers)
-        embed_color = discord.Color.red()
-    if eight_ball_first_choice == "unknown":
-        eight_ball_real_choice = secrets.choice(unknown_answers)
-        embed_color = discord.Color.yellow()
 
-    embed = discord.Embed(
-        title="8 ball's answer",
-        description=f"The 8 ball says: {eight_ball_real_choice}",
-        color=embed_color
-    )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+# --- Bot Events ---
 
-    if question is not None:
-        embed.add_field(name="The question was:", value=question)
-    await ctx.reply(embed=embed, mention_author=True)
-    # For slash commands, ctx.message can be None; prefer the provided question if available
-    q_text = question if question is not None else (
-        getattr(getattr(ctx, "message", None), "content", "") or "")
-    logging.info("%s's (%s) 8ball answered to '%s' with %s",
-                 ctx.author, ctx.author.id, q_text, eight_ball_real_choice)
-eightball.category = "minigame"
 
+@bot.event
+async def setup_hook():  # Runs once before connecting, unlike on_ready
+    global metrics_runner
+    startup_times["cogs"] = await load_cogs()
+    logging.info("Loaded %s cogs in %.1fms", len(EXTENSIONS), startup_times["cogs"])
+    logging.info("Using intents: %s", ", ".join(name for name, value in intents if value))
+    await handler.scan_existing()
+    await http_client.start()
+    refill_memes.start()
+    sample_loop_lag.start()
+    sample_health.start()
+    await stats_store.open()
+    flush_stats.start()
+    expire_routes.start()
+
+    metrics_port = get_env_int("METRICS_PORT", 9464)
+    if metrics_port:
+        try:
+            metrics_runner = await start_metrics_server(os.getenv("METRICS_HOST", "127.0.0.1"), metrics_port)
+        except OSError as e:  # Port taken or something, the bot works fine without it
+            logging.error("Couldn't start the metrics server: %s", e)
 
-# --- INFO COMMANDS ---
 
+@bot.before_invoke
+async def before_any_command(ctx):
+    command_metrics.start(ctx)
+    # Last thing that can fail here is the cooldown, so a used slot always gets released after
+    await acquire_cooldown(ctx)
+    try:
+        await defer_if_slow(ctx)
+    except discord.HTTPException:
+        release_cooldown(ctx)
+        raise
 
-@bot.hybrid_command(with_app_command=True, description="Shows this list!", aliases=["?"])
-async def help(ctx):  # skipcq: PYL-W0622
-    is_owner = False
 
-    try:
-        is_owner = await bot.is_owner(ctx.author)
-    # Connection Failed (API Unreachable / Network Issue), No Permission or User doesn't exist
-    except (discord.HTTPException, discord.Forbidden, discord.NotFound):
-        pass
+@bot.after_invoke
+async def after_any_command(ctx):
+    release_cooldown(ctx)
+    command_metrics.finish(ctx)  # errors get counted in on_command_error
 
-    embed = discord.Embed(
-        title="dotzbot's commands",
-        description="",
-        color=discord.Color.gold()
-    )
 
-    for command in bot.commands:
-        if command.hidden and not is_owner:
-            continue  # Somehow(vibe coded) shows hidden commands for bot owner
-        embed.add_field(
-            name=f"${command.name}",
-            value=command.description or "No description.",
-            inline=False
+@bot.event
+async def on_ready():
+    global online  # So it's reusable
+    if not online:  # Now it won't send multiple times if the bot reconnects
+        embed = discord.Embed(
+            title="dotzbot is online",
+            # Formats to a more readable version
+            description=BOT_START_TIME.strftime("%Y-%m-%d %H:%M:%S"),
+            color=discord.Color.green()
         )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.info("%s (%s) used the $help command", ctx.author, ctx.author.id)
-help.category = "info"
+        # Channel ID of my server's channel for the bot
+        dotzbot_channel = bot.get_channel(DOTZBOT_CHANNEL_ID)
+        # Sends it to the specified channel
+        await announce(dotzbot_channel, embed=embed)
+        logging.info("Logged in as %s", bot.user)
 
+        # Sync application commands: first to dev guild for fast testing, then globally
+        try:
+            dev_guild = discord.Object(id=907012194175176714)
+            await sync_tree(guild=dev_guild)  # Skips it if nothing changed since last time
+        except Exception:
+            logging.error("Failed to sync application commands to dev guild")
 
-@bot.hybrid_command(with_app_command=True, description="Show the bot's latency", aliases=["latency", "lag", "ms"])
-async def ping(ctx):
-    # Copilot told me to multiply this by a thousand so
-    latency = round(bot.latency * 1000)
-    embed = discord.Embed(
-        title="Pong!",
-        description=f"Latency: {latency} ms",
-        color=discord.Color.gold()
-    )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.info("%s (%s) used the $ping command (%sms)",
-                 ctx.author, ctx.author.id, latency)
-ping.category = "info"
+        # Incase it was invited while offline. Members aren't chunked at startup,
+        # so disallowed servers get left before any of their members are cached
+        await sweep_guilds(bot.guilds)
 
+        # Removed if not is_running cause this will now only run once
+        random_activity.start()
+        im_alive.start()
+        online = True
+        startup_times["ready"] = (datetime.now(CESTIME) - BOT_START_TIME).total_seconds()
+        logging.info("Ready %.2fs after starting", startup_times["ready"])
 
-@bot.hybrid_command(with_app_command=True, description="Show how long the bot has been running", aliases=["lifetime", "upkeep"])
-async def uptime(ctx):
-    uptime_str = get_uptime()
-    embed = discord.Embed(
-        title="dotzbot's Uptime",
-        description=f"The bot has been running for: {uptime_str}",
-        color=discord.Color.gold()
-    )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.info("%s (%s) used the $uptime command (%s)",
-                 ctx.author, ctx.author.id, uptime_str)
-uptime.category = "info"
-
-
-@bot.hybrid_command(with_app_command=True, description="General info about the bot", aliases=["bot", "about"])
-async def botinfo(ctx):
-    # Fetch commit code, by chatgpt ofc
-    async with aiohttp.ClientSession() as session:  # skipcq: PTC-W0062
-        async with session.get("https://api.github.com/repos/dotztv/dotzbot/commits") as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                latest_commit = data[0]
-                commit_msg = latest_commit["commit"]["message"]
-                commit_url = latest_commit["html_url"]
-                commit_sha = latest_commit["sha"][:7]  # short sha
-            else:
-                commit_msg = "Could not fetch"
-                commit_url = ""
-                commit_sha = ""
 
-    visible, hidden = get_command_count(bot)
-    total = visible + hidden
+@bot.event
+async def on_message(message):
+    if not message.author.bot:
+        await load_lazy_cog(message)
+        await message_router.dispatch(message)
+    await bot.process_commands(message)
 
-    with open("discord.log", "r") as f:
-        log_line_count = sum(1 for line in f)
 
-    embed = discord.Embed(
-        title="dotzbot",
-        description="By <@550378971426979856> / Open-Source!",
-        color=discord.Color.gold()
-    )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    embed.add_field(name="Open-Source Info", value=f"", inline=False)
-    embed.add_field(name="GitHub Link",
-                    value="[dotztv/dotzbot](https://github.com/dotztv/dotzbot)")
-    embed.add_field(name="Latest Commit",
-                    value=f"[{commit_sha}]({commit_url})")
-    embed.add_field(name="Commit Message", value=commit_msg)
-    embed.add_field(name="Support", value="", inline=False)
-    embed.add_field(name="Discord Server",
-                    value="[dotz's corner](https://discord.gg/WgzRu2NB7S)")
-    embed.add_field(name="Developer DMs", value="@<550378971426979856>")
-    embed.add_field(name="Software", value="", inline=False)
-    embed.add_field(name="discord.py version", value=discord.__version__)
-    embed.add_field(name="Python Version", value=platform.python_version())
-    embed.add_field(name="Hosting", value="", inline=False)
-    embed.add_field(name="Machine", value="Raspberry Pi 5")
-    embed.add_field(name="Model", value="4GB Model")
-    embed.add_field(name="Statistics", value="", inline=False)
-    embed.add_field(name="Current Log Length", value=log_line_count)
-    embed.add_field(name="Server Count", value=len(bot.guilds))
-    # for example, 9 total commands, 2 of which are hidden.
-    embed.add_field(name="Command Amount", value=f"{total} ({hidden})")
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.info("%s (%s) used the $botinfo command",
-                 ctx.author, ctx.author.id)
-botinfo.category = "info"
-
-
-@bot.hybrid_command(with_app_command=True, description="Get info about a User", aliases=["user", "checkuser"])
-async def userinfo(ctx, user_id: str = None):  # Defaults arg to None, unless provided
-    embed = discord.Embed(  # Default embed in case user_id is not set
-        title="$userinfo wrong usage",
-        description="You're supposed to provide a user with a ping or their ID",
-        color=discord.Color.red()
-    )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-
-    if isinstance(user_id, str):
-        # Removes ping casing to get ID only
-        user_id = user_id.replace("<@", "").replace("!", "").replace(">", "")
-    else:  # If user_id wasn't provided, send the error
-        await ctx.reply(embed=embed, mention_author=True)
-        logging.info("%s (%s) failed to use $userinfo (%s)",
-                     ctx.author, ctx.author.id, ctx.message.content)
-        return
+@bot.event
+async def on_interaction(interaction):
+    await answer_lazy_button(interaction)
 
-    try:  # if it isn't an ID, it'll raise ValueError and send the error message
-        user_id = int(user_id)
-    except ValueError:  # If it's not a UserID but instead some failed ping or something
-        await ctx.reply(embed=embed, mention_author=True)
-        logging.info("%s (%s) failed to use $userinfo (%s)",
-                     ctx.author, ctx.author.id, ctx.message.content)
-        return
 
-    try:  # Attempt to fetch the user, so we can use it for information
-        user = await bot.fetch_user(user_id)
-        # gets member object if in a server -github copilot
-        member_obj = ctx.guild.get_member(user_id) if ctx.guild else None
-        # not going to lie, i dont know why this is here but i'm too scared to remove it
-        target_user = member_obj if member_obj else user
-    except (discord.NotFound):  # User doesn't exist
-        await ctx.reply("User doesn't seem to exist? Try again with copying their ID or pinging them", mention_author=True)
-        logging.error("%s (%s) provided a user we couldn't fetch? (%s)",
-                      ctx.author, ctx.author.id, ctx.message.content)
+@bot.event  # Vibe coded error handler
+async def on_command_error(ctx, error):
+    release_cooldown(ctx)
+    if isinstance(error, SlowDown):  # Not really an error, just someone spamming
+        embed = discord.Embed(title="Slow down!", description=str(error), color=discord.Color.yellow())
+        embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
+        await send_reply(ctx, embed=embed, mention_author=True)
+        return
+    command_metrics.finish(ctx, failed=True)
+    if is_expired_interaction(error):  # Replying would just fail again
+        command_metrics.expired_interactions += 1
+        logging.error("Interaction for $%s expired before we replied", ctx.command)
         return
-
-    # Special people
-    if user_id == 550378971426979856:  # dotz
-        description = "Hey, It's my creator!"
-    elif user_id == 1267637358942224516:  # dotzbot
-        description = "Wait a minute, that's me!"
-    else:  # literally nobody
-        description = ""
-
-    embed = discord.Embed(  # Changes the embed to the actual user info
-        title="User Information",
-        description=description,
-        color=discord.Color.green()
-    )
-    # Stuff the bot can fetch anyways
-    embed.add_field(name="Username", value=target_user.name)
-    embed.add_field(name="User ID", value=str(target_user.id))
-    embed.add_field(name="Account Created",
-                    value=target_user.created_at.strftime("%Y-%m-%d %H:%M:%S"))
-    embed.add_field(name="Bot?", value="Yes" if target_user.bot else "No")
-
-    if target_user.avatar:  # If they have a custom pfp
-        # Sets user's pfp as thumbnail (small, top right)
-        embed.set_thumbnail(url=target_user.avatar.url)
-
-    # Stuff the bot can only fetch from a server
-    if member_obj and member_obj.joined_at:  # If run in a server
-        embed.add_field(name="Joined Server",
-                        value=member_obj.joined_at.strftime("%Y-%m-%d %H:%M:%S"))
-
-    if member_obj and member_obj.roles:
-        embed.add_field(
-            name="Roles",
-            value=", ".join(
-                [role.name for role in member_obj.roles if role.name != "@everyone"])
-        )
-
-    # Nitro users only
-    if hasattr(user, "banner") and user.banner:  # If they have a custom banner (Nitro Feature)
-        # Sets user's banner as image (big, underneath)
-        embed.set_image(url=user.banner.url)
-
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.info("%s (%s) used %s", ctx.author,
-                 ctx.author.id, ctx.message.content)
-userinfo.category = "info"
-
-
-@bot.hybrid_command(with_app_command=True, description="Get info about the current server", aliases=["server", "checkserver"])
-async def serverinfo(ctx):
-    if ctx.guild:  # if run in a server (True)
-        server_name = ctx.guild.name
-        embed_desc = ""
-        embed_color = discord.Color.green()
-    else:  # if not run a in a server, therefore DM (False)
-        server_name = "This is a DM"
-        embed_desc = "But I'll try to give you some information anyways"
-        embed_color = discord.Color.gold()
-
-    embed = discord.Embed(
-        title=server_name,
-        description=embed_desc,
-        color=embed_color
-    )
-
-    if ctx.guild:  # If run in a server
-        if ctx.guild.icon:
-            embed.set_thumbnail(url=ctx.guild.icon.url)
-        if ctx.guild.description:
-            embed.add_field(name="Server Description", value=str(
-                ctx.guild.description), inline=False)
-        embed.add_field(name="Server ID", value=str(ctx.guild.id), inline=True)
-        embed.add_field(name="Server Creation Date", value=ctx.guild.created_at.strftime(
-            "%Y-%m-%d %H:%M:%S"), inline=True)
-        embed.add_field(name="Server Member Count", value=str(
-            ctx.guild.member_count), inline=True)
-        embed.add_field(name="Server Owner", value=str(
-            ctx.guild.owner), inline=True)
-        embed.add_field(name="Verification Level", value=str(
-            ctx.guild.verification_level), inline=True)
-        embed.add_field(name="AFK Channel", value=str(
-            ctx.guild.afk_channel), inline=True)
-        embed.add_field(name="AFK Timeout", value=str(
-            ctx.guild.afk_timeout), inline=True)
-        embed.add_field(name="Server Boosts", value=str(
-            ctx.guild.premium_subscription_count), inline=True)
-        embed.add_field(name="Server Features", value=str(
-            ctx.guild.features), inline=False)
-    else:  # If not run in a server, therefore DM
-        embed.add_field(name="Channel ID", value=str(
-            ctx.channel.id), inline=True)
-        embed.add_field(name="Channel Creation Date", value=ctx.channel.created_at.strftime(
-            "%Y-%m-%d %H:%M:%S"), inline=True)
-        embed.add_field(name="Channel Type", value=str(
-            ctx.channel.type), inline=True)
-        embed.add_field(name="Your Username",
-                        value=ctx.author.name, inline=True)
-        embed.add_field(name="Your User ID", value=str(
-            ctx.author.id), inline=True)
-        embed.add_field(name="Your Account Created", value=ctx.author.created_at.strftime(
-            "%Y-%m-%d %H:%M:%S"), inline=True)
-        embed.add_field(name="Are you a bot?",
-                        value="Yes" if ctx.author.bot else "No", inline=True)
-        if ctx.author.avatar:
-            # Sets user's pfp as thumbnail (small, top right)
-            embed.set_thumbnail(url=ctx.author.avatar.url)
-
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.info("%s (%s) used the $serverinfo command in %s",
-                 ctx.author, ctx.author.id, ctx.guild)
-serverinfo.category = "info"
-
-
-# --- MODERATION COMMANDS ---
-# consider permission check function
-
-
-@bot.command(description="Bans the specified user", aliases=["begone"])
-async def ban(ctx):
-    await ctx.reply("This command isn't complete yet! To be honest, I don't know if it ever will.", mention_author=True)
-    logging.info("%s (%s) attempted to use $ban", ctx.author, ctx.author.id)
-ban.category = "moderation"
-
-
-@bot.command(description="Kicks the specified user", aliases=["fuckoff"])
-async def kick(ctx):
-    await ctx.reply("This command isn't complete yet! To be honest, I don't know if it ever will.", mention_author=True)
-    logging.info("%s (%s) attempted to use $kick", ctx.author, ctx.author.id)
-kick.category = "moderation"
-
-
-@bot.command(description="Times out the specified user", aliases=["shutup"])
-async def timeout(ctx):
-    await ctx.reply("This command isn't complete yet! To be honest, I don't know if it ever will.", mention_author=True)
-    logging.info("%s (%s) attempted to use $timeout",
-                 ctx.author, ctx.author.id)
-timeout.category = "moderation"
-
-
-@bot.command(description="Unbans the specified user", aliases=["sorry", "comeback"])
-async def unban(ctx):
-    await ctx.reply("This command isn't complete yet! To be honest, I don't know if it ever will.", mention_author=True)
-    logging.info("%s (%s) attempted to use $unban", ctx.author, ctx.author.id)
-unban.category = "moderation"
-
-
-# --- ADMIN COMMANDS ---
-
-
-@bot.command(description="Shuts down the bot (dotz only)", hidden=True, aliases=["die", "kys", "fuckingdie", "de-exist"])
-@commands.is_owner()
-async def shutdown(ctx):
-    time_at_shutdown = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     embed = discord.Embed(
-        title="dotzbot is offline",
-        description=time_at_shutdown,
+        title="An error occurred",
+        description=f"{type(error).__name__}: {error}",
         color=discord.Color.red()
     )
-
-    embed.add_field(name="", value=f"Uptime: {get_uptime()}")
-    embed.add_field(name="Started at",
-                    value=BOT_START_TIME.strftime("%Y-%m-%d %H:%M:%S"))
-    dotzbot_channel = bot.fetch_channel(1399359500049190912)
-    emoji = "✅"  # defines emoji to react with
-    await ctx.message.add_reaction(emoji)
-    await dotzbot_channel.send(embed=embed)
-    logging.info("%s (%s) used $shutdown command!", ctx.author, ctx.author.id)
-    logging.info("Bot was up for %s", get_uptime())
-    await bot.close()
-shutdown.category = "admin"
-
-
-@bot.command(description="List all servers the bot is in (dotz only)", hidden=True, aliases=["servers"])
-@commands.is_owner()
-async def serverlist(ctx):
-    embed = discord.Embed(
-        title="Server List",
-        description=f"The bot is in {len(bot.guilds)} servers:",
-        color=discord.Color.gold()
-    )
-
-    for guild in bot.guilds:  # Adds each guild as it's own field
-        embed.add_field(
-            name=guild.name,
-            value=f"ID: {guild.id} | Members: {guild.member_count}",
-            inline=False
-        )
-    await ctx.reply(embed=embed, mention_author=True)
-    logging.info("%s (%s) used $serverlist command (%s servers)",
-                 ctx.author, ctx.author.id, len(bot.guilds))
-serverlist.category = "admin"
-
-
-@bot.command(description="Sync application commands globally (dotz only)", hidden=True)
-@commands.is_owner()
-async def synctree(ctx):  # this entire command is written by copilot gpt5
-    embed = discord.Embed(
-        title="Syncing application commands",
-        description="Attempting global sync...",
-        color=discord.Color.gold()
-    )
-    embed.set_footer(text=f"Requested by {ctx.author} ({ctx.author.id})")
-    await ctx.reply(embed=embed, mention_author=True)
-
-    try:
-        await bot.tree.sync()
-        embed = discord.Embed(
-            title="Global sync complete",
-            description="Application commands have been synced globally.",
-            color=discord.Color.green()
-        )
-        await ctx.reply(embed=embed, mention_author=True)
-        logging.info("%s (%s) ran $synctree: global sync successful",
-                     ctx.author, ctx.author.id)
-    except Exception as e:
-        embed = discord.Embed(
-            title="Global sync failed",
-            description=f"Failed to sync application commands globally: {e}",
-            color=discord.Color.red()
-        )
-        await ctx.reply(embed=embed, mention_author=True)
-        logging.exception(
-            "Failed to globally sync application commands via $synctree (%s)", e)
-synctree.category = "admin"
-
-
-# --- TEST COMMANDS ---
+    await send_reply(ctx, embed=embed, mention_author=True)
+    logging.error("%s", error)
 
 
-class button_test_view(discord.ui.View):
-    def __init__(self):
-        super().__init__(timeout=30)  # seconds; set None for persistent
-
-    @discord.ui.button(label="click me cause im a button", style=discord.ButtonStyle.red)
-    async def click_me(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_message("congrats on doing el click", ephemeral=True)
+@bot.event
+async def on_guild_join(guild):
+    await check_allowed_server(guild)
 
-    @discord.ui.button(label="im another button", style=discord.ButtonStyle.green)
-    async def green_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_message("you picked the green button!", ephemeral=True)
 
-    @discord.ui.button(label="you dont see me", style=discord.ButtonStyle.grey)
-    async def special_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_message("no way! you saw me! here's a special role", ephemeral=True)
-        special_button_role = interaction.guild.get_role(1452851739647672471)
-        await interaction.user.add_roles(special_button_role)
-        # needs check if in correct server, or a try except
+@bot.event
+async def on_member_join(member):  # Only comes in with the members intent, same as get_member_lazy asking
+    user_cache.forget_not_member(member.guild.id, member.id)
 
 
-@bot.command(description="Button Test", hidden=True)
-async def button(ctx):
-    await ctx.reply("these only work for 30 seconds", view=button_test_view())
+# Removed osu!pp war thing, maybe i should use the ossapi for a command?
 
 
-bot.run(TOKEN, log_handler=handler, log_level=logging.INFO)
+if __name__ == "__main__":  # So benchmarks can import the bot without running it
+    setup_logging()
+    # log_handler=None since setup_logging already did it
+    bot.run(TOKEN, log_handler=None)
+    stats_store.close()  # The last few seconds of stats, flush_stats is gone with the event loop
+    log_listener.stop()  # Writes whatever is still in the queue
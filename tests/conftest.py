@@ -0,0 +1,9 @@
+# Run with: python -m pytest -q tests
+# No pytest plugins needed, async tests just asyncio.run() their own coroutine.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("METRICS_PORT", "0")
@@ -0,0 +1,107 @@
+import types
+
+import pytest
+
+from dotzbot import DEFAULT_COOLDOWNS, CooldownEngine, SlowDown
+
+USER = 1
+GUILD = 100
+
+
+def command(name, category):
+    return types.SimpleNamespace(qualified_name=name, category=category)
+
+
+MEME = command("meme", "fun")
+ROLL = command("roll", "fun")
+PING = command("ping", "info")
+USERINFO = command("userinfo", "info")
+
+
+def use(engine, cmd, user_id=USER, guild_id=GUILD):
+    """acquire + release straight away, like a command that finished."""
+    engine.release(engine.acquire(user_id, guild_id, engine.rule_for(cmd)))
+
+
+def test_expensive_commands_get_their_own_rule():
+    engine = CooldownEngine(DEFAULT_COOLDOWNS)
+    assert engine.rule_for(MEME) == "meme"
+    assert engine.rule_for(USERINFO) == "userinfo"
+    assert engine.rule_for(ROLL) == "fun"
+    assert engine.rule_for(PING) == "info"
+
+
+def test_meme_limit_doesnt_touch_roll():
+    engine = CooldownEngine(DEFAULT_COOLDOWNS)
+    uses = DEFAULT_COOLDOWNS["meme"][0]
+    for _ in range(uses):
+        use(engine, MEME)
+    with pytest.raises(SlowDown):
+        use(engine, MEME)
+    for _ in range(DEFAULT_COOLDOWNS["fun"][0]):
+        use(engine, ROLL)  # still got all of fun's uses
+    with pytest.raises(SlowDown):
+        use(engine, ROLL)
+
+
+def test_userinfo_limit_doesnt_touch_ping():
+    engine = CooldownEngine(DEFAULT_COOLDOWNS)
+    for _ in range(DEFAULT_COOLDOWNS["userinfo"][0]):
+        use(engine, USERINFO)
+    with pytest.raises(SlowDown):
+        use(engine, USERINFO)
+    use(engine, PING)
+
+
+def test_cheap_commands_allow_more_than_meme():
+    assert DEFAULT_COOLDOWNS["fun"][0] > DEFAULT_COOLDOWNS["meme"][0]
+    assert DEFAULT_COOLDOWNS["info"][0] > DEFAULT_COOLDOWNS["userinfo"][0]
+
+
+def test_guild_limit_covers_everyone_in_it():
+    engine = CooldownEngine({"fun": (2, 10, 5)}, guild_factor=2)
+    for user_id in range(4):  # 2 each, the guild gets 4
+        use(engine, ROLL, user_id=user_id // 2)
+    with pytest.raises(SlowDown):
+        use(engine, ROLL, user_id=99)  # fresh user, but the guild is out
+    use(engine, ROLL, user_id=99, guild_id=None)  # in DMs only the user's own bucket counts
+
+
+def test_running_limit_says_busy():
+    engine = CooldownEngine({"fun": (10, 10, 1)})
+    keys = engine.acquire(USER, GUILD, "fun")
+    with pytest.raises(SlowDown, match="already got one"):
+        engine.acquire(USER, GUILD, "fun")
+    engine.release(keys)
+    engine.release(engine.acquire(USER, GUILD, "fun"))
+
+
+def test_rejected_use_doesnt_take_anything():
+    engine = CooldownEngine({"fun": (1, 10, 5)}, guild_factor=5)
+    use(engine, ROLL)
+    with pytest.raises(SlowDown):
+        use(engine, ROLL)
+    # The user's rejection didn't spend the guild's tokens
+    assert engine.buckets[("guild", GUILD, "fun")][0] == pytest.approx(4)
+
+
+def test_refills_and_empty_buckets_get_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("dotzbot.time.monotonic", lambda: now[0])
+    engine = CooldownEngine({"fun": (2, 10, 1)})
+    use(engine, ROLL)
+    use(engine, ROLL)
+    with pytest.raises(SlowDown) as error:
+        use(engine, ROLL)
+    assert error.value.retry_after == pytest.approx(5)  # one token every 5s
+    now[0] += 5
+    use(engine, ROLL)
+    now[0] += 10
+    engine.evict(now[0])
+    assert engine.buckets == {} and engine.running == {}
+
+
+def test_categories_without_rules_arent_limited():
+    engine = CooldownEngine(DEFAULT_COOLDOWNS)
+    assert engine.acquire(USER, GUILD, "admin") is None
+    assert engine.rule_for(command("ban", "moderation")) == "moderation"
@@ -0,0 +1,22 @@
+import discord
+
+from dotzbot import BufferReader
+
+
+def test_reader_reads_the_buffer_without_copying_it():
+    image = bytearray(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 1000)
+    reader = BufferReader(image)
+    assert reader.view.obj is image
+    assert reader.read(8) == b"\x89PNG\r\n\x1a\n"
+    assert reader.read() == bytes(image[8:])
+    assert reader.read(10) == b""
+
+
+def test_discord_file_can_send_it_twice():
+    image = bytearray(b"GIF89a" + bytes(5000))
+    file = discord.File(fp=BufferReader(image), filename="meme.gif")
+    assert file.fp.read() == image
+    file.reset()  # what discord.py does before retrying an upload
+    assert file.fp.read() == image
+    file.fp.seek(-6, 2)
+    assert file.fp.tell() == len(image) - 6
@@ -0,0 +1,102 @@
+import asyncio
+import types
+
+import aiohttp
+import discord
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import dotzbot
+from dotzbot import CommandMetrics, metrics_endpoint, timed_callback
+
+DISCORD_TIME = 0.05
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = CommandMetrics()
+    monkeypatch.setattr(dotzbot, "command_metrics", metrics)
+    return metrics
+
+
+async def fake_discord():
+    """Stands in for the interaction response endpoint, takes DISCORD_TIME to answer."""
+    async def respond(_request):
+        await asyncio.sleep(DISCORD_TIME)
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_post("/callback", respond)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def make_view(session, url):
+    class GameView(discord.ui.View):
+        @discord.ui.button(label="Hit", custom_id="game:hit")
+        @timed_callback("game:hit")
+        async def hit(self, interaction, button):
+            async with session.post(url):  # interaction.response.edit_message, more or less
+                pass
+
+        @discord.ui.button(label="Broken", custom_id="game:broken")
+        @timed_callback("game:broken")
+        async def broken(self, interaction, button):
+            raise RuntimeError("oops")
+
+    return GameView(timeout=None)
+
+
+def click(metrics, button):
+    """Runs the button's callback on its own task like discord.py does, over a session with discord_trace."""
+    async def main():
+        server = await fake_discord()
+        async with aiohttp.ClientSession(trace_configs=[metrics.discord_trace()]) as session:
+            view = make_view(session, str(server.make_url("/callback")))
+            try:
+                await asyncio.create_task(getattr(view, button).callback(types.SimpleNamespace()))
+            finally:
+                await server.close()
+    asyncio.run(main())
+
+
+def test_button_click_is_counted_with_its_discord_time(metrics):
+    click(metrics, "hit")
+    stats = metrics.commands["game:hit"]
+    assert stats["invocations"] == 1 and stats["errors"] == 0
+    discord_time = stats["phases"]["discord"].sum
+    assert DISCORD_TIME * 0.9 <= discord_time <= stats["phases"]["total"].sum
+    assert stats["phases"]["compute"].sum < DISCORD_TIME
+
+
+def test_failed_click_is_an_error_and_still_raises(metrics):
+    with pytest.raises(RuntimeError):
+        click(metrics, "broken")
+    assert metrics.commands["game:broken"]["errors"] == 1
+    assert metrics.commands["game:broken"]["invocations"] == 1
+
+
+def test_commands_dont_count_discord_requests_twice(metrics):
+    async def main():
+        server = await fake_discord()
+        async with aiohttp.ClientSession(trace_configs=[metrics.discord_trace()]) as session:
+            timings = metrics.begin()  # what before_invoke does, ctx.send is timed on its own
+            async with session.post(server.make_url("/callback")):
+                pass
+        await server.close()
+        return timings
+
+    assert asyncio.run(main())["discord"] == 0
+
+
+def test_buttons_show_up_in_the_export(metrics):
+    click(metrics, "hit")
+    assert 'dotzbot_command_invocations_total{command="game:hit"} 1' in metrics.prometheus()
+
+
+def test_metrics_content_type(metrics):
+    response = asyncio.run(metrics_endpoint(None))
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert b"# TYPE dotzbot_command_invocations_total counter" in response.body
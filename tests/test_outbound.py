@@ -0,0 +1,96 @@
+import asyncio
+import types
+
+import dotzbot
+from dotzbot import LANE_LOW, ChannelQueue, OutboundScheduler, TokenBucket, announce, command_metrics, send_reply
+
+SEND_TIME = 0.05
+
+
+def make_ctx(channel_id, message_id):
+    """Just enough of a commands.Context for send_reply and command_metrics."""
+    ctx = types.SimpleNamespace(interaction=None, command=None, channel=types.SimpleNamespace(id=channel_id),
+                                message=types.SimpleNamespace(id=message_id), sent=[])
+
+    async def send(*args, **kwargs):
+        await asyncio.sleep(SEND_TIME)
+        ctx.sent.append(args)
+        return message_id
+
+    ctx.send = send
+    ctx.reply = lambda *args, **kwargs: ctx.send(*args, **kwargs)  # ctx.send gets swapped by command_metrics
+    return ctx
+
+
+def use_scheduler(monkeypatch, **kwargs):
+    scheduler = OutboundScheduler(**kwargs)
+    monkeypatch.setattr(dotzbot, "outbound", scheduler)
+    return scheduler
+
+
+def test_commands_sharing_a_channel_get_their_own_discord_time(monkeypatch):
+    use_scheduler(monkeypatch, channel_rate=100, channel_per=1)
+
+    async def command(ctx):
+        command_metrics.start(ctx)
+        await send_reply(ctx, "hi")
+        return ctx.timings
+
+    async def main():
+        # Separate tasks, like discord.py runs every command
+        return await asyncio.gather(*(asyncio.create_task(command(make_ctx(1, i))) for i in range(2)))
+
+    first, second = asyncio.run(main())
+    # The first one started the channel's worker, the second one's send still isn't counted against it
+    assert SEND_TIME * 0.9 <= first["discord"] < SEND_TIME * 1.8
+    # Waited for the first send, then its own
+    assert second["discord"] >= SEND_TIME * 1.8
+
+
+def test_identical_replies_to_different_messages_all_go_out(monkeypatch):
+    scheduler = use_scheduler(monkeypatch, channel_rate=100, channel_per=1)
+    ctxs = [make_ctx(1, i) for i in range(3)]
+
+    async def main():
+        return await asyncio.gather(*(send_reply(ctx, "same") for ctx in ctxs))
+
+    assert asyncio.run(main()) == [0, 1, 2]
+    assert all(ctx.sent == [("same",)] for ctx in ctxs)
+    assert scheduler.coalesced == 0
+
+
+def test_identical_announcements_get_merged(monkeypatch):
+    scheduler = use_scheduler(monkeypatch, channel_rate=100, channel_per=1)
+    sent = []
+
+    async def send(*args, **kwargs):
+        await asyncio.sleep(SEND_TIME)
+        sent.append(args)
+        return "message"
+
+    channel = types.SimpleNamespace(id=1, send=send)
+
+    async def main():
+        return await asyncio.gather(announce(channel, "hello"), announce(channel, "hello"))
+
+    assert asyncio.run(main()) == ["message", "message"]
+    assert sent == [("hello",)]
+    assert scheduler.coalesced == 1
+
+
+def test_dropped_item_gives_both_tokens_back():
+    async def main():
+        scheduler = OutboundScheduler(global_rate=10, global_per=1)
+        queue = ChannelQueue(TokenBucket(1, SEND_TIME))
+        queue.bucket.tokens = 0  # so the worker waits, and the item gets dropped meanwhile
+        future = asyncio.get_running_loop().create_future()
+        queue.lanes[LANE_LOW].append((None, future, None))
+        worker = asyncio.create_task(scheduler.drain(queue))
+        await asyncio.sleep(0)
+        scheduler.drop_oldest_low(queue)
+        await worker
+        return scheduler.global_bucket.tokens, future.result()
+
+    tokens, result = asyncio.run(main())
+    assert result is None
+    assert tokens >= 10  # nothing got sent, so the global bucket is still full
@@ -0,0 +1,72 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from cogs.poker import DECK, HandEvaluator, hand_name, make_card
+
+# rank 0 is a 2, 12 is an ace. suits 0-3
+SPADES, HEARTS, DIAMONDS, CLUBS = range(4)
+
+
+def cards(*pairs):
+    return [make_card(rank, suit) for rank, suit in pairs]
+
+
+@pytest.fixture(scope="module")
+def evaluator():
+    return HandEvaluator.build()
+
+
+@pytest.mark.parametrize("hand, rank, name", [
+    (cards((12, 0), (11, 0), (10, 0), (9, 0), (8, 0)), 1, "Royal Flush"),
+    (cards((12, 1), (0, 1), (1, 1), (2, 1), (3, 1)), 10, "Straight Flush"),  # steel wheel
+    (cards((12, 0), (12, 1), (12, 2), (12, 3), (11, 0)), 11, "Four of a Kind"),
+    (cards((3, 0), (2, 1), (1, 2), (0, 3), (5, 0)), 7462, "High Card"),  # 7-5-4-3-2 offsuit
+])
+def test_known_hands(evaluator, hand, rank, name):
+    assert evaluator.evaluate5(*hand) == rank
+    assert hand_name(rank) == name
+
+
+def test_class_order(evaluator):
+    full_house = cards((5, 0), (5, 1), (5, 2), (2, 0), (2, 1))
+    flush = cards((12, 2), (10, 2), (7, 2), (4, 2), (1, 2))
+    straight = cards((8, 0), (7, 1), (6, 2), (5, 3), (4, 0))
+    wheel = cards((12, 0), (0, 1), (1, 2), (2, 3), (3, 0))
+    two_pair = cards((12, 0), (12, 1), (11, 0), (11, 1), (10, 2))
+    ranks = [evaluator.evaluate5(*hand) for hand in (full_house, flush, straight, wheel, two_pair)]
+    assert ranks == sorted(ranks)
+    assert [hand_name(rank) for rank in ranks] == ["Full House", "Flush", "Straight", "Straight", "Two Pair"]
+
+
+def test_seven_cards_match_best_of_21(evaluator):
+    rng = random.Random(1234)
+    for _ in range(2000):
+        hand = rng.sample(DECK, 7)
+        assert evaluator.evaluate7(hand) == min(evaluator.evaluate5(*five) for five in combinations(hand, 5))
+
+
+def test_six_cards(evaluator):
+    hand = cards((12, 0), (11, 0), (10, 0), (9, 0), (8, 0), (0, 1))
+    assert evaluator.evaluate(hand) == 1
+
+
+def test_cache_round_trip(evaluator, tmp_path):
+    path = str(tmp_path / "tables.bin")
+    evaluator.save(path)
+    loaded = HandEvaluator.read(path)
+    hand = cards((12, 0), (12, 1), (3, 2), (3, 3), (7, 0), (9, 1), (1, 2))
+    assert loaded.evaluate7(hand) == evaluator.evaluate7(hand)
+    assert loaded.products7 == evaluator.products7
+
+
+def test_bad_cache_is_ignored(evaluator, tmp_path):
+    path = tmp_path / "tables.bin"
+    assert HandEvaluator.read(str(path)) is None  # missing
+    evaluator.save(str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:-1])  # cut short
+    assert HandEvaluator.read(str(path)) is None
+    path.write_bytes(b"XXXX" + data[4:])  # not ours
+    assert HandEvaluator.read(str(path)) is None
@@ -0,0 +1,175 @@
+import asyncio
+import contextlib
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import dotzbot
+from dotzbot import CircuitBreaker, CircuitOpenError, HttpClient, RetryableError, RetryPolicy, fetch_one_meme
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+class FakeMemeApi:
+    """meme-api and the image host in one test server. /gimme answers with responses in order, then 200s."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)  # (status, headers)
+        self.hits = 0
+
+    async def gimme(self, request):
+        self.hits += 1
+        if self.responses:
+            status, headers = self.responses.pop(0)
+            return web.Response(status=status, headers=headers)
+        return web.json_response({"title": "meme", "subreddit": "memes", "postLink": "https://redd.it/1",
+                                  "url": str(request.url.with_path("/meme.png")), "nsfw": False})
+
+    async def image(self, _request):
+        return web.Response(body=PNG)
+
+
+@contextlib.asynccontextmanager
+async def serve(monkeypatch, api, breaker=None):
+    app = web.Application()
+    app.router.add_get("/gimme", api.gimme)
+    app.router.add_get("/meme.png", api.image)
+    server = TestServer(app)
+    await server.start_server()
+    client = HttpClient()
+    await client.start()
+    monkeypatch.setattr(dotzbot, "http_client", client)
+    monkeypatch.setattr(dotzbot, "MEME_API", str(server.make_url("/gimme")))
+    monkeypatch.setattr(dotzbot, "circuit_breakers", {"meme-api": breaker or CircuitBreaker("meme-api")})
+    try:
+        yield
+    finally:
+        await client.close()
+        await server.close()
+
+
+def run(monkeypatch, api, func, breaker=None):
+    async def main():
+        async with serve(monkeypatch, api, breaker):
+            return await func()
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 429])
+def test_retries_5xx_and_429(monkeypatch, status):
+    api = FakeMemeApi((status, {}), (status, {}))
+    meme = run(monkeypatch, api, lambda: RetryPolicy(attempts=3, base_delay=0.01).run(fetch_one_meme))
+    assert meme["image"] == PNG and meme["filename"] == "meme.png"
+    assert api.hits == 3
+
+
+def test_gives_up_after_the_last_attempt(monkeypatch):
+    api = FakeMemeApi(*[(503, {})] * 5)
+    with pytest.raises(RetryableError, match="503"):
+        run(monkeypatch, api, lambda: RetryPolicy(attempts=3, base_delay=0.01).run(fetch_one_meme))
+    assert api.hits == 3
+
+
+def test_waits_for_retry_after(monkeypatch):
+    api = FakeMemeApi((429, {"Retry-After": "0.3"}))
+    start = time.perf_counter()
+    run(monkeypatch, api, lambda: RetryPolicy(attempts=2, base_delay=0.001, max_delay=1).run(fetch_one_meme))
+    assert time.perf_counter() - start >= 0.3
+    assert api.hits == 2
+
+
+def test_retry_after_longer_than_max_delay_fails_fast(monkeypatch):
+    api = FakeMemeApi((503, {"Retry-After": "120"}))
+    start = time.perf_counter()
+    with pytest.raises(RetryableError) as error:
+        run(monkeypatch, api, lambda: RetryPolicy(attempts=3, max_delay=5).run(fetch_one_meme))
+    assert error.value.retry_after == 120
+    assert api.hits == 1
+    assert time.perf_counter() - start < 1
+
+
+def test_breaker_opens_after_threshold_and_stops_calling(monkeypatch):
+    breaker = CircuitBreaker("meme-api", failure_threshold=2, reset_after=30)
+    api = FakeMemeApi(*[(500, {})] * 5)
+
+    async def calls():
+        errors = []
+        for _ in range(4):
+            try:
+                await fetch_one_meme()
+            except (RetryableError, CircuitOpenError) as e:
+                errors.append(type(e))
+        return errors
+
+    errors = run(monkeypatch, api, calls, breaker)
+    assert errors == [RetryableError, RetryableError, CircuitOpenError, CircuitOpenError]
+    assert api.hits == 2  # the open breaker never let the last two through
+    assert breaker.state == "open"
+
+
+def test_open_breaker_isnt_retried(monkeypatch):
+    breaker = CircuitBreaker("meme-api", failure_threshold=1, reset_after=30)
+    api = FakeMemeApi(*[(500, {})] * 5)
+
+    async def calls():
+        with pytest.raises(RetryableError):
+            await fetch_one_meme()
+        start = time.perf_counter()
+        with pytest.raises(CircuitOpenError):
+            await RetryPolicy(attempts=3, base_delay=1).run(fetch_one_meme)
+        return time.perf_counter() - start
+
+    assert run(monkeypatch, api, calls, breaker) < 0.5  # no backoff sleeps
+    assert api.hits == 1
+
+
+def test_breaker_half_opens_and_closes_on_success(monkeypatch):
+    breaker = CircuitBreaker("meme-api", failure_threshold=2, reset_after=0.2)
+    api = FakeMemeApi((500, {}), (500, {}))
+
+    async def calls():
+        for _ in range(2):
+            with pytest.raises(RetryableError):
+                await fetch_one_meme()
+        assert breaker.state == "open"
+        await asyncio.sleep(0.25)
+        assert breaker.state == "half-open"
+        return await fetch_one_meme()
+
+    assert run(monkeypatch, api, calls, breaker)["image"] == PNG
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_failed_trial_opens_it_again(monkeypatch):
+    breaker = CircuitBreaker("meme-api", failure_threshold=1, reset_after=0.2)
+    api = FakeMemeApi((500, {}), (503, {}))
+
+    async def calls():
+        with pytest.raises(RetryableError):
+            await fetch_one_meme()
+        await asyncio.sleep(0.25)
+        with pytest.raises(RetryableError):  # the one trial request
+            await fetch_one_meme()
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await fetch_one_meme()
+
+    run(monkeypatch, api, calls, breaker)
+    assert api.hits == 2
+
+
+def test_nsfw_memes_dont_trip_the_breaker(monkeypatch):
+    breaker = CircuitBreaker("meme-api", failure_threshold=1)
+
+    async def nsfw():
+        async with breaker:
+            raise RetryableError("got an NSFW meme", counts_as_failure=False)
+
+    async def main():
+        with pytest.raises(RetryableError):
+            await nsfw()
+
+    asyncio.run(main())
+    assert breaker.state == "closed"
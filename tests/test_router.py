@@ -0,0 +1,110 @@
+import asyncio
+import types
+
+from dotzbot import MessageRouter, TimerWheel
+
+
+def message(channel_id, user_id, content=""):
+    return types.SimpleNamespace(channel=types.SimpleNamespace(id=channel_id),
+                                 author=types.SimpleNamespace(id=user_id), content=content)
+
+
+def test_wheel_expires_on_the_right_tick():
+    wheel = TimerWheel(tick=1, max_delay=10)
+    wheel.schedule("a", 3)
+    wheel.schedule("b", 1)
+    assert [set(wheel.advance()) for _ in range(3)] == [{"b"}, set(), {"a"}]
+    assert len(wheel) == 0
+
+
+def test_wheel_reschedule_and_cancel():
+    wheel = TimerWheel(tick=1, max_delay=10)
+    wheel.schedule("a", 1)
+    wheel.schedule("a", 2)  # moved, not added twice
+    wheel.schedule("b", 1)
+    wheel.cancel("b")
+    assert "b" not in wheel
+    assert set(wheel.advance()) == set()
+    assert set(wheel.advance()) == {"a"}
+
+
+def test_wheel_caps_at_max_delay():
+    wheel = TimerWheel(tick=1, max_delay=5)
+    wheel.schedule("a", 1000)
+    expired_at = next(tick for tick in range(1, 20) if wheel.advance())
+    assert expired_at == 5
+
+
+def test_wheel_wraps_around():
+    wheel = TimerWheel(tick=1, max_delay=3)
+    for _ in range(10):
+        wheel.schedule("a", 2)
+        assert not wheel.advance()
+        assert set(wheel.advance()) == {"a"}
+
+
+class Game:
+    def __init__(self):
+        self.seen = []
+        self.timed_out = []
+
+    async def on_message(self, msg):
+        self.seen.append(msg.content)
+
+    async def on_timeout(self, channel_id, user_id):
+        self.timed_out.append((channel_id, user_id))
+
+
+def test_router_sends_to_the_user_and_channel_routes():
+    router = MessageRouter(max_timeout=60)
+    player, anyone = Game(), Game()
+    router.add(1, 10, player.on_message)
+    router.add(1, None, anyone.on_message)
+
+    async def main():
+        return [await router.dispatch(message(1, 10, "mine")), await router.dispatch(message(1, 11, "theirs")),
+                await router.dispatch(message(2, 10, "elsewhere"))]
+
+    assert asyncio.run(main()) == [True, True, False]
+    assert player.seen == ["mine"]
+    assert anyone.seen == ["mine", "theirs"]
+
+
+def test_router_timeout_and_touch():
+    router = MessageRouter(max_timeout=60)
+    game = Game()
+    router.add(1, 10, game.on_message, timeout=2, on_timeout=game.on_timeout)
+    router.advance()
+    router.touch(1, 10, 2)  # they did something, start over
+    assert router.advance() == []
+    assert router.advance() == [((1, 10), game.on_timeout)]
+    assert (1, 10) not in router
+
+
+def test_router_removed_route_never_times_out():
+    router = MessageRouter(max_timeout=60)
+    game = Game()
+    router.add(1, 10, game.on_message, timeout=1, on_timeout=game.on_timeout)
+    assert router.remove(1, 10)
+    assert not router.remove(1, 10)
+    assert router.advance() == []
+
+
+def test_router_broken_route_doesnt_raise():
+    router = MessageRouter(max_timeout=60)
+
+    async def broken(msg):
+        raise RuntimeError("oops")
+
+    router.add(1, 10, broken)
+    assert asyncio.run(router.dispatch(message(1, 10)))
+
+
+def test_router_rebind_points_at_the_new_cog():
+    router = MessageRouter(max_timeout=60)
+    old, new = Game(), Game()
+    router.add(1, 10, old.on_message, timeout=5, on_timeout=old.on_timeout)
+    router.rebind(old, new)
+    asyncio.run(router.dispatch(message(1, 10, "hi")))
+    assert new.seen == ["hi"] and old.seen == []
+    assert router.routes[(1, 10)][1] == new.on_timeout
@@ -0,0 +1,95 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from dotzbot import StatsStore
+
+
+def test_record_doesnt_touch_the_disk_until_flush(tmp_path):
+    path = tmp_path / "stats.db"
+
+    async def main():
+        store = StatsStore(str(path))
+        await store.open()
+        store.record(1, "trivia", "win")
+        store.record(1, "trivia", "win")
+        store.record(2, "trivia", "loss")
+        on_disk = sqlite3.connect(path).execute("SELECT COUNT(*) FROM user_stats").fetchone()[0]
+        written = await store.flush()
+        store.close()
+        return on_disk, written
+
+    assert asyncio.run(main()) == (0, 2)
+    rows = sqlite3.connect(path).execute("SELECT user_id, game, result, times FROM user_stats ORDER BY user_id")
+    assert rows.fetchall() == [(1, "trivia", "win", 2), (2, "trivia", "loss", 1)]
+
+
+def test_get_adds_pending_to_what_is_on_disk(tmp_path):
+    path = str(tmp_path / "stats.db")
+
+    async def main():
+        store = StatsStore(path)
+        await store.open()
+        store.record(1, "rps", "win")
+        await store.flush()
+        store.close()
+
+        store = StatsStore(path)  # like a restart
+        await store.open()
+        store.record(1, "rps", "win")
+        store.record(1, "rps", "tie")
+        summary = await store.get(1)
+        store.record(1, "rps", "win")  # cached users stay up to date
+        return summary, store.totals, await store.get(2)
+
+    summary, totals, nobody = asyncio.run(main())
+    assert summary == {("rps", "win"): 3, ("rps", "tie"): 1}
+    assert totals == {("rps", "win"): 3, ("rps", "tie"): 1}
+    assert nobody == {}
+
+
+def test_full_batch_flushes_by_itself(tmp_path):
+    async def main():
+        store = StatsStore(str(tmp_path / "stats.db"), batch_size=3)
+        await store.open()
+        for user_id in range(3):
+            store.record(user_id, "guess", "win")
+        await store.flush_task
+        return store.stats()
+
+    stats = asyncio.run(main())
+    assert stats["written"] == 3 and stats["pending"] == 0 and stats["flushes"] == 1
+
+
+def test_failed_flush_keeps_the_batch(tmp_path, monkeypatch):
+    async def main():
+        store = StatsStore(str(tmp_path / "stats.db"))
+        await store.open()
+        store.record(1, "trivia", "win")
+
+        def broken(batch):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(store, "_write", broken)
+        with pytest.raises(sqlite3.OperationalError):
+            await store.flush()
+        store.record(1, "trivia", "win")
+        monkeypatch.undo()
+        written = await store.flush()
+        return written, store.stats()["failed_flushes"], await store.get(1)
+
+    written, failed, summary = asyncio.run(main())
+    assert written == 1 and failed == 1
+    assert summary == {("trivia", "win"): 2}
+
+
+def test_user_cache_is_bounded(tmp_path):
+    async def main():
+        store = StatsStore(str(tmp_path / "stats.db"), cache_size=2)
+        await store.open()
+        for user_id in range(5):
+            await store.get(user_id)
+        return list(store.users)
+
+    assert asyncio.run(main()) == [3, 4]
@@ -0,0 +1,89 @@
+import asyncio
+import types
+
+import discord
+import pytest
+
+import dotzbot
+from dotzbot import UserCache, get_member_lazy
+
+
+class FakeGuild:
+    def __init__(self, members=()):
+        self.id = 1
+        self.members = {member.id: member for member in members}
+        self.queries = 0
+
+    def get_member(self, user_id):
+        return None  # nobody is cached, like right after startup
+
+    async def query_members(self, user_ids, limit, cache):
+        self.queries += 1
+        return [self.members[user_id] for user_id in user_ids if user_id in self.members]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = UserCache(negative_ttl=60)
+    monkeypatch.setattr(dotzbot, "user_cache", cache)
+    monkeypatch.setattr(dotzbot.bot._connection, "_intents", discord.Intents(members=True))
+    return cache
+
+
+def test_people_not_in_the_guild_are_only_asked_for_once(cache):
+    guild = FakeGuild()
+
+    async def main():
+        return [await get_member_lazy(guild, 5) for _ in range(3)]
+
+    assert asyncio.run(main()) == [None, None, None]
+    assert guild.queries == 1
+
+
+def test_members_are_still_found(cache):
+    member = types.SimpleNamespace(id=5)
+    guild = FakeGuild([member])
+    assert asyncio.run(get_member_lazy(guild, 5)) is member
+    assert not cache.not_member(guild.id, 5)
+
+
+def test_joining_clears_the_miss(cache):
+    guild = FakeGuild()
+    asyncio.run(get_member_lazy(guild, 5))
+    cache.forget_not_member(guild.id, 5)
+    guild.members[5] = types.SimpleNamespace(id=5)
+    assert asyncio.run(get_member_lazy(guild, 5)) is guild.members[5]
+    assert guild.queries == 2
+
+
+def test_miss_expires(cache):
+    cache.negative_ttl = 0
+    guild = FakeGuild()
+    asyncio.run(get_member_lazy(guild, 5))
+    asyncio.run(get_member_lazy(guild, 5))
+    assert guild.queries == 2
+
+
+def test_fetch_user_is_shared_and_cached(cache, monkeypatch):
+    calls = []
+
+    async def fetch_user(user_id):
+        calls.append(user_id)
+        await asyncio.sleep(0.01)
+        if user_id == 404:
+            raise discord.NotFound(types.SimpleNamespace(status=404, reason="Not Found"), "Unknown User")
+        return types.SimpleNamespace(id=user_id)
+
+    monkeypatch.setattr(dotzbot.bot, "fetch_user", fetch_user)
+
+    async def main():
+        first = await asyncio.gather(cache.get(1), cache.get(1), cache.get(404))
+        second = await asyncio.gather(cache.get(1), cache.get(404))
+        return first, second
+
+    (a, b, missing), (c, missing_again) = asyncio.run(main())
+    assert a is b is c
+    assert missing is None and missing_again is None
+    assert calls == [1, 404]
+    assert cache.peek(1) is a
+    assert cache.peek(2) is None
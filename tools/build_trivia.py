@@ -0,0 +1,37 @@
+# Builds the trivia bank the trivia cog reads from a tab separated source
+# (category, question, answer, other answers split by |). The bot builds it by
+# itself when the source is newer than the bank, this is for building big
+# banks ahead of time or checking a source for mistakes.
+#
+# Usage: python tools/build_trivia.py [source] [bank]
+# Defaults to TRIVIA_SOURCE and TRIVIA_BANK, same as the bot.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.trivia import BANK_PATH, SOURCE_PATH, TriviaBank, build_bank  # noqa: E402
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else SOURCE_PATH
+    path = sys.argv[2] if len(sys.argv) > 2 else BANK_PATH
+    start = time.perf_counter()
+    try:
+        count = build_bank(source, path)
+    except (OSError, ValueError) as e:
+        print(f"Couldn't build {path}: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    bank = TriviaBank(path)
+    print(f"{count} questions from {source} into {path} ({os.path.getsize(path) // 1024}KB) in {elapsed * 1000:.0f}ms")
+    for name, _, category_count in bank.categories.values():
+        print(f"  {name}: {category_count}")
+    bank.close()
+
+
+if __name__ == "__main__":
+    main()